@@ -0,0 +1,219 @@
+"""Crawl a synthetic news website from a local server and record the metrics.
+
+Usage:
+    python experiments/benchmark_crawl.py --pages 1000 --max-depth 3 --concurrency 8
+    python experiments/benchmark_crawl.py --slow-ratio 0.05 --fail-ratio 0.05 --label retries
+
+The site is served by experiments/synthetic_site.py in a separate process,
+so the server does not compete with the crawler for the GIL. Reports
+pages/sec of Crawler.crawl_site, p50/p99 fetch and parse latency, peak
+RSS, the cost of a seen store lookup and pages/sec of the extraction path
+alone. Every run is appended to experiments/results/benchmark_crawl.jsonl
+and compared with the last run with the same parameters, together with
+the per stage latencies of Crawler.stats.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grawt.crawler import Crawler, scrape_html, scrape_html_timed  # noqa: E402
+from grawt.models import ScrapedArticle  # noqa: E402
+from grawt.scraper.general_scraper import GeneralScraper  # noqa: E402
+from synthetic_site import SyntheticSite, add_site_arguments, serve, site_from_args  # noqa: E402
+
+RESULTS_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'benchmark_crawl.jsonl')
+REPO_CONFIG: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config.yaml')
+
+
+class TimedCrawler(Crawler):
+    """Crawler that records the latency of every fetch and parse."""
+
+    def __init__(self, config_path: str) -> None:
+        super().__init__(config_path)
+        self.fetch_times: List[float] = []
+        self.parse_times: List[float] = []
+
+    def _load_url(self, url: str) -> str:
+        start: float = time.perf_counter()
+        try:
+            return super()._load_url(url)
+        finally:
+            self.fetch_times.append(time.perf_counter() - start)
+
+    def _single_scrape(self, url: str, leaf: bool = False) -> ScrapedArticle:
+        raw_html, metadata, mode = self._load_page(url, leaf)
+        start: float = time.perf_counter()
+        article, timings = scrape_html_timed(
+            url, raw_html, *self._scrape_args(url), None, metadata, mode, self._fingerprint_min_length()
+        )
+        self.parse_times.append(time.perf_counter() - start)
+        self.stats.observe_all(timings)
+        return article
+
+
+def percentile(values: List[float], share: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def milliseconds(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 2)
+
+
+def run_server(args: argparse.Namespace, ports) -> None:
+    server = serve(site_from_args(args))
+    ports.put(server.server_address[1])
+    while True:
+        time.sleep(3600)
+
+
+def write_config(args: argparse.Namespace, directory: str) -> str:
+    with open(REPO_CONFIG, 'r') as file:
+        config: dict = yaml.safe_load(file)
+    config.update({
+        'urls_file_path': os.path.join(directory, 'urls.json'),
+        'seen_store': args.seen_store,
+        'seen_store_path': os.path.join(directory, 'urls.sqlite'),
+        'bloom_filter_path': os.path.join(directory, 'urls.bloom'),
+        'bloom_filter_capacity': 1_000_000,
+        'http_cache_path': None,
+        'failure_store_path': None,
+        'fingerprint_store_path': None,
+        'discovery_state_path': os.path.join(directory, 'discovery.json'),
+        'politeness': args.politeness,
+        'requests_per_second': 1000.0,
+        'max_per_host': args.concurrency,
+        'url_retry_delay': 0.05,
+        'concurrency': args.concurrency,
+        'parse_workers': args.parse_workers,
+        'parser': args.parser
+    })
+    path: str = os.path.join(directory, 'config.yaml')
+    with open(path, 'w') as file:
+        yaml.safe_dump(config, file)
+    return path
+
+
+def seen_store_lookup_us(crawler: Crawler, known: List[str], lookups: int = 20000) -> float:
+    probes: List[str] = [known[i % len(known)] for i in range(lookups // 2)]
+    probes += ['http://127.0.0.1/unknown/{}.html'.format(i) for i in range(lookups // 2)]
+    start: float = time.perf_counter()
+    for url in probes:
+        url in crawler._seen_store
+    return (time.perf_counter() - start) / len(probes) * 1e6
+
+
+def extraction_pages_per_s(site: SyntheticSite, parser: str, pages: int = 200) -> float:
+    scraper = GeneralScraper()
+    htmls: List[str] = [site.html(page, '127.0.0.1') for page in range(min(pages, site.pages))]
+    start: float = time.perf_counter()
+    for i, html in enumerate(htmls):
+        scrape_html('http://127.0.0.1/article/{}.html'.format(i), html, scraper, parser, 150)
+    return len(htmls) / (time.perf_counter() - start)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: dict) -> None:
+    previous: Optional[dict] = None
+    if os.path.exists(RESULTS_PATH):
+        with open(RESULTS_PATH, 'r') as file:
+            for line in file:
+                run: dict = json.loads(line)
+                if run['params'] == result['params']:
+                    previous = run
+    if previous is None:
+        print('no earlier run with the same parameters')
+        return
+    print('compared with {} ({}):'.format(previous['time'], previous.get('commit')))
+    for key, value in result['metrics'].items():
+        old = previous['metrics'].get(key)
+        if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            print('  {:<24} {:>10} -> {:>10} ({:+.1%})'.format(key, old, value, value / old - 1))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    add_site_arguments(arg_parser)
+    arg_parser.add_argument('--max-depth', type=int, default=3)
+    arg_parser.add_argument('--concurrency', type=int, default=1)
+    arg_parser.add_argument('--parse-workers', type=int, default=0)
+    arg_parser.add_argument('--parser', default='html.parser')
+    arg_parser.add_argument('--seen-store', default='sqlite')
+    arg_parser.add_argument('--politeness', action='store_true')
+    arg_parser.add_argument('--label', default='')
+    arg_parser.add_argument('--no-save', action='store_true', help='Do not append the result to the results file.')
+    args = arg_parser.parse_args()
+
+    site: SyntheticSite = site_from_args(args)
+    ctx = multiprocessing.get_context('fork')
+    ports = ctx.Queue()
+    server_process = ctx.Process(target=run_server, args=(args, ports), daemon=True)
+    server_process.start()
+    port: int = ports.get(timeout=30)
+
+    with tempfile.TemporaryDirectory(prefix='grawt-crawl-bench-') as directory:
+        crawler = TimedCrawler(write_config(args, directory))
+        start: float = time.perf_counter()
+        articles = crawler.crawl_site('http://127.0.0.1:{}/'.format(port), max_depth=args.max_depth)
+        elapsed: float = time.perf_counter() - start
+        peak_rss_mb: float = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        lookup_us: float = seen_store_lookup_us(crawler, [article.url for article in articles] or ['http://127.0.0.1/'])
+        crawler.close()
+    server_process.terminate()
+
+    params: dict = {key: value for key, value in vars(args).items() if key not in ('label', 'no_save')}
+    result: dict = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'params': params,
+        'metrics': {
+            'pages': len(articles),
+            'expected_pages': site.pages_within(args.max_depth),
+            'seconds': round(elapsed, 2),
+            'pages_per_s': round(len(articles) / elapsed, 1),
+            'fetch_p50_ms': milliseconds(percentile(crawler.fetch_times, 0.5)),
+            'fetch_p99_ms': milliseconds(percentile(crawler.fetch_times, 0.99)),
+            'parse_p50_ms': milliseconds(percentile(crawler.parse_times, 0.5)),
+            'parse_p99_ms': milliseconds(percentile(crawler.parse_times, 0.99)),
+            'peak_rss_mb': round(peak_rss_mb, 1),
+            'seen_store_lookup_us': round(lookup_us, 2),
+            'extraction_pages_per_s': round(extraction_pages_per_s(site, args.parser), 1)
+        }
+    }
+    result['stages'] = {
+        name: {'count': values['count'], 'mean_ms': milliseconds(values['mean']), 'total_s': round(values['total'], 2)}
+        for name, values in sorted(crawler.stats.snapshot()['stages'].items())
+    }
+    print(json.dumps(result['metrics'], indent=2))
+    for name, values in result['stages'].items():
+        print('  {:<22} {:>7} x {:>9} ms = {:>8} s'.format(name, values['count'], values['mean_ms'], values['total_s']))
+    compare(result)
+    if not args.no_save:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+        with open(RESULTS_PATH, 'a') as file:
+            file.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
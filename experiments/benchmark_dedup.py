@@ -0,0 +1,112 @@
+"""Measure the throughput and accuracy of the content fingerprint deduplication.
+
+Usage:
+    python experiments/benchmark_dedup.py --articles 50000
+    python experiments/benchmark_dedup.py [html files or directories]
+
+The synthetic corpus consists of random articles, exact copies with other
+whitespace and case, and near copies with a few changed words or an
+added teaser line. Reports fingerprints per second, lookups per second
+against the growing SQLite index, the size of the index and how many of
+the copies were found. With HTML files the main texts of the pages are
+used and only the number of duplicates is reported.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmark_extraction import MAIN_TEXT_MIN_LENGTH, load_pages  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from grawt.dedup import ContentDeduplicator, content_hash, simhash  # noqa: E402
+from grawt.scraper.general_scraper import GeneralScraper  # noqa: E402
+
+
+def synthetic_corpus(count: int, words: int, seed: int) -> List[Tuple[str, str, Optional[int]]]:
+    """Articles as (url, text, index of the original or None)."""
+    rng = random.Random(seed)
+    # Roughly Zipf distributed vocabulary like natural text
+    vocabulary: List[str] = ['word{}'.format(i) for i in range(20000)]
+    weights: List[float] = [1.0 / (i + 1) for i in range(len(vocabulary))]
+    corpus: List[Tuple[str, str, Optional[int]]] = []
+    originals: List[int] = []
+    for i in range(count):
+        url: str = 'https://www.example-news.com/article-{}.html'.format(i)
+        roll: float = rng.random()
+        if originals and roll < 0.05:
+            original: int = rng.choice(originals)
+            corpus.append((url, '  '.join(corpus[original][1].upper().split(' ')), original))
+        elif originals and roll < 0.15:
+            original = rng.choice(originals)
+            text: List[str] = corpus[original][1].split(' ')
+            for _ in range(3):
+                text[rng.randrange(len(text))] = rng.choice(vocabulary)
+            if rng.random() < 0.5:
+                text = ['Read', 'more', 'from', 'our', 'partners'] + text
+            corpus.append((url, ' '.join(text), original))
+        else:
+            corpus.append((url, ' '.join(rng.choices(vocabulary, weights, k=words)), None))
+            originals.append(i)
+    return corpus
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('paths', nargs='*', help='HTML files or directories with HTML files.')
+    arg_parser.add_argument('--articles', type=int, default=20000, help='Size of the synthetic corpus.')
+    arg_parser.add_argument('--words', type=int, default=600, help='Words per synthetic article.')
+    arg_parser.add_argument('--max-distance', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    if args.paths:
+        scraper = GeneralScraper()
+        corpus: List[Tuple[str, str, Optional[int]]] = [
+            (str(i), scraper.extract_main_text(BeautifulSoup(page, 'html.parser'), MAIN_TEXT_MIN_LENGTH), None)
+            for i, page in enumerate(load_pages(args.paths))
+        ]
+    else:
+        corpus = synthetic_corpus(args.articles, args.words, seed=1)
+    print('articles: {}'.format(len(corpus)))
+
+    start: float = time.perf_counter()
+    for _, text, _ in corpus:
+        content_hash(text)
+        simhash(text)
+    print('fingerprints:  {:>8.0f} articles/s'.format(len(corpus) / (time.perf_counter() - start)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, 'fingerprints.sqlite')
+        deduplicator = ContentDeduplicator(path, max_distance=args.max_distance, batch_size=1000)
+        results: List[Optional[str]] = []
+        start = time.perf_counter()
+        for url, text, _ in corpus:
+            results.append(deduplicator.check(url, text))
+        elapsed: float = time.perf_counter() - start
+        deduplicator.close()
+        print('check + index: {:>8.0f} articles/s'.format(len(corpus) / elapsed))
+        print('index size:    {:>8.1f} bytes/article'.format(os.path.getsize(path) / len(corpus)))
+
+    found: int = sum(1 for result in results if result is not None)
+    copies: int = sum(1 for _, _, original in corpus if original is not None)
+    if copies:
+        kinds: List[str] = [
+            'exact' if original is not None and content_hash(text) == content_hash(corpus[original][1]) else 'near'
+            for _, text, original in corpus
+        ]
+        for kind in ('exact', 'near'):
+            expected: List[bool] = [original is not None and kinds[i] == kind for i, (_, _, original) in enumerate(corpus)]
+            hits: int = sum(1 for result, copy in zip(results, expected) if copy and result is not None)
+            print('{} copies found: {}/{} ({:.1%})'.format(kind, hits, sum(expected), hits / max(1, sum(expected))))
+        false_hits: int = sum(1 for result, (_, _, original) in zip(results, corpus) if original is None and result is not None)
+        print('false positives: {}'.format(false_hits))
+    else:
+        print('duplicates:    {}'.format(found))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Compare the CPU time per page of the single pass GeneralScraper with the
+original implementation that scanned the whole document per extract method.
+
+Usage:
+    python experiments/benchmark_extraction.py [html files or directories]
+
+Without arguments a synthetic news page is used.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, List
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from dateutil import parser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grawt.scraper.general_scraper import GeneralScraper  # noqa: E402
+
+MAIN_TEXT_MIN_LENGTH: int = 150
+
+
+class LegacyScraper():
+    """The GeneralScraper before the single pass extraction."""
+
+    def extract_headline(self, soup: BeautifulSoup) -> str:
+        headlines: List[Any] = []
+        for i in range(1, 7):
+            headlines.extend(soup.find_all(f'h{i}'))
+        if len(headlines) > 0:
+            return headlines[0].get_text()
+        return soup.find('title').get_text()
+
+    def extract_main_text(self, soup: BeautifulSoup, min_chars: int) -> str:
+        full_text: str = ''
+        for p in soup.find_all('p'):
+            text: str = p.get_text()
+            if len(text) >= min_chars:
+                full_text += text + '\n'
+        return full_text
+
+    def extract_date(self, soup: BeautifulSoup) -> datetime:
+        datetimes: List[datetime] = []
+        for time_tag in soup.find_all('time'):
+            try:
+                datetimes.append(parser.parse(time_tag.get('datetime')))
+            except parser.ParserError:
+                pass
+        return min(datetimes) if datetimes else None
+
+    def extract_all_hrefs(self, soup: BeautifulSoup) -> List[str]:
+        return [a.get('href') for a in soup.find_all('a') if a.get('href', None) is not None]
+
+    def extract_netloc_links(self, soup: BeautifulSoup) -> List[str]:
+        return [url for url in self.extract_all_hrefs(soup) if urlparse(url).netloc]
+
+    def scrape_article(self, soup: BeautifulSoup, main_text_min_length: int) -> tuple:
+        return (
+            self.extract_headline(soup),
+            self.extract_main_text(soup, main_text_min_length),
+            self.extract_date(soup),
+            self.extract_all_hrefs(soup),
+            self.extract_netloc_links(soup)
+        )
+
+
+def synthetic_page() -> str:
+    navigation: str = ''.join(
+        '<li><a href="https://www.example-news.com/section-{0}/index.html">Section {0}</a></li>'.format(i) for i in range(150)
+    )
+    paragraphs: str = ''.join('<p>{}</p>'.format('Lorem ipsum dolor sit amet. ' * (1 + i % 12)) for i in range(80))
+    teasers: str = ''.join(
+        '<div><h3>Teaser {0}</h3><a href="/news/article-{0}.html">Read more</a></div>'.format(i) for i in range(100)
+    )
+    return (
+        '<html><head><title>Example News</title></head><body><nav><ul>{}</ul></nav>'
+        '<article><h1>Headline of the article</h1><time datetime="2021-07-09T10:15:00Z">9 July</time>'
+        '{}</article><aside>{}</aside><footer><time datetime="2021-07-09T11:00:00Z">Updated</time></footer>'
+        '</body></html>'
+    ).format(navigation, paragraphs, teasers)
+
+
+def load_pages(paths: List[str]) -> List[str]:
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.html'))
+        else:
+            files.append(path)
+    pages: List[str] = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            pages.append(file.read())
+    return pages
+
+
+def cpu_time_per_page(scraper, soups: List[BeautifulSoup], repeat: int) -> float:
+    start: float = time.process_time()
+    for _ in range(repeat):
+        for soup in soups:
+            scraper.scrape_article(soup, MAIN_TEXT_MIN_LENGTH)
+    return (time.process_time() - start) / (repeat * len(soups))
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('paths', nargs='*', help='HTML files or directories with HTML files.')
+    arg_parser.add_argument('--repeat', type=int, default=20, help='Number of passes over the pages.')
+    args = arg_parser.parse_args()
+
+    pages: List[str] = load_pages(args.paths) if args.paths else [synthetic_page()]
+    soups: List[BeautifulSoup] = [BeautifulSoup(page, 'html.parser') for page in pages]
+
+    legacy = LegacyScraper()
+    general = GeneralScraper()
+    for soup in soups:
+        article = general.scrape_article(soup, MAIN_TEXT_MIN_LENGTH)
+        expected = legacy.scrape_article(soup, MAIN_TEXT_MIN_LENGTH)
+        # Pages without a time tag fall back to datetime.now(), which can not be compared
+        article_date = article.datetime_ if expected[2] is not None else None
+        # The legacy scraper drops relative links, the crawler resolves them now
+        absolute_links = [link for link in article.netloc_links if urlparse(link).netloc]
+        actual = (article.headline, article.main_text, article_date, article.hrefs, absolute_links)
+        assert actual == expected, 'Single pass extraction differs from the legacy output'
+
+    legacy_time: float = cpu_time_per_page(legacy, soups, args.repeat)
+    general_time: float = cpu_time_per_page(general, soups, args.repeat)
+    print('pages: {}'.format(len(soups)))
+    print('legacy:      {:.3f} ms cpu per page'.format(legacy_time * 1000))
+    print('single pass: {:.3f} ms cpu per page'.format(general_time * 1000))
+    print('speedup:     {:.2f}x'.format(legacy_time / general_time))
+
+
+if __name__ == '__main__':
+    main()
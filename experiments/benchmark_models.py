@@ -0,0 +1,98 @@
+"""Compare per article memory and encode/decode throughput of ScrapedArticle.
+
+Usage:
+    python experiments/benchmark_models.py --articles 20000
+
+The legacy class is the dict backed ScrapedArticle with the SHA3 hash.
+"""
+import argparse
+import io
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from hashlib import sha3_256
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grawt.models import ScrapedArticle, iter_records, write_records  # noqa: E402
+
+
+class LegacyArticle():
+    def __eq__(self, o: object) -> bool:
+        return self.url == o.url
+
+    def __hash__(self) -> int:
+        return int(sha3_256(self.url.encode()).hexdigest(), 16)
+
+
+def fill(article, i: int, keep_links: bool):
+    article.url = 'https://www.example-news.com/news/article-{}.html'.format(i)
+    article.headline = 'Headline number {}'.format(i)
+    article.main_text = 'Lorem ipsum dolor sit amet. ' * 100
+    article.datetime_ = datetime(2021, 7, 9, 10, 15)
+    links: List[str] = ['https://www.example-news.com/news/article-{}.html'.format(i + k) for k in range(100)]
+    article.hrefs = links if keep_links else None
+    article.netloc_links = list(links) if keep_links else None
+    return article
+
+
+def memory_per_article(factory: Callable, count: int, keep_links: bool) -> float:
+    tracemalloc.start()
+    before: int = tracemalloc.get_traced_memory()[0]
+    articles = [fill(factory(), i, keep_links) for i in range(count)]
+    after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del articles
+    return (after - before) / count
+
+
+def throughput(label: str, count: int, action: Callable) -> None:
+    start: float = time.perf_counter()
+    action()
+    print('{:<28} {:>10.0f} articles/s'.format(label, count / (time.perf_counter() - start)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=20000)
+    args = parser.parse_args()
+    count: int = args.articles
+
+    print('memory per article (bytes, text and links included)')
+    print('  legacy:               {:.0f}'.format(memory_per_article(LegacyArticle, count, True)))
+    print('  slotted:              {:.0f}'.format(memory_per_article(ScrapedArticle, count, True)))
+    print('  slotted without links {:.0f}'.format(memory_per_article(ScrapedArticle, count, False)))
+
+    legacy: List[LegacyArticle] = [fill(LegacyArticle(), i, True) for i in range(count)]
+    articles: List[ScrapedArticle] = [fill(ScrapedArticle(), i, True) for i in range(count)]
+    throughput('set insert legacy', count, lambda: set(legacy))
+    throughput('set insert slotted', count, lambda: set(articles))
+
+    encoded_json: List[str] = []
+    throughput('json encode', count, lambda: encoded_json.extend(json.dumps(a.to_dict()) for a in articles))
+    throughput('json decode', count, lambda: [ScrapedArticle.from_dict(json.loads(d)) for d in encoded_json])
+    pickled: List[bytes] = []
+    throughput('pickle encode legacy', count, lambda: pickled.extend(pickle.dumps(a) for a in legacy))
+    throughput('pickle decode legacy', count, lambda: [pickle.loads(d) for d in pickled])
+    records: List[bytes] = []
+    throughput('binary record encode', count, lambda: records.extend(a.to_bytes() for a in articles))
+    throughput('binary record decode', count, lambda: [ScrapedArticle.from_bytes(d) for d in records])
+
+    buffer = io.BytesIO()
+    write_records(buffer, articles)
+    buffer.seek(0)
+    assert sum(1 for _ in iter_records(buffer)) == count
+    print('bytes per article: json {:.0f}, pickle legacy {:.0f}, binary record {:.0f}'.format(
+        sum(len(d) for d in encoded_json) / count,
+        sum(len(d) for d in pickled) / count,
+        buffer.tell() / count
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare the parser backends on a corpus of saved HTML pages.
+
+Usage:
+    python experiments/benchmark_parsers.py [html files or directories]
+
+Reports pages per second for parsing plus GeneralScraper extraction, the
+peak RSS of each backend and the number of pages whose extraction differs
+from the 'html.parser' backend. Backends that are not installed are
+skipped. Without arguments a synthetic news page is used.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmark_extraction import load_pages, synthetic_page  # noqa: E402
+from grawt.document import PARSERS, parse_document  # noqa: E402
+from grawt.scraper.general_scraper import GeneralScraper  # noqa: E402
+
+MAIN_TEXT_MIN_LENGTH: int = 150
+
+
+def extract(pages: List[str], parser: str) -> List[tuple]:
+    scraper = GeneralScraper()
+    results: List[tuple] = []
+    for page in pages:
+        article = scraper.scrape_document(parse_document(page, parser), MAIN_TEXT_MIN_LENGTH)
+        results.append((article.headline, article.main_text, article.hrefs))
+    return results
+
+
+def run_backend(parser: str, pages: List[str], repeat: int, queue) -> None:
+    try:
+        parse_document('<html></html>', parser)
+    except Exception as e:
+        queue.put({'parser': parser, 'skipped': str(e)})
+        return
+    rss_before: float = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        results: List[tuple] = extract(pages, parser)
+    elapsed: float = time.perf_counter() - start
+    queue.put({
+        'parser': parser,
+        'pages_per_s': round(repeat * len(pages) / elapsed, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+        'results': results
+    })
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('paths', nargs='*', help='HTML files or directories with HTML files.')
+    arg_parser.add_argument('--repeat', type=int, default=5, help='Number of passes over the corpus.')
+    args = arg_parser.parse_args()
+    pages: List[str] = load_pages(args.paths) if args.paths else [synthetic_page()] * 20
+
+    ctx = multiprocessing.get_context('fork')
+    reference: List[tuple] = None
+    for parser in PARSERS:
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(parser, pages, args.repeat, queue))
+        process.start()
+        report: dict = queue.get()
+        process.join()
+        results: List[tuple] = report.pop('results', None)
+        if results is not None:
+            if reference is None:
+                reference = results
+            report['differing_pages'] = sum(1 for a, b in zip(reference, results) if a != b)
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
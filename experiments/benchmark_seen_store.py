@@ -0,0 +1,93 @@
+"""Compare startup time, memory and lookup speed of the seen stores.
+
+Usage:
+    python experiments/benchmark_seen_store.py --urls 1000000
+
+Every backend runs in its own process, so the reported peak RSS is not
+influenced by the other backends.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from grawt.seen_store import BloomSeenStore, JsonSeenStore, SqliteSeenStore  # noqa: E402
+
+
+def make_url(i: int) -> str:
+    return 'https://www.example-news.com/news/article-{}/some-long-headline-slug-{}.html'.format(i, i * 7919)
+
+
+def open_store(backend: str, directory: str):
+    urls_file: str = os.path.join(directory, 'urls.json')
+    if backend == 'json_list':
+        with open(urls_file, 'r') as file:
+            return json.load(file)
+    if backend == 'json':
+        return JsonSeenStore(urls_file)
+    sqlite_store = SqliteSeenStore(os.path.join(directory, 'urls.sqlite'), migrate_from=urls_file)
+    if backend == 'sqlite':
+        return sqlite_store
+    return BloomSeenStore(sqlite_store, os.path.join(directory, 'urls.bloom'), capacity=args.urls * 2, error_rate=0.001)
+
+
+def run_backend(backend: str, directory: str, lookups: int, queue) -> None:
+    start: float = time.perf_counter()
+    store = open_store(backend, directory)
+    startup: float = time.perf_counter() - start
+
+    rng = random.Random(42)
+    # Half of the lookups hit known urls, half are new urls
+    probes = [make_url(rng.randrange(args.urls)) for _ in range(lookups // 2)]
+    probes += [make_url(args.urls + i) for i in range(lookups // 2)]
+    start = time.perf_counter()
+    hits: int = sum(1 for url in probes if url in store)
+    lookup_time: float = time.perf_counter() - start
+    queue.put({
+        'backend': backend,
+        'startup_s': round(startup, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'lookups_per_s': round(lookups / lookup_time),
+        'hits': hits
+    })
+
+
+def main() -> None:
+    directory: str = tempfile.mkdtemp(prefix='grawt-bench-')
+    with open(os.path.join(directory, 'urls.json'), 'w') as file:
+        json.dump([make_url(i) for i in range(args.urls)], file)
+
+    # The migration and the filter build are one time costs, do them up front
+    ctx = multiprocessing.get_context('fork')
+    for backend in ('sqlite', 'bloom'):
+        process = ctx.Process(target=lambda: open_store(backend, directory).close())
+        process.start()
+        process.join()
+
+    lookups: int = 100_000 if args.lookups is None else args.lookups
+    for backend in ('json_list', 'json', 'sqlite', 'bloom'):
+        if backend == 'json_list' and args.urls > 200_000:
+            # The original list lookups are O(n), limit their count
+            backend_lookups: int = 200
+        else:
+            backend_lookups = lookups
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(backend, directory, backend_lookups, queue))
+        process.start()
+        print(queue.get())
+        process.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--urls', type=int, default=1_000_000, help='Number of known urls.')
+    parser.add_argument('--lookups', type=int, default=None, help='Number of membership checks.')
+    args = parser.parse_args()
+    main()
@@ -0,0 +1,190 @@
+"""Synthetic news website served from a local HTTP server.
+
+Usage:
+    python experiments/synthetic_site.py --pages 1000 --port 8700
+
+Page 0 is the homepage, every page links to `fan_out` child pages, so
+the site is a tree of sections and articles. Each page also links to
+`duplicate_links` random pages, partly with tracking parameters, like
+the teasers and navigation of a real news site. A deterministic share
+of the pages is slow, fails with a 503 on the first request or is
+missing (404). The same seed always gives the same site.
+"""
+import argparse
+import http.server
+import random
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+LOREM: List[str] = (
+    'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore '
+    'magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo'
+).split()
+
+
+class SyntheticSite():
+
+    def __init__(
+        self,
+        pages: int = 1000,
+        fan_out: int = 10,
+        page_kb: int = 40,
+        duplicate_links: int = 20,
+        slow_ratio: float = 0.0,
+        slow_delay: float = 0.5,
+        fail_ratio: float = 0.0,
+        missing_ratio: float = 0.0,
+        seed: int = 1
+    ) -> None:
+        self.pages: int = pages
+        self.fan_out: int = fan_out
+        self.page_kb: int = page_kb
+        self.duplicate_links: int = duplicate_links
+        self.slow_delay: float = slow_delay
+        rng = random.Random(seed)
+        self._seed: int = seed
+        self.slow = {i for i in range(1, pages) if rng.random() < slow_ratio}
+        self.failing = {i for i in range(1, pages) if rng.random() < fail_ratio}
+        self.missing = {i for i in range(1, pages) if rng.random() < missing_ratio}
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def path(self, page: int) -> str:
+        return '/' if page == 0 else '/article/{}.html'.format(page)
+
+    def link_targets(self, page: int) -> List[int]:
+        """Pages linked from a page, children first."""
+        rng = random.Random(self._seed * 1_000_003 + page)
+        children: List[int] = [c for c in range(page * self.fan_out + 1, page * self.fan_out + self.fan_out + 1) if c < self.pages]
+        return children + [rng.randrange(self.pages) for _ in range(self.duplicate_links)]
+
+    def pages_within(self, max_depth: int) -> int:
+        """Number of pages that a breadth first crawl with max_depth scrapes."""
+        depths = {0: 0}
+        level: List[int] = [0]
+        for depth in range(1, max_depth + 1):
+            next_level: List[int] = []
+            for page in level:
+                if page in self.missing:
+                    continue
+                for target in self.link_targets(page):
+                    if target not in depths:
+                        depths[target] = depth
+                        next_level.append(target)
+            level = next_level
+        return sum(1 for page in depths if page not in self.missing)
+
+    def html(self, page: int, host: str) -> str:
+        rng = random.Random(self._seed * 2_000_003 + page)
+        targets: List[int] = self.link_targets(page)
+        links: List[str] = [self.path(child) for child in targets[:len(targets) - self.duplicate_links]]
+        for target in targets[len(links):]:
+            link: str = 'http://{}{}'.format(host, self.path(target))
+            # Tracking parameters, fragments and relative links that canonicalize to the same page
+            links.append(rng.choice([link, link + '?utm_source=teaser', link + '#comments', self.path(target)]))
+        paragraphs: List[str] = []
+        size: int = 0
+        while size < self.page_kb * 1024:
+            paragraph: str = ' '.join(rng.choice(LOREM) for _ in range(rng.randrange(20, 120)))
+            paragraphs.append('<p>{}</p>'.format(paragraph))
+            size += len(paragraph) + 7
+        return (
+            '<html><head><title>Page {0}</title></head><body><nav>{1}</nav><article><h1>Headline {0}</h1>'
+            '<time datetime="2021-07-{2:02d}T10:00:00Z">July</time>{3}</article></body></html>'
+        ).format(
+            page,
+            ''.join('<a href="{}">link</a>'.format(link) for link in links),
+            1 + page % 28,
+            ''.join(paragraphs)
+        )
+
+    def respond(self, path: str, host: str):
+        """Status code and body for a request path."""
+        with self._lock:
+            self.requests[path] += 1
+            count: int = self.requests[path]
+        page: Optional[int] = 0 if path in ('/', '/index.html') else None
+        if path.startswith('/article/') and path.endswith('.html'):
+            try:
+                page = int(path[len('/article/'):-len('.html')])
+            except ValueError:
+                page = None
+        if page is None or page >= self.pages or page in self.missing:
+            return 404, b'not found'
+        if page in self.slow:
+            time.sleep(self.slow_delay)
+        if page in self.failing and count == 1:
+            return 503, b'try again'
+        return 200, self.html(page, host).encode('utf-8')
+
+
+def serve(site: SyntheticSite, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Serve a site in a background thread.
+
+    Args:
+        site (SyntheticSite): Site to serve.
+        port (int, optional): Port, 0 picks a free one. Defaults to 0.
+
+    Returns:
+        http.server.ThreadingHTTPServer: Running server, `server_address` has the port.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes, Nagle would delay every response
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            status, body = site.respond(self.path.split('?')[0], self.headers.get('Host', 'localhost'))
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def site_from_args(args: argparse.Namespace) -> SyntheticSite:
+    return SyntheticSite(
+        args.pages, args.fan_out, args.page_kb, args.duplicate_links,
+        args.slow_ratio, args.slow_delay, args.fail_ratio, args.missing_ratio, args.seed
+    )
+
+
+def add_site_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--fan-out', type=int, default=10)
+    parser.add_argument('--page-kb', type=int, default=40)
+    parser.add_argument('--duplicate-links', type=int, default=20)
+    parser.add_argument('--slow-ratio', type=float, default=0.0)
+    parser.add_argument('--slow-delay', type=float, default=0.5)
+    parser.add_argument('--fail-ratio', type=float, default=0.0)
+    parser.add_argument('--missing-ratio', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_site_arguments(parser)
+    parser.add_argument('--port', type=int, default=8700)
+    args = parser.parse_args()
+    server = serve(site_from_args(args), args.port)
+    print('Serving on http://127.0.0.1:{}/'.format(server.server_address[1]))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+from datetime import datetime, timezone
+import gzip
+import io
+import os
+import sqlite3
+from threading import Lock
+from typing import BinaryIO, Dict, Iterator, List, Mapping, Optional, Tuple
+import uuid
+
+from grawt.fetcher import detect_encoding
+
+DEFAULT_COMPRESSLEVEL: int = 6
+DEFAULT_INDEX_BATCH_SIZE: int = 100
+# The body is stored decoded, these headers describe the transfer and not the stored bytes
+_TRANSFER_HEADERS = frozenset({'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive'})
+
+
+class ArchivedResponse():
+    """A response read back from an archive."""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes, date: str) -> None:
+        self.url: str = url
+        self.status_code: int = status_code
+        self.headers: Dict[str, str] = headers
+        self.content: bytes = content
+        self.date: str = date
+
+    @property
+    def encoding(self) -> str:
+        return detect_encoding(self.headers.get('Content-Type'), self.content)
+
+    @property
+    def text(self) -> str:
+        """Decoded body, with the same charset detection as a fetch.
+
+        Returns:
+            str: The body as string.
+        """
+        return self.content.decode(self.encoding, errors='replace')
+
+
+def index_path(path: str) -> str:
+    return path + '.index.sqlite'
+
+
+def _http_block(status_code: int, headers: Mapping[str, str], content: bytes) -> bytes:
+    lines: List[str] = ['HTTP/1.1 {}'.format(status_code)]
+    lines.extend('{}: {}'.format(key, value) for key, value in headers.items() if key.lower() not in _TRANSFER_HEADERS)
+    lines.append('Content-Length: {}'.format(len(content)))
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8', errors='replace') + content
+
+
+class ArchiveWriter():
+    """Append only archive of fetched responses in the WARC format.
+
+    Every response is a WARC/1.0 'response' record in its own gzip
+    member, the usual layout of .warc.gz files, so standard WARC tools
+    can read the archive and a single record can be read from its
+    offset. The offsets are kept in an SQLite index next to the archive.
+
+    Deviation from WARC: the body is stored after the Content-Encoding
+    was removed, the transfer headers are dropped accordingly.
+
+    One process writes an archive at a time, the writes of threads are
+    serialized. Records that were written but are missing in the index
+    after a crash are still found by iter_archive.
+
+    Args:
+        path (str): Path of the .warc.gz file.
+        compresslevel (int, optional): gzip level of every record. Defaults to 6.
+    """
+
+    def __init__(self, path: str, compresslevel: int = DEFAULT_COMPRESSLEVEL, batch_size: int = DEFAULT_INDEX_BATCH_SIZE) -> None:
+        self.path: str = path
+        self._compresslevel: int = compresslevel
+        self._batch_size: int = batch_size
+        self._lock = Lock()
+        self._file = open(path, 'ab')
+        self._rows: List[Tuple[str, int, int, int, str]] = []
+        self._index = sqlite3.connect(index_path(path), check_same_thread=False)
+        self._index.execute('PRAGMA journal_mode=WAL')
+        self._index.execute(
+            'CREATE TABLE IF NOT EXISTS records (url TEXT, offset INTEGER PRIMARY KEY, length INTEGER, status INTEGER, date TEXT)'
+        )
+        self._index.execute('CREATE INDEX IF NOT EXISTS records_url ON records (url)')
+        self._index.commit()
+
+    def write(self, url: str, status_code: int, headers: Mapping[str, str], content: bytes) -> int:
+        """Append a response.
+
+        Args:
+            url (str): URL of the response.
+            status_code (int): HTTP status.
+            headers (Mapping[str, str]): Response headers.
+            content (bytes): Decoded body.
+
+        Returns:
+            int: Offset of the record in the archive.
+        """
+        date: str = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        block: bytes = _http_block(status_code, headers, content)
+        warc_headers: str = (
+            'WARC/1.0\r\n'
+            'WARC-Type: response\r\n'
+            'WARC-Record-ID: <urn:uuid:{}>\r\n'
+            'WARC-Date: {}\r\n'
+            'WARC-Target-URI: {}\r\n'
+            'Content-Type: application/http; msgtype=response\r\n'
+            'Content-Length: {}\r\n\r\n'
+        ).format(uuid.uuid4(), date, url, len(block))
+        # Compressed outside of the lock, the fetch threads only wait for the append
+        record: bytes = gzip.compress(warc_headers.encode('utf-8') + block + b'\r\n\r\n', self._compresslevel)
+        with self._lock:
+            offset: int = self._file.tell()
+            self._file.write(record)
+            self._rows.append((url, offset, len(record), status_code, date))
+            if len(self._rows) >= self._batch_size:
+                self._flush()
+        return offset
+
+    def _flush(self) -> None:
+        # The records reach the file before their index rows
+        self._file.flush()
+        if self._rows:
+            with self._index:
+                self._index.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?)', self._rows)
+            self._rows = []
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._file.close()
+            self._index.close()
+
+
+def _read_headers(stream: BinaryIO) -> Optional[Dict[str, str]]:
+    """Read header lines up to the blank line, None at the end of the stream."""
+    headers: Dict[str, str] = {}
+    line: bytes = stream.readline()
+    while line in (b'\r\n', b'\n'):
+        line = stream.readline()
+    if not line:
+        return None
+    headers[''] = line.decode('utf-8', errors='replace').strip()
+    for line in iter(stream.readline, b''):
+        if line in (b'\r\n', b'\n'):
+            break
+        key, _, value = line.decode('utf-8', errors='replace').partition(':')
+        headers[key.strip()] = value.strip()
+    return headers
+
+
+def _read_record(stream: BinaryIO) -> Optional[Tuple[Dict[str, str], bytes]]:
+    """Read the WARC headers and the block of the next record."""
+    headers: Optional[Dict[str, str]] = _read_headers(stream)
+    if headers is None:
+        return None
+    if not headers[''].startswith('WARC/'):
+        raise ValueError('Not a WARC record: {}'.format(headers['']))
+    block: bytes = stream.read(int(headers.get('Content-Length', 0)))
+    return headers, block
+
+
+def _parse_response(warc_headers: Dict[str, str], block: bytes) -> ArchivedResponse:
+    stream = io.BytesIO(block)
+    headers: Dict[str, str] = _read_headers(stream) or {'': 'HTTP/1.1 0'}
+    status_line: List[str] = headers.pop('').split()
+    return ArchivedResponse(
+        warc_headers.get('WARC-Target-URI', ''),
+        int(status_line[1]) if len(status_line) > 1 and status_line[1].isdigit() else 0,
+        headers,
+        stream.read(),
+        warc_headers.get('WARC-Date', '')
+    )
+
+
+def iter_archive(path: str) -> Iterator[ArchivedResponse]:
+    """Stream all responses of a .warc.gz file in the order they were written.
+
+    Records of other types, e.g. warcinfo or request records written by
+    other tools, are skipped.
+
+    Args:
+        path (str): Path of the archive.
+
+    Yields:
+        Iterator[ArchivedResponse]: Archived responses.
+    """
+    with gzip.open(path, 'rb') as stream:
+        while True:
+            record: Optional[Tuple[Dict[str, str], bytes]] = _read_record(stream)
+            if record is None:
+                return
+            warc_headers, block = record
+            if warc_headers.get('WARC-Type') == 'response':
+                yield _parse_response(warc_headers, block)
+
+
+def read_response(path: str, offset: int) -> ArchivedResponse:
+    """Read the single record at an offset of the index.
+
+    Args:
+        path (str): Path of the archive.
+        offset (int): Offset of the record.
+
+    Raises:
+        ValueError: Raised if there is no record at the offset.
+
+    Returns:
+        ArchivedResponse: Archived response.
+    """
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        with gzip.GzipFile(fileobj=file) as stream:
+            record: Optional[Tuple[Dict[str, str], bytes]] = _read_record(stream)
+    if record is None:
+        raise ValueError('No record at offset {} of {}'.format(offset, path))
+    return _parse_response(*record)
+
+
+def lookup(path: str, url: str) -> Optional[ArchivedResponse]:
+    """Latest archived response of an URL.
+
+    Args:
+        path (str): Path of the archive.
+        url (str): Canonical URL.
+
+    Returns:
+        Optional[ArchivedResponse]: Archived response, None if the URL is not in the index.
+    """
+    if not os.path.exists(index_path(path)):
+        return None
+    connection = sqlite3.connect(index_path(path))
+    try:
+        row = connection.execute('SELECT MAX(offset) FROM records WHERE url = ?', (url,)).fetchone()
+    finally:
+        connection.close()
+    return None if row[0] is None else read_response(path, row[0])
+
+
+def load_archive_writer(config: dict) -> Optional[ArchiveWriter]:
+    """Create the archive writer that is configured by `archive_path`.
+
+    Args:
+        config (dict): Crawler config.
+
+    Returns:
+        Optional[ArchiveWriter]: Writer, None if no archive is configured.
+    """
+    if not config.get("archive_path"):
+        return None
+    return ArchiveWriter(config["archive_path"], config.get("archive_compresslevel", DEFAULT_COMPRESSLEVEL))
@@ -0,0 +1,126 @@
+from hashlib import blake2b
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Iterable, Tuple
+
+HEADER_FORMAT: str = '<8sQQQQ'
+HEADER_SIZE: int = struct.calcsize(HEADER_FORMAT)
+MAGIC: bytes = b'GRAWTBF2'
+# Files of the first format have no generation, they are recreated
+OLD_MAGICS = frozenset({b'GRAWTBF1'})
+RESET_CHUNK_SIZE: int = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(url: str) -> Tuple[int, int]:
+    """Hash an URL to a fixed width 128 bit fingerprint.
+
+    Args:
+        url (str): URL to hash.
+
+    Returns:
+        Tuple[int, int]: The fingerprint split into two 64 bit halves.
+    """
+    digest: bytes = blake2b(url.encode(), digest_size=16).digest()
+    return struct.unpack('<QQ', digest)
+
+
+def optimal_parameters(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """Calculate the size of a bloom filter.
+
+    Args:
+        capacity (int): Expected number of entries.
+        error_rate (float): Accepted false positive rate.
+
+    Returns:
+        Tuple[int, int]: Number of bits and number of hash functions.
+    """
+    num_bits: int = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_bits = max(64, (num_bits + 63) // 64 * 64)
+    num_hashes: int = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter():
+    """Bloom filter of URL fingerprints in a memory mapped file.
+
+    Opening an existing filter only maps the file, the bit array is
+    paged in by the operating system when it is used.
+
+    The header carries a generation next to the entry counter. The owner
+    of the filter sets it to the generation of the store the filter
+    mirrors, a different value on the next start shows that the filter
+    missed writes.
+    """
+
+    def __init__(self, path: str, capacity: int = 10_000_000, error_rate: float = 0.001) -> None:
+        self.path: str = path
+        self.created: bool = not os.path.exists(path)
+        if not self.created:
+            with open(path, 'rb') as file:
+                if file.read(len(MAGIC)) in OLD_MAGICS:
+                    logger.info('Recreating the bloom filter %s of an older format', path, extra={'event': 'bloom_filter_upgraded'})
+                    self.created = True
+        if self.created:
+            num_bits, num_hashes = optimal_parameters(capacity, error_rate)
+            with open(path, 'wb') as file:
+                file.write(struct.pack(HEADER_FORMAT, MAGIC, num_bits, num_hashes, 0, 0))
+                file.truncate(HEADER_SIZE + num_bits // 8)
+        self._file = open(path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, self.num_bits, self.num_hashes, self.count, self.generation = struct.unpack_from(HEADER_FORMAT, self._mmap)
+        if magic != MAGIC:
+            raise ValueError('Not a bloom filter file: {}'.format(path))
+        self.capacity: int = capacity
+
+    def _positions(self, url: str) -> Iterable[int]:
+        first, second = fingerprint(url)
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, url: str) -> None:
+        """Add an URL to the filter.
+
+        Args:
+            url (str): URL to add.
+        """
+        data = self._mmap
+        for position in self._positions(url):
+            index: int = HEADER_SIZE + (position >> 3)
+            data[index] = data[index] | (1 << (position & 7))
+        self.count += 1
+        if self.count == self.capacity + 1:
+            logger.warning(
+                'Bloom filter %s exceeds its capacity, the false positive rate will rise.', self.path,
+                extra={'event': 'bloom_filter_full', 'path': self.path, 'capacity': self.capacity}
+            )
+
+    def __contains__(self, url: str) -> bool:
+        data = self._mmap
+        for position in self._positions(url):
+            if not data[HEADER_SIZE + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def reset(self) -> None:
+        """Remove all entries, the size of the filter stays the same.
+        """
+        for start in range(HEADER_SIZE, len(self._mmap), RESET_CHUNK_SIZE):
+            end: int = min(start + RESET_CHUNK_SIZE, len(self._mmap))
+            self._mmap[start:end] = bytes(end - start)
+        self.count = 0
+
+    def flush(self) -> None:
+        """Write the entry counter and the generation and flush the mapped pages to disk.
+        """
+        struct.pack_into(HEADER_FORMAT, self._mmap, 0, MAGIC, self.num_bits, self.num_hashes, self.count, self.generation)
+        self._mmap.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._mmap.close()
+        self._file.close()
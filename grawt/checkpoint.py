@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+from time import monotonic, time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from grawt.frontier import Frontier, MultiSiteFrontier, frontier_from_dict
+from grawt.retry import RetryQueue
+from grawt.scoring import LinkScorer
+
+CHECKPOINT_VERSION: int = 2
+DEFAULT_CHECKPOINT_INTERVAL: float = 60.0
+
+
+class Checkpointer():
+    """Periodic snapshot of a running crawl in a gzipped JSON file.
+
+    A checkpoint holds the queued URLs of the frontier, the waiting
+    retries, the URLs that were in flight and the number of articles that
+    were yielded, the output cursor. The file is replaced atomically, a
+    crash while writing keeps the previous checkpoint.
+
+    The depths of the visited URLs grow with the crawl and would make
+    every checkpoint slower than the one before. They go to a log next to
+    the checkpoint instead, `<path>.visited`, and every checkpoint only
+    appends the URLs that were visited since the previous one. The
+    checkpoint records the size of the log, whatever a crash appended
+    after it is ignored and overwritten.
+
+    The cursor may only count articles that reached the output, so
+    `flush` writes the batches of the sinks before every checkpoint.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        interval (float, optional): Seconds between two checkpoints. Defaults to 60.
+        yielded (int, optional): Articles yielded before a resume. Defaults to 0.
+        flush (Optional[Callable[[], None]], optional): Writes the buffered output, e.g. Crawler._flush_sinks. Defaults to None.
+        visited_log_size (int, optional): Size of the visited log of a resumed checkpoint. Defaults to 0, a new log.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+        yielded: int = 0,
+        flush: Optional[Callable[[], None]] = None,
+        visited_log_size: int = 0
+    ) -> None:
+        self.path: str = path
+        self.visited_log_path: str = path + '.visited'
+        self._visited_log_size: int = visited_log_size
+        self.interval: float = interval
+        self.yielded: int = yielded
+        self._flush: Optional[Callable[[], None]] = flush
+        self.in_flight: Dict[str, Tuple[int, int]] = {}
+        self._saved: float = monotonic()
+
+    def started(self, url: str, depth: int, attempt: int) -> None:
+        self.in_flight[url] = (depth, attempt)
+
+    def finished(self, url: str) -> None:
+        self.in_flight.pop(url, None)
+
+    def due(self) -> bool:
+        return monotonic() - self._saved >= self.interval
+
+    def save(self, frontier: Union[Frontier, MultiSiteFrontier], retries: RetryQueue) -> None:
+        """Write the checkpoint.
+
+        The seen store has to be flushed before, so every page that is not
+        in the checkpoint any more is also in the seen store. The output is
+        flushed here, every yielded article is written before the cursor.
+
+        Args:
+            frontier (Union[Frontier, MultiSiteFrontier]): Frontier of the crawl.
+            retries (RetryQueue): Retry queue of the crawl.
+        """
+        if self._flush is not None:
+            self._flush()
+        self._append_visited(frontier)
+        doc: dict = {
+            'version': CHECKPOINT_VERSION,
+            'time': time(),
+            'yielded': self.yielded,
+            'visited_log_size': self._visited_log_size,
+            'frontier': frontier.to_dict(visited=False),
+            'retries': [list(entry) for entry in retries.entries()],
+            'in_flight': [[url, depth, attempt] for url, (depth, attempt) in self.in_flight.items()]
+        }
+        temporary_path: str = self.path + '.tmp'
+        # compresslevel 1, the URLs compress well and the crawl should not wait
+        with gzip.open(temporary_path, 'wt', encoding='utf-8', compresslevel=1) as file:
+            json.dump(doc, file, separators=(',', ':'))
+        os.replace(temporary_path, self.path)
+        self._saved = monotonic()
+
+    def _append_visited(self, frontier: Union[Frontier, MultiSiteFrontier]) -> None:
+        changes: Dict[str, Dict[str, int]] = _visited_changes(frontier)
+        # A new log starts empty, a resumed one drops what was appended after its checkpoint
+        with open(self.visited_log_path, 'ab' if self._visited_log_size else 'wb') as file:
+            file.truncate(self._visited_log_size)
+            file.seek(self._visited_log_size)
+            # Every checkpoint appends a gzip member, gzip reads them as one stream
+            file.write(gzip.compress((json.dumps(changes, separators=(',', ':')) + '\n').encode('utf-8'), compresslevel=1))
+            self._visited_log_size = file.tell()
+
+    def remove(self) -> None:
+        """Delete the checkpoint of a finished crawl.
+        """
+        for path in [self.path, self.visited_log_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _visited_changes(frontier: Union[Frontier, MultiSiteFrontier]) -> Dict[str, Dict[str, int]]:
+    # The visited URLs per website, a frontier of a single website has the key ''
+    if isinstance(frontier, MultiSiteFrontier):
+        return frontier.visited_changes()
+    return {'': frontier.visited_changes()}
+
+
+def _read_visited_log(path: str, size: int) -> Dict[str, Dict[str, int]]:
+    with open(path, 'rb') as file:
+        data: bytes = file.read(size)
+    if len(data) < size:
+        raise ValueError('Truncated visited log of {} instead of {} bytes'.format(len(data), size))
+    visited: Dict[str, Dict[str, int]] = {}
+    # Depths are only ever lowered, so the later checkpoints win
+    for line in gzip.decompress(data).decode('utf-8').splitlines():
+        for site, changes in json.loads(line).items():
+            visited.setdefault(site, {}).update(changes)
+    return visited
+
+
+class RestoredCrawl():
+    """Crawl state read from a checkpoint.
+
+    URLs that were in flight are retried at once with their attempt
+    count. `replay` holds every URL that was not finished, these are
+    yielded again even if they reached the seen store after the
+    checkpoint was written.
+    """
+
+    def __init__(
+        self,
+        frontier: Union[Frontier, MultiSiteFrontier],
+        retries: RetryQueue,
+        yielded: int,
+        replay: Set[str],
+        visited_log_size: int = 0
+    ) -> None:
+        self.frontier: Union[Frontier, MultiSiteFrontier] = frontier
+        self.retries: RetryQueue = retries
+        self.yielded: int = yielded
+        self.replay: Set[str] = replay
+        self.visited_log_size: int = visited_log_size
+
+
+def _queued_urls(frontier_doc: dict) -> Iterable[str]:
+    if frontier_doc['type'] == 'multi_site_frontier':
+        for entry in frontier_doc['sites']:
+            yield from _queued_urls(entry['frontier'])
+        return
+    for entry in frontier_doc['queue']:
+        yield entry[0]
+
+
+def load_checkpoint(path: str, scorer: Optional[LinkScorer] = None) -> RestoredCrawl:
+    """Read a checkpoint written by a Checkpointer.
+
+    Args:
+        path (str): Path of the checkpoint file.
+        scorer (Optional[LinkScorer], optional): Scorer of a restored priority frontier. Defaults to the heuristics only.
+
+    Raises:
+        FileNotFoundError: Raised if there is no checkpoint, e.g. because the crawl finished.
+        ValueError: Raised for a checkpoint of an unknown version or frontier, or a truncated visited log.
+
+    Returns:
+        RestoredCrawl: Frontier, retries, output cursor and URLs to replay.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        doc: dict = json.load(file)
+    # Checkpoints of version 1 have the visited URLs in the frontier
+    if doc.get('version') not in (1, CHECKPOINT_VERSION):
+        raise ValueError('Unknown checkpoint version: {}'.format(doc.get('version')))
+    frontier: Union[Frontier, MultiSiteFrontier] = frontier_from_dict(doc['frontier'], scorer)
+    visited_log_size: int = doc.get('visited_log_size', 0)
+    if 'visited_log_size' in doc:
+        visited: Dict[str, Dict[str, int]] = _read_visited_log(path + '.visited', visited_log_size)
+        frontier.add_visited(visited if isinstance(frontier, MultiSiteFrontier) else visited.get('', {}))
+    retries = RetryQueue()
+    replay: Set[str] = set(_queued_urls(doc['frontier']))
+    entries: List[list] = doc['retries'] + [entry + [0.0] for entry in doc['in_flight']]
+    for url, depth, attempt, delay in entries:
+        retries.push(url, depth, attempt, delay)
+        replay.add(url)
+    return RestoredCrawl(frontier, retries, doc['yielded'], replay, visited_log_size)
+
+
+def load_checkpointer(config: dict, yielded: int = 0, flush: Optional[Callable[[], None]] = None) -> Optional[Checkpointer]:
+    """Create the checkpointer that is configured by `checkpoint_path`.
+
+    Args:
+        config (dict): Crawler config.
+        yielded (int, optional): Articles yielded before a resume. Defaults to 0.
+        flush (Optional[Callable[[], None]], optional): Writes the buffered output before every checkpoint. Defaults to None.
+
+    Returns:
+        Optional[Checkpointer]: Checkpointer, None if checkpoints are disabled.
+    """
+    if not config.get("checkpoint_path"):
+        return None
+    return Checkpointer(config["checkpoint_path"], config.get("checkpoint_interval", DEFAULT_CHECKPOINT_INTERVAL), yielded, flush)
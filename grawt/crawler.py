@@ -1,82 +1,378 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
 from hashlib import sha3_256
+import logging
 import os
-from time import sleep
-from typing import List, Set
-from urllib.parse import urlparse
-import json
-
-import requests
-from bs4 import BeautifulSoup
+from time import monotonic, perf_counter, sleep
+from typing import AsyncIterator, BinaryIO, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse
+from weakref import WeakSet
 
+from grawt.archive import ArchivedResponse, ArchiveWriter, iter_archive, load_archive_writer
+from grawt.checkpoint import DEFAULT_CHECKPOINT_INTERVAL, Checkpointer, RestoredCrawl, load_checkpoint, load_checkpointer
 from grawt.config_loader import load_config
+from grawt.dedup import ContentDeduplicator, fingerprint_text
+from grawt.distributed import SharedFrontier, load_shared_frontier
+from grawt.discovery import DiscoveredUrl, DiscoveryState, feed_links, iter_sitemap, newest_first, sitemaps_from_robots
+from grawt.document import Document, parse_document
+from grawt.fetcher import Fetcher, FetchResult, ResponseRejected
+from grawt.metadata import PageMetadata, read_metadata
+from grawt.frontier import DEFAULT_DEPTH_PENALTY, Frontier, MultiSiteFrontier, PriorityFrontier, SiteBudget
 from grawt.models import ScrapedArticle
+from grawt.retry import FailureStore, RetryPolicy, RetryQueue, check_status, classify_exception
+from grawt.scheduler import DisallowedByRobots, PolitenessScheduler
 from grawt.scraper.base_scraper import BaseScraper
+from grawt.scoring import LinkScorer, load_link_scorer
 from grawt.scraper.general_scraper import GeneralScraper
+from grawt.seen_store import BaseSeenStore, load_seen_store
+from grawt.sinks import BaseSink, load_sink
+from grawt.stats import CrawlStats, PageProfiler, collect_stages, serve_prometheus, setup_logging, stage
+from grawt.urls import UrlCanonicalizer, load_canonicalizer, same_site
 
 DEFAULT_CONFIG_PATH: str = "./config.yaml"
+DEFAULT_CONCURRENCY: int = 8
+SCRAPE_FULL: str = 'full'
+SCRAPE_LINKS: str = 'links'
+SCRAPE_HEAD: str = 'head'
+
+logger = logging.getLogger(__name__)
+
+
+def scrape_html(
+    url: str,
+    raw_html: str,
+    scraper: BaseScraper,
+    parser: str,
+    main_text_min_length: int,
+    metadata: Optional[PageMetadata] = None,
+    mode: str = SCRAPE_FULL,
+    fingerprint_min_length: Optional[int] = None
+) -> ScrapedArticle:
+    """Parse a downloaded page and scrape it.
+
+    Module level function, so it can run in the worker processes of
+    a ProcessPoolExecutor.
+
+    Args:
+        url (str): URL of the page.
+        raw_html (str): Raw html of the page.
+        scraper (BaseScraper): Scraper for the website.
+        parser (str): Parser backend.
+        main_text_min_length (int): Min length for a paragraph.
+        metadata (Optional[PageMetadata], optional): Metadata of the head, see grawt.metadata.read_metadata. Defaults to None.
+        mode (str, optional): SCRAPE_FULL, SCRAPE_LINKS to scrape only the links, SCRAPE_HEAD to skip the body. Defaults to SCRAPE_FULL.
+        fingerprint_min_length (Optional[int], optional): Fingerprint main texts of this length for the duplicate check, None for no fingerprint. Defaults to None.
+
+    Returns:
+        ScrapedArticle: Scraped article.
+    """
+    scraped_article: ScrapedArticle
+    if mode == SCRAPE_HEAD:
+        scraped_article = ScrapedArticle(hrefs=[], netloc_links=[])
+    else:
+        with stage('parse'):
+            document: Document = parse_document(raw_html, parser)
+        if mode == SCRAPE_LINKS:
+            scraped_article = scraper.scrape_links(document)
+        else:
+            scraped_article = scraper.scrape_document(document, main_text_min_length)
+            if fingerprint_min_length is not None:
+                # Hashing every shingle costs as much as the parse, so it runs here and not in the crawl loop
+                with stage('fingerprint'):
+                    scraped_article.fingerprint = fingerprint_text(scraped_article.main_text, fingerprint_min_length)
+    if metadata is not None:
+        scraper.apply_metadata(scraped_article, metadata)
+        if mode != SCRAPE_FULL:
+            # Same values as a full scrape of a page without headings and paragraphs
+            scraped_article.headline = scraped_article.headline or metadata.title or ''
+            scraped_article.main_text = ''
+        # Canonicalized and checked against the seen store by the crawler
+        scraped_article.canonical_url = metadata.canonical_url
+    scraped_article.url = url
+    return scraped_article
+
+
+def scrape_html_timed(
+    url: str,
+    raw_html: str,
+    scraper: BaseScraper,
+    parser: str,
+    main_text_min_length: int,
+    profiler: Optional[PageProfiler] = None,
+    metadata: Optional[PageMetadata] = None,
+    mode: str = SCRAPE_FULL,
+    fingerprint_min_length: Optional[int] = None
+) -> Tuple[ScrapedArticle, Dict[str, float]]:
+    """Run scrape_html and measure its stages, see grawt.stats.stage.
 
-class MaxRetriesReached(Exception):
-    pass
+    The timings are returned instead of recorded, so this works in the
+    worker processes of a ProcessPoolExecutor as well.
+
+    Args:
+        url (str): URL of the page.
+        raw_html (str): Raw html of the page.
+        scraper (BaseScraper): Scraper for the website.
+        parser (str): Parser backend.
+        main_text_min_length (int): Min length for a paragraph.
+        profiler (Optional[PageProfiler], optional): Keeps a cProfile of slow pages. Defaults to None.
+        metadata (Optional[PageMetadata], optional): Metadata of the head. Defaults to None.
+        mode (str, optional): How much of the page is scraped, see scrape_html. Defaults to SCRAPE_FULL.
+        fingerprint_min_length (Optional[int], optional): Min length of a fingerprinted main text, see scrape_html. Defaults to None.
+
+    Returns:
+        Tuple[ScrapedArticle, Dict[str, float]]: Scraped article and seconds per stage.
+    """
+    with collect_stages() as timings, profiler.profile(url) if profiler is not None else nullcontext():
+        start: float = perf_counter()
+        scraped_article: ScrapedArticle = scrape_html(
+            url, raw_html, scraper, parser, main_text_min_length, metadata, mode, fingerprint_min_length
+        )
+        timings['scrape'] = perf_counter() - start
+    return scraped_article, timings
+
+
+def scrape_archived(
+    response: ArchivedResponse,
+    scraper: BaseScraper,
+    parser: str,
+    main_text_min_length: int,
+    metadata: bool = True
+) -> ScrapedArticle:
+    """Decode and scrape an archived response, in a worker process of Crawler.reextract.
+
+    Args:
+        response (ArchivedResponse): Response read from an archive.
+        scraper (BaseScraper): Scraper for the website.
+        parser (str): Parser backend.
+        main_text_min_length (int): Min length for a paragraph.
+        metadata (bool, optional): Use the structured metadata of the head. Defaults to True.
+
+    Returns:
+        ScrapedArticle: Scraped article.
+    """
+    raw_html: str = response.text
+    return scrape_html(response.url, raw_html, scraper, parser, main_text_min_length, read_metadata(raw_html) if metadata else None)
 
 
 class Crawler():
 
     def __init__(self, config_path: str = DEFAULT_CONFIG_PATH) -> None:
         self._config = load_config(config_path)
-        self._general_scraper = GeneralScraper()
+        setup_logging(self._config)
+        self.stats = CrawlStats()
+        self._stats_path: Optional[str] = self._config.get("stats_path")
+        self._stats_interval: float = self._config.get("stats_interval", 10.0)
+        self._stats_written: float = monotonic()
+        self._stats_server = None
+        if self._config.get("stats_port"):
+            self._stats_server = serve_prometheus(self.stats, self._config["stats_port"])
+        self._profiler: Optional[PageProfiler] = None
+        if self._config.get("profile_slow_pages") is not None:
+            self._profiler = PageProfiler(self._config.get("profile_dir", "./profiles"), self._config["profile_slow_pages"])
+        self._priority: bool = self._config.get("frontier", "bfs") == "priority"
+        self._depth_penalty: float = self._config.get("priority_depth_penalty", DEFAULT_DEPTH_PENALTY)
+        # Pages of a crawl without priority frontier still teach the scores of a later one
+        self._link_scorer: Optional[LinkScorer] = None
+        if self._priority or self._config.get("link_scores_path"):
+            self._link_scorer = load_link_scorer(self._config)
+        self._budget: Optional[SiteBudget] = None
+        self._budget_offsets: Tuple[float, float] = (0.0, 0.0)
+        self._budget_spent: bool = False
+        self._general_scraper = GeneralScraper(anchor_texts=self._priority)
+        self._metadata_fast_path: bool = self._config.get("metadata_fast_path", True)
         self._scrapers: List[BaseScraper] = [
             # To be filled
         ]
-        self._urls_file: str = self._config["urls_file_path"]
-        self._check_urls_file()
-        self._urls: List[str] = self._load_urls_file()
+        self._seen_store: BaseSeenStore = load_seen_store(self._config)
+        self._fetcher = Fetcher(self._config)
+        self._canonicalizer: UrlCanonicalizer = load_canonicalizer(self._config)
+        self._duplicates: Optional[str] = self._config.get("duplicates")
+        self._deduplicator: Optional[ContentDeduplicator] = None
+        if self._duplicates in ("drop", "link"):
+            self._deduplicator = ContentDeduplicator(
+                self._config.get("fingerprint_store_path") or ':memory:',
+                self._config.get("duplicate_max_distance", 3),
+                self._config.get("duplicate_min_length", 200)
+            )
+        self._retry_policy = RetryPolicy(
+            self._config.get("max_retries", 5),
+            self._config.get("url_retry_delay", 1.0),
+            self._config.get("max_retry_delay", 300.0)
+        )
+        self._archive: Optional[ArchiveWriter] = load_archive_writer(self._config)
+        self._failures = FailureStore(
+            self._config.get("failure_store_path") or ':memory:',
+            self._config.get("max_failed_runs", 3),
+            self._config.get("dead_url_ttl", 30 * 86400)
+        )
+        # URLs of a resumed crawl that were not finished before the checkpoint
+        self._replay: Set[str] = set()
+        # URLs the current crawl gave up on, crawl_new_iter does not move its point in time past them
+        self._failed_urls: Set[str] = set()
+        # Sinks that get the articles of this crawler, flushed before every checkpoint
+        self._sinks: 'WeakSet[BaseSink]' = WeakSet()
+        self._scheduler: Optional[PolitenessScheduler] = None
+        if self._config.get("politeness", False):
+            self._scheduler = PolitenessScheduler(self._config, self._fetch_robots)
 
-    def _check_urls_file(self) -> None:
-        """ Check if urls file exists and create one in case it is not.
+    def close(self) -> None:
+        """Persist the seen store and close the pooled connections.
         """
-        if not os.path.exists(self._urls_file):
-            with open(self._urls_file, 'w') as file:
-                json.dump([], file)
+        if self._stats_path:
+            self.stats.write_prometheus(self._stats_path)
+        if self._stats_server is not None:
+            self._stats_server.shutdown()
+        self._seen_store.close()
+        self._fetcher.close()
+        self._failures.close()
+        if self._deduplicator is not None:
+            self._deduplicator.close()
+        if self._link_scorer is not None:
+            self._link_scorer.close()
+        if self._archive is not None:
+            self._archive.close()
+
+    def open_sink(self, output_path: Optional[str] = None) -> BaseSink:
+        """Open the result sink configured by `output_sink` and `output_path`.
 
-    def _load_urls_file(self) -> List[str]:
-        """ Load urls file using json.
+        Args:
+            output_path (Optional[str], optional): Path that overrides `output_path`, e.g. one file per worker. Defaults to None.
 
         Returns:
-            List[str]: List with hashed URLs.
+            BaseSink: Sink for the scraped articles.
         """
-        with open(self._urls_file, 'r') as file:
-            return json.load(file)
+        sink: BaseSink = load_sink(self._config if output_path is None else dict(self._config, output_path=output_path))
+        self.attach_sink(sink)
+        return sink
+
+    def attach_sink(self, sink: BaseSink) -> None:
+        """Flush a sink before every checkpoint, sinks of open_sink are attached already.
+
+        Without it, a crash loses the articles of the current batch,
+        the checkpoint counts them as done.
 
-    def _write_urls_file(self) -> None:
-        """Write urls to json file
+        Args:
+            sink (BaseSink): Sink that gets the articles of this crawler.
         """
-        with open(self._urls_file, 'w') as file:
-            json.dump(self._urls, file)
+        self._sinks.add(sink)
 
+    def _flush_sinks(self) -> None:
+        for sink in list(self._sinks):
+            sink.flush()
 
-    def _load_url(self, url: str, retry: int = 0) -> str:
+    def _load_url(self, url: str) -> str:
         """Download the raw html text from an url.
 
+        Failed downloads are not retried here, the crawl engines put them
+        into their retry queue.
+
         Args:
             url (str): URL to the source.
-            retry (int, optional): Recursive retry state variable. Defaults to 0.
 
         Raises:
-            MaxRetriesReached: Raised when the maximum amount of retries is reached.
+            DisallowedByRobots: Raised when the robots.txt of the host disallows the URL.
+            FetchFailed: Raised for a 4xx or 5xx response.
+            ResponseRejected: Raised when the response is no HTML or larger than `max_body_size`.
+            requests.RequestException: Raised on connection errors and timeouts.
+
+        Returns:
+            str: The raw html in form of a string, decoded once with the detected charset.
+        """
+        if self._scheduler is not None and not self._scheduler.allowed(url):
+            raise DisallowedByRobots('Disallowed by robots.txt: {}'.format(url))
+
+        result: FetchResult = self._fetch(url)
+        check_status(url, result.status_code, result.headers.get('Retry-After'))
+        return result.text
+
+    def _fetch(self, url: str) -> FetchResult:
+        """Fetch an URL once the politeness scheduler allows it.
+
+        Args:
+            url (str): URL to fetch.
 
         Returns:
-            str: The raw html in form of a string.
+            FetchResult: Downloaded response.
+        """
+        started: Optional[float] = None
+        if self._scheduler is not None:
+            with self.stats.timer('politeness_wait'):
+                started = self._scheduler.acquire(url)
+        result: Optional[FetchResult] = None
+        try:
+            with self.stats.timer('fetch'):
+                result = self._fetcher.fetch(url, html_only=True)
+            self.stats.incr('http_responses', status=result.status_code)
+            if result.from_cache:
+                self.stats.incr('http_cache_hits')
+            else:
+                self.stats.incr('bytes_downloaded', len(result.content))
+            if self._archive is not None and 200 <= result.status_code < 300:
+                with self.stats.timer('archive'):
+                    self._archive.write(url, result.status_code, result.headers, result.content)
+            return result
+        finally:
+            if self._scheduler is not None:
+                if result is None:
+                    self._scheduler.release(url, started=started)
+                else:
+                    self._scheduler.release(url, result.status_code, result.headers.get('Retry-After'), started)
+
+    @contextmanager
+    def _open_stream(self, url: str) -> Iterator[BinaryIO]:
+        """Open a sitemap or feed without reading it into memory.
+
+        Local paths and file:// URLs are opened from disk, e.g. fixture files.
+
+        Args:
+            url (str): URL or path of the file.
+
+        Raises:
+            DisallowedByRobots: Raised when the robots.txt of the host disallows the URL.
+            FetchFailed: Raised for a 4xx or 5xx response.
+
+        Yields:
+            Iterator[BinaryIO]: Stream of the body.
         """
-        if retry > self._config["max_retries"]:
-            raise MaxRetriesReached('Reached maximum amount of retries.')
+        parsed = urlparse(url)
+        if parsed.scheme in ('', 'file'):
+            with open(parsed.path if parsed.scheme else url, 'rb') as file:
+                yield file
+            return
+        started: Optional[float] = None
+        if self._scheduler is not None:
+            if not self._scheduler.allowed(url):
+                raise DisallowedByRobots('Disallowed by robots.txt: {}'.format(url))
+            started = self._scheduler.acquire(url)
+        status_code: Optional[int] = None
+        retry_after: Optional[str] = None
+        try:
+            with self._fetcher.stream(url) as response:
+                status_code, retry_after = response.status_code, response.headers.get('Retry-After')
+                check_status(url, status_code, retry_after)
+                yield response.raw
+        finally:
+            if self._scheduler is not None:
+                self._scheduler.release(url, status_code, retry_after, started)
 
+    def _fetch_robots(self, robots_url: str) -> Optional[str]:
+        """Download a robots.txt for the politeness scheduler.
+
+        Args:
+            robots_url (str): URL of the robots.txt.
+
+        Returns:
+            Optional[str]: Content of the robots.txt or None if it is not available.
+        """
         try:
-            return requests.get(url).text
+            result: FetchResult = self._fetcher.fetch(robots_url)
         except Exception as e:
-            print(str(e))
-            retry += 1
-            sleep(self._config["url_retry_delay"])
-            return self._load_url(url, retry)
+            logger.warning('Could not fetch %s: %s', robots_url, e, extra={'event': 'robots_failed', 'url': robots_url})
+            return None
+        return result.text if result.status_code == 200 else None
 
     def _choose_scraper(self, netloc: str) -> BaseScraper:
         """Based on the domain name choose a custom scraper or use the GeneralScraper.
@@ -92,104 +388,1061 @@ class Crawler():
                 return scraper
         return self._general_scraper
 
-    def _single_scrape(self, url: str) -> ScrapedArticle:
+    def _single_scrape(self, url: str, leaf: bool = False) -> ScrapedArticle:
         """Load the url, choose the scraper and scrape the URL.
 
         Args:
             url (str): URL to scrape.
+            leaf (bool, optional): True if the links of the page are not followed. Defaults to False.
 
         Returns:
             ScrapedArticle: Scraped article.
         """
+        raw_html, metadata, mode = self._load_page(url, leaf)
+        article, timings = scrape_html_timed(
+            url, raw_html, *self._scrape_args(url), self._profiler, metadata, mode, self._fingerprint_min_length()
+        )
+        self.stats.observe_all(timings)
+        return article
+
+    def _load_page(self, url: str, leaf: bool) -> Tuple[str, Optional[PageMetadata], str]:
+        """Load the url and decide from its head how much of the page has to be scraped.
+
+        Args:
+            url (str): URL to load.
+            leaf (bool): True if the links of the page are not followed.
+
+        Returns:
+            Tuple[str, Optional[PageMetadata], str]: Raw html, metadata of the head and scrape mode, see scrape_html.
+        """
         raw_html: str = self._load_url(url)
-        netloc: str = urlparse(url).netloc
-        soup: BeautifulSoup = BeautifulSoup(raw_html, 'html.parser')
-        scraper: BaseScraper = self._choose_scraper(netloc)
-        scraped_article: ScrapedArticle = scraper.scrape_article(soup, self._config.get("main_text_min_length", 150))
-        scraped_article.url = url
-        return scraped_article
-
-    def _recursive_crawl_site(
-        self, 
-        url: str, 
-        netloc_source: str,
-        max_depth: int = 2, 
-        depth: int = 0, 
-        scraped_articles: Set[ScrapedArticle] = set()
-    ) -> Set[ScrapedArticle]:
-        """Scrape the website and the sub urls.
+        if not self._metadata_fast_path:
+            return raw_html, None, SCRAPE_FULL
+        with self.stats.timer('head'):
+            metadata: Optional[PageMetadata] = read_metadata(raw_html)
+        return raw_html, metadata, self._scrape_mode(url, leaf, metadata)
+
+    def _scrape_mode(self, url: str, leaf: bool, metadata: Optional[PageMetadata]) -> str:
+        """Skip the parts of a page that are not needed.
+
+        The text of a hub is not needed, only its links. With `duplicates`
+        configured, neither is the text of a page whose canonical URL was
+        already scraped. At the maximum depth, not even the links are
+        needed and the body is not parsed at all.
 
-        The scraper only takes URLs into account that have the
-        same domain name.
+        Args:
+            url (str): URL of the page.
+            leaf (bool): True if the links of the page are not followed.
+            metadata (Optional[PageMetadata]): Metadata of the head.
+
+        Returns:
+            str: SCRAPE_FULL, SCRAPE_LINKS or SCRAPE_HEAD.
+        """
+        if metadata is None:
+            return SCRAPE_FULL
+        reduced: str = SCRAPE_HEAD if leaf else SCRAPE_LINKS
+        if metadata.is_hub:
+            self.stats.incr('pages_reduced', reason='hub', mode=reduced)
+            return reduced
+        if self._duplicates in ("drop", "link") and url not in self._replay:
+            canonical: Optional[str] = self._declared_canonical(url, metadata.canonical_url)
+            if canonical is not None:
+                with self.stats.timer('seen_store'):
+                    seen: bool = canonical in self._seen_store
+                if seen:
+                    self.stats.incr('pages_reduced', reason='seen_canonical', mode=reduced)
+                    return reduced
+        return SCRAPE_FULL
+
+    def _declared_canonical(self, url: str, declared: Optional[str]) -> Optional[str]:
+        """Canonical form of the canonical URL that a page declares in its head.
+
+        Args:
+            url (str): URL of the page.
+            declared (Optional[str]): <link rel="canonical">, JSON-LD or og:url of the page.
+
+        Returns:
+            Optional[str]: Canonical URL, None if the page declares none or itself.
+        """
+        if not declared:
+            return None
+        canonical: Optional[str] = self._canonicalizer.canonicalize(declared, url)
+        # Some websites declare their homepage as canonical URL of every page
+        if canonical is None or canonical == url or urlparse(canonical).path in ('', '/'):
+            return None
+        return canonical
+
+    def _scrape_args(self, url: str) -> Tuple[BaseScraper, str, int]:
+        """Scraper, parser and min text length used for an URL.
+
+        Args:
+            url (str): URL to scrape.
+
+        Returns:
+            Tuple[BaseScraper, str, int]: Arguments for scrape_html after url and raw_html.
+        """
+        scraper: BaseScraper = self._choose_scraper(urlparse(url).netloc)
+        return scraper, self._config.get("parser", "html.parser"), self._config.get("main_text_min_length", 150)
+
+    def _fingerprint_min_length(self) -> Optional[int]:
+        """Min length of the main texts that the parse step fingerprints, None without duplicate detection."""
+        return self._deduplicator.min_length if self._deduplicator is not None else None
+
+    def _skip_before_fetch(self, url: str, depth: int, frontier: Frontier) -> bool:
+        """Decide without any network I/O whether an URL has to be fetched.
+
+        Pages that were scraped in a previous run are only downloaded again
+        if their links are still needed, meaning they are not at the
+        maximum depth of the crawl.
+
+        Args:
+            url (str): URL taken from the frontier.
+            depth (int): Depth of the URL.
+            frontier (Frontier): Frontier of the current crawl.
+
+        Returns:
+            bool: True if the URL can be skipped.
+        """
+        if frontier.is_leaf(depth) and url not in self._replay:
+            with self.stats.timer('seen_store'):
+                seen: bool = url in self._seen_store
+            if seen:
+                self.stats.incr('pages_skipped', reason='seen')
+                logger.info('Skipped an already scraped article: %s', url, extra={'event': 'skipped_seen', 'url': url})
+                return True
+        if self._failures.is_dead(url):
+            self.stats.incr('pages_skipped', reason='dead')
+            logger.info('Skipped a dead URL: %s', url, extra={'event': 'skipped_dead', 'url': url})
+            return True
+        return False
+
+    def _next_entry(self, frontier: Frontier, retries: RetryQueue) -> Optional[Tuple[str, int, int]]:
+        """Take a due retry or else the next URL of the frontier.
+
+        Args:
+            frontier (Frontier): Frontier of the current crawl.
+            retries (RetryQueue): Retry queue of the current crawl.
+
+        Returns:
+            Optional[Tuple[str, int, int]]: URL, depth and retry attempt, None if nothing can be started now.
+        """
+        if self._budget_exhausted():
+            return None
+        retry: Optional[Tuple[str, int, int]] = retries.pop_due()
+        if retry is not None:
+            return retry
+        if not frontier:
+            return None
+        entry: Optional[Tuple[str, int]] = frontier.pop()
+        if entry is None:
+            return None
+        return entry[0], entry[1], 0
+
+    def _handle_failure(self, url: str, depth: int, attempt: int, error: Exception, retries: RetryQueue) -> None:
+        """Schedule a retry for a failed page or record that it was given up.
+
+        Args:
+            url (str): URL of the page.
+            depth (int): Depth of the page.
+            attempt (int): Number of retries that already happened.
+            error (Exception): Raised exception.
+            retries (RetryQueue): Retry queue of the current crawl.
+        """
+        if isinstance(error, DisallowedByRobots):
+            # Expected on every website that disallows parts of it, neither retried nor recorded as failure
+            self.stats.incr('pages_skipped', reason='robots')
+            logger.debug('Skipped %s', error, extra={'event': 'skipped_robots', 'url': url})
+            return
+        kind: str = classify_exception(error)
+        if isinstance(error, ResponseRejected):
+            # Expected for links to files, recorded so later runs skip them
+            self.stats.incr('pages_skipped', reason=kind)
+            logger.info('Skipped %s', error, extra={'event': 'rejected', 'url': url, 'kind': kind})
+            self._failures.record(url, kind, str(error))
+            return
+        if self._retry_policy.should_retry(kind, attempt):
+            self.stats.incr('retries', kind=kind)
+            retries.push(url, depth, attempt + 1, self._retry_policy.delay(attempt, getattr(error, 'retry_after', None)))
+        else:
+            self.stats.incr('failures', kind=kind)
+            logger.warning(
+                'Gave up on %s: %s', url, error,
+                extra={'event': 'failed', 'url': url, 'kind': kind, 'attempts': attempt + 1}
+            )
+            self._failures.record(url, kind, str(error), getattr(error, 'status_code', None))
+            self._failed_urls.add(url)
+
+    def _handle_article(
+        self,
+        url: str,
+        depth: int,
+        article: ScrapedArticle,
+        frontier: Frontier
+    ) -> bool:
+        """Record a scraped page and push its links to the frontier.
+
+        With `duplicates` configured, a page whose declared canonical URL
+        was already scraped is a duplicate of that page. Other new articles
+        are compared with the fingerprints of all earlier articles. A copy
+        of an earlier article is dropped or gets the URL of the earlier
+        article as canonical_url.
+
+        Args:
+            url (str): URL of the page.
+            depth (int): Depth of the page.
+            article (ScrapedArticle): Scraped page.
+            frontier (Frontier): Frontier of the current crawl.
+
+        Returns:
+            bool: True if the article was not scraped before and is not a dropped duplicate.
+        """
+        self._failures.clear(url)
+        with self.stats.timer('seen_store'):
+            is_new: bool = url not in self._seen_store
+            if is_new:
+                self._seen_store.add(url)
+        if url in self._replay:
+            # Scraped after the last checkpoint, but maybe not written by the consumer
+            self._replay.discard(url)
+            is_new = True
+        if is_new:
+            self.stats.incr('articles_scraped')
+            logger.info('Scraped %s', url, extra={'event': 'scraped', 'url': url, 'depth': depth})
+        else:
+            self.stats.incr('articles_seen')
+            logger.info('Found an already scraped article: %s', url, extra={'event': 'seen', 'url': url})
+        declared: Optional[str] = self._declared_canonical(url, article.canonical_url)
+        article.canonical_url = None
+        if is_new and self._deduplicator is not None:
+            if declared is not None:
+                with self.stats.timer('seen_store'):
+                    if declared in self._seen_store:
+                        article.canonical_url = declared
+            if article.canonical_url is None:
+                with self.stats.timer('dedup'):
+                    if article.fingerprint is not None:
+                        article.canonical_url = self._deduplicator.check_fingerprint(url, article.fingerprint)
+                    else:
+                        # Texts below the min length return at once, other ones were scraped without fingerprint
+                        article.canonical_url = self._deduplicator.check(url, article.main_text)
+            if article.canonical_url is not None:
+                self.stats.incr('duplicates', action=self._duplicates)
+                if self._duplicates == "drop":
+                    logger.info(
+                        'Dropped a duplicate of %s: %s', article.canonical_url, url,
+                        extra={'event': 'duplicate', 'url': url, 'canonical_url': article.canonical_url}
+                    )
+                    is_new = False
+        article.fingerprint = None
+
+        if self._link_scorer is not None and article.canonical_url is None:
+            # The text of a duplicate may not have been scraped
+            self._link_scorer.record(url, bool(article.main_text))
+
+        anchors: Optional[Dict[str, str]] = self._canonicalize_article_links(url, article)
+        if not frontier.is_leaf(depth):
+            frontier.push_links(article.netloc_links, depth + 1, url, anchors)
+        self._strip_links(article)
+        return is_new
+
+    def _canonicalize_article_links(self, url: str, article: ScrapedArticle) -> Optional[Dict[str, str]]:
+        """Replace the links of an article by their canonical forms.
+
+        Frontier and seen store only ever see canonical URLs.
+
+        Args:
+            url (str): URL of the page.
+            article (ScrapedArticle): Scraped page.
+
+        Returns:
+            Optional[Dict[str, str]]: Link text per canonical link, None if the scraper collected no link texts.
+        """
+        with self.stats.timer('canonicalize'):
+            if article.anchor_texts is None:
+                article.netloc_links = self._canonicalizer.canonicalize_links(article.netloc_links or [], url)
+                return None
+            anchors: Dict[str, str] = self._canonicalizer.canonicalize_anchors(article.netloc_links or [], article.anchor_texts, url)
+            article.netloc_links, article.anchor_texts = list(anchors), list(anchors.values())
+            return anchors
+
+    def _strip_links(self, article: ScrapedArticle) -> None:
+        if not self._config.get("keep_links", True):
+            article.hrefs = None
+            article.netloc_links = None
+            article.anchor_texts = None
+
+    def _canonical_seed(self, url: str) -> str:
+        """Canonical form of a starting URL.
 
         Args:
             url (str): Starting URL.
-            netloc_source (str): Domain of the starting URL.
-            max_depth (int, optional): Maximum recursive depth. Defaults to 2.
-            depth (int, optional): Recursive depth state variable. Defaults to 0.
-            scraped_articles (Set[ScrapedArticle], optional): Recursive state variable for the scraped articles. Defaults to set().
+
+        Raises:
+            ValueError: Raised if the URL is not an absolute http or https URL.
 
         Returns:
-            Set[ScrapedArticle]: Set of scraped articles.
+            str: Canonical URL.
+        """
+        canonical: Optional[str] = self._canonicalizer.canonicalize(url)
+        if canonical is None:
+            raise ValueError('Not an absolute http(s) URL: {}'.format(url))
+        return canonical
+
+    def _flush_stores(self) -> None:
+        self._seen_store.flush()
+        if self._deduplicator is not None:
+            self._deduplicator.flush()
+        if self._link_scorer is not None:
+            self._link_scorer.flush()
+        if self._archive is not None:
+            self._archive.flush()
+        if self._stats_path:
+            self.stats.write_prometheus(self._stats_path)
+
+    def _record_progress(self, frontier: Frontier, retries: RetryQueue, in_flight: int = 0) -> None:
+        """Update the queue gauges and write the stats file every `stats_interval` seconds.
+
+        Args:
+            frontier (Frontier): Frontier of the current crawl.
+            retries (RetryQueue): Retry queue of the current crawl.
+            in_flight (int, optional): Pages being fetched or parsed. Defaults to 0.
+        """
+        self.stats.gauge('frontier_size', len(frontier))
+        self.stats.gauge('retry_queue_size', len(retries))
+        self.stats.gauge('in_flight', in_flight)
+        if self._stats_path and monotonic() - self._stats_written >= self._stats_interval:
+            self._stats_written = monotonic()
+            self.stats.write_prometheus(self._stats_path)
+
+    def _save_checkpoint(self, checkpointer: Checkpointer, frontier: Frontier, retries: RetryQueue) -> None:
+        # Every page that left the checkpoint has to be in the seen store
+        self._flush_stores()
+        with self.stats.timer('checkpoint'):
+            checkpointer.save(frontier, retries)
+
+    def _finish_checkpoint(self, checkpointer: Optional[Checkpointer], frontier: Frontier, retries: RetryQueue, finished: bool) -> None:
+        self._replay = set()
+        if checkpointer is None:
+            return
+        if finished:
+            checkpointer.remove()
+        else:
+            checkpointer.save(frontier, retries)
+            logger.info(
+                'Saved a checkpoint to %s after %d articles', checkpointer.path, checkpointer.yielded,
+                extra={'event': 'checkpoint', 'path': checkpointer.path, 'yielded': checkpointer.yielded}
+            )
+
+    def _start_budget(self) -> None:
+        """Start the crawl wide budget of `max_pages`, `max_bytes` and `max_seconds`.
+
+        Pages and bytes are counted from the fetched responses, so pages
+        that are skipped before the fetch do not use up the budget.
         """
-        if depth > max_depth:
+        limits: Tuple[Optional[int], Optional[float], Optional[int]] = (
+            self._config.get("max_pages"), self._config.get("max_seconds"), self._config.get("max_bytes")
+        )
+        self._budget_spent = False
+        if all(limit is None for limit in limits):
+            self._budget = None
             return
+        self._budget = SiteBudget(*limits)
+        self._budget.start()
+        self._budget_offsets = (self.stats.counter('http_responses'), self.stats.counter('bytes_downloaded'))
+
+    def _budget_exhausted(self) -> bool:
+        """Check the crawl wide budget, pages in flight may still finish beyond it.
+
+        Returns:
+            bool: True if no further page may be started.
+        """
+        if self._budget is None:
+            return False
+        if self._budget_spent:
+            return True
+        self._budget.pages = int(self.stats.counter('http_responses') - self._budget_offsets[0])
+        self._budget.bytes = int(self.stats.counter('bytes_downloaded') - self._budget_offsets[1])
+        if not self._budget.exhausted():
+            return False
+        logger.info(
+            'Crawl budget exhausted after %d pages and %d bytes', self._budget.pages, self._budget.bytes,
+            extra={'event': 'budget_exhausted', 'pages': self._budget.pages, 'bytes': self._budget.bytes}
+        )
+        self._budget_spent = True
+        return True
+
+    def _idle_wait(self, frontier: Frontier, retries: RetryQueue) -> Optional[float]:
+        """Seconds to wait when no URL can be started now.
+
+        Args:
+            frontier (Frontier): Frontier of the current crawl.
+            retries (RetryQueue): Retry queue of the current crawl.
+
+        Returns:
+            Optional[float]: Time until the next retry or poll of the frontier, None if the crawl is over.
+        """
+        if self._budget_exhausted():
+            return None
+        waits: List[float] = [wait for wait in (retries.wait_time(), frontier.wait_time()) if wait is not None]
+        return min(waits) if waits else None
+
+    def _new_frontier(self, max_depth: int, site: str) -> Frontier:
+        """Frontier of a single website, breadth first or best first as configured by `frontier`.
+
+        Args:
+            max_depth (int): Maximum crawl depth.
+            site (str): Host of the website.
+
+        Returns:
+            Frontier: Empty frontier.
+        """
+        if self._priority:
+            return PriorityFrontier(max_depth, site, self._link_scorer, self._depth_penalty)
+        return Frontier(max_depth, site)
+
+    def _uses_async_engine(self) -> bool:
+        return (self._config.get("concurrency") or 1) > 1 or (self._config.get("parse_workers") or 0) > 0
+
+    def crawl_iter(self, url: str, max_depth: int = 2, depth: int = 0) -> Iterator[ScrapedArticle]:
+        """Crawl the website and yield every new article as soon as it is scraped.
+
+        Only the frontier and the seen store are kept in memory, not the
+        scraped articles. Uses the asyncio engine if `concurrency` or
+        `parse_workers` is configured, its event loop runs while the
+        next article is requested.
+
+        Args:
+            url (str): Starting URL.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            depth (int, optional): Depth of the starting URL. Defaults to 0.
+
+        Returns:
+            Iterator[ScrapedArticle]: Scraped articles.
+        """
+        url = self._canonical_seed(url)
+        frontier = self._new_frontier(max_depth, urlparse(url).netloc)
+        frontier.push(url, depth)
+        return self._iter_frontier(frontier)
+
+    def resume(self, checkpoint_path: Optional[str] = None) -> Iterator[ScrapedArticle]:
+        """Continue a crawl from its last checkpoint.
+
+        Pages that were finished before the checkpoint are not fetched
+        again. Pages that were queued, waiting for a retry or in flight are
+        crawled and yielded, even if they were scraped after the checkpoint,
+        so no article is lost but a few may be yielded twice. The resumed
+        crawl keeps writing checkpoints to the same file.
+
+        Args:
+            checkpoint_path (Optional[str], optional): Checkpoint file. Defaults to the `checkpoint_path` config value.
+
+        Raises:
+            ValueError: Raised if no checkpoint path is given or configured.
+            FileNotFoundError: Raised if there is no checkpoint, e.g. because the crawl finished.
+
+        Returns:
+            Iterator[ScrapedArticle]: Scraped articles that were not yielded before the checkpoint.
+        """
+        path: Optional[str] = checkpoint_path or self._config.get("checkpoint_path")
+        if not path:
+            raise ValueError('No checkpoint_path configured')
+        restored: RestoredCrawl = load_checkpoint(path, self._link_scorer)
+        self._replay = restored.replay
+        logger.info(
+            'Resuming from %s after %d articles, %d URLs left', path, restored.yielded, len(restored.replay),
+            extra={'event': 'resume', 'path': path, 'yielded': restored.yielded, 'urls': len(restored.replay)}
+        )
+        checkpointer = Checkpointer(
+            path, self._config.get("checkpoint_interval", DEFAULT_CHECKPOINT_INTERVAL), restored.yielded, self._flush_sinks,
+            restored.visited_log_size
+        )
+        return self._iter_frontier(restored.frontier, restored.retries, checkpointer)
+
+    def reextract(self, archive_path: Optional[str] = None, workers: Optional[int] = None) -> Iterator[ScrapedArticle]:
+        """Scrape the pages of an archive again, without any network I/O.
+
+        Every successful response of the archive is scraped with the
+        current scrapers and `main_text_min_length`, e.g. after a scraper
+        was fixed. The pages are parsed by a pool of processes and the
+        articles are yielded in archive order. The seen store is neither
+        read nor updated, an URL that was archived by several crawls is
+        yielded once per crawl.
+
+        Args:
+            archive_path (Optional[str], optional): Path of the .warc.gz file. Defaults to the `archive_path` config value.
+            workers (Optional[int], optional): Number of parse processes, 1 parses in a single thread. Defaults to `parse_workers` or the number of CPUs.
+
+        Raises:
+            ValueError: Raised if no archive path is given or configured.
+
+        Yields:
+            Iterator[ScrapedArticle]: Scraped articles.
+        """
+        path: Optional[str] = archive_path or self._config.get("archive_path")
+        if not path:
+            raise ValueError('No archive_path configured')
+        if workers is None:
+            workers = self._config.get("parse_workers") or os.cpu_count() or 1
+        responses: Iterator[ArchivedResponse] = (
+            response for response in iter_archive(path) if 200 <= response.status_code < 300
+        )
+        # One thread is the same as parsing in this process, but keeps a single code path
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else ThreadPoolExecutor(max_workers=1)
+        # A bounded window keeps the archive streaming instead of reading it into memory
+        window: Deque[Tuple[str, Future]] = deque()
+        try:
+            for response in responses:
+                window.append((
+                    response.url,
+                    executor.submit(scrape_archived, response, *self._scrape_args(response.url), self._metadata_fast_path)
+                ))
+                while len(window) >= workers * 4 or (window and window[0][1].done()):
+                    article: Optional[ScrapedArticle] = self._reextracted(*window.popleft())
+                    if article is not None:
+                        yield article
+            while window:
+                article = self._reextracted(*window.popleft())
+                if article is not None:
+                    yield article
+        finally:
+            for _, future in window:
+                future.cancel()
+            executor.shutdown(wait=True)
 
-        article: ScrapedArticle
+    def _reextracted(self, url: str, future: Future) -> Optional[ScrapedArticle]:
+        """Finish an article of reextract, failures are logged and skipped."""
         try:
-            article: ScrapedArticle = self._single_scrape(url)
-            if url in self._urls:
-                print('Found an already scraped article: {}'.format(url))
-            else:
-                self._urls.append(url)
-                scraped_articles.add(article)
-                print('Scraped {}'.format(url))
+            article: ScrapedArticle = future.result()
         except Exception as e:
-            print(str(e))
-            return
+            self.stats.incr('failures', kind=classify_exception(e))
+            logger.warning('Could not scrape %s again: %s', url, e, extra={'event': 'reextract_failed', 'url': url})
+            return None
+        self._canonicalize_article_links(url, article)
+        self._strip_links(article)
+        self.stats.incr('articles_reextracted')
+        return article
 
-        depth += 1
-        link: str
-        for link in article.netloc_links:
-            if netloc_source not in link:
+    def discover(self, url: str, since: Optional[datetime] = None, sitemaps: Optional[Iterable[str]] = None) -> List[str]:
+        """Find new articles of a website in its sitemaps and feeds.
+
+        Without `sitemaps`, the sitemaps are taken from the robots.txt and
+        the feeds from the <link rel="alternate"> tags of the page at
+        `url`, '/sitemap.xml' is the fallback. Sitemap indexes are
+        followed, every file is parsed as a stream and may be gzipped.
+
+        Args:
+            url (str): Homepage of the website.
+            since (Optional[datetime], optional): Only URLs modified after this point in time, unless they have no date. Defaults to None.
+            sitemaps (Optional[Iterable[str]], optional): Sitemap and feed URLs or local paths to read instead. Defaults to None.
+
+        Returns:
+            List[str]: Canonical URLs of the website that are not in the seen store, newest first.
+        """
+        discovered, _ = self._discover(url, since, sitemaps)
+        return [entry.url for entry in discovered]
+
+    def _discover(
+        self,
+        url: str,
+        since: Optional[datetime],
+        sitemaps: Optional[Iterable[str]]
+    ) -> Tuple[List[DiscoveredUrl], List[str]]:
+        """Implementation of discover that also reports the sources it could not read.
+
+        Args:
+            url (str): Homepage of the website.
+            since (Optional[datetime]): Only URLs modified after this point in time, unless they have no date.
+            sitemaps (Optional[Iterable[str]]): Sitemap and feed URLs or local paths to read instead.
+
+        Returns:
+            Tuple[List[DiscoveredUrl], List[str]]: New URLs with their dates, newest first, and the failed sitemaps and feeds.
+        """
+        url = self._canonical_seed(url)
+        parsed = urlparse(url)
+        sources: List[str] = list(sitemaps or [])
+        failed: List[str] = []
+        if not sources:
+            sources.extend(sitemaps_from_robots(self._fetch_robots('{}://{}/robots.txt'.format(parsed.scheme, parsed.netloc))))
+            try:
+                document: Document = parse_document(self._load_url(url), self._config.get("parser", "html.parser"))
+                sources.extend(urljoin(url, feed) for feed in feed_links(document))
+            except Exception as e:
+                logger.warning('Could not look for feeds on %s: %s', url, e, extra={'event': 'feeds_failed', 'url': url})
+                failed.append(url)
+            if not sources:
+                sources.append('{}://{}/sitemap.xml'.format(parsed.scheme, parsed.netloc))
+
+        found: Dict[str, DiscoveredUrl] = {}
+        queue: Deque[str] = deque(sources)
+        read: Set[str] = set()
+        max_sitemaps: int = self._config.get("discovery_max_sitemaps", 1000)
+        while queue and len(read) < max_sitemaps:
+            source: str = queue.popleft()
+            if source in read:
                 continue
-            self._recursive_crawl_site(
-                link, 
-                netloc_source=netloc_source, 
-                max_depth=max_depth, 
-                depth=depth, 
-                scraped_articles=scraped_articles
+            read.add(source)
+            base_url: Optional[str] = source if urlparse(source).scheme in ('http', 'https') else url
+            try:
+                with self._open_stream(source) as stream:
+                    for entry in iter_sitemap(stream):
+                        # A sitemap of an index is only read if it changed since the last run
+                        if not entry.is_newer(since):
+                            continue
+                        if entry.is_sitemap:
+                            queue.append(urljoin(base_url, entry.url.strip()))
+                            continue
+                        canonical: Optional[str] = self._canonicalizer.canonicalize(entry.url, base_url)
+                        if canonical is None or canonical in found or not same_site(canonical, parsed.netloc):
+                            continue
+                        if canonical not in self._seen_store and not self._failures.is_dead(canonical):
+                            found[canonical] = DiscoveredUrl(canonical, entry.lastmod)
+            except Exception as e:
+                logger.warning('Could not read the sitemap %s: %s', source, e, extra={'event': 'sitemap_failed', 'url': source})
+                failed.append(source)
+        self.stats.incr('urls_discovered', len(found))
+        logger.info(
+            'Discovered %d new URLs in %d sitemaps and feeds of %s', len(found), len(read), parsed.netloc,
+            extra={'event': 'discovered', 'site': parsed.netloc, 'urls': len(found), 'sitemaps': len(read)}
+        )
+        return newest_first(found.values()), failed
+
+    def crawl_new_iter(self, url: str, max_depth: int = 0, sitemaps: Optional[Iterable[str]] = None) -> Iterator[ScrapedArticle]:
+        """Crawl only the articles that were published since the last run.
+
+        The URLs come from discover with the start of the last finished
+        run as `since`, the run times are kept in `discovery_state_path`.
+        With max_depth above 0 the links of the new articles are followed.
+
+        A run only counts as finished if every sitemap and feed was read.
+        Otherwise, and for discovered articles that could not be
+        downloaded, the next run looks at the same period again.
+
+        Args:
+            url (str): Homepage of the website.
+            max_depth (int, optional): Maximum crawl depth from the discovered articles. Defaults to 0.
+            sitemaps (Optional[Iterable[str]], optional): Sitemap and feed URLs or local paths to read instead. Defaults to None.
+
+        Yields:
+            Iterator[ScrapedArticle]: Scraped articles.
+        """
+        state = DiscoveryState(self._config.get("discovery_state_path", "./discovery.json"))
+        site: str = urlparse(self._canonical_seed(url)).netloc
+        started: datetime = datetime.now(timezone.utc)
+        frontier = self._new_frontier(max_depth, site)
+        discovered, failed_sources = self._discover(url, state.last_run(site), sitemaps)
+        for entry in discovered:
+            frontier.push(entry.url, 0)
+        yield from self._iter_frontier(frontier)
+        # Only a finished run moves the point in time forward
+        if self._budget_spent:
+            return
+        if failed_sources:
+            logger.warning(
+                'Keeping the last run of %s, %d sitemaps and feeds could not be read', site, len(failed_sources),
+                extra={'event': 'discovery_incomplete', 'site': site, 'sources': failed_sources}
             )
-        return scraped_articles
+            return
+        # Not past the oldest article that failed, so the next run discovers it again
+        failed_dates: List[datetime] = [
+            entry.lastmod for entry in discovered if entry.lastmod is not None and entry.url in self._failed_urls
+        ]
+        if failed_dates:
+            started = min(started, min(failed_dates) - timedelta(microseconds=1))
+        state.finish_run(site, started)
+
+    def crawl_sites_iter(
+        self,
+        seeds: Iterable[str],
+        max_depth: int = 2,
+        weights: Optional[Dict[str, float]] = None,
+        max_pages_per_site: Optional[int] = None,
+        max_seconds_per_site: Optional[float] = None
+    ) -> Iterator[ScrapedArticle]:
+        """Crawl several websites at once and yield every new article.
+
+        Every website has its own frontier, the websites take turns in a
+        weighted round robin. With the asyncio engine a website never has
+        more than `max_in_flight_per_site` pages in flight, so one slow
+        website can not block the others.
+
+        Args:
+            seeds (Iterable[str]): Starting URLs, one or more per website.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            weights (Optional[Dict[str, float]], optional): Share of the turns per domain name. Defaults to 1 for every website.
+            max_pages_per_site (Optional[int], optional): Page budget per website. Defaults to None.
+            max_seconds_per_site (Optional[float], optional): Wall clock budget per website. Defaults to None.
+
+        Raises:
+            ValueError: Raised for a weight that is not greater than 0.
+
+        Returns:
+            Iterator[ScrapedArticle]: Scraped articles.
+        """
+        max_in_flight: Optional[int] = self._config.get("max_in_flight_per_site")
+        if max_in_flight is None and self._scheduler is not None:
+            max_in_flight = self._config.get("max_per_host", 2)
+        frontier = MultiSiteFrontier(
+            [self._canonical_seed(seed) for seed in seeds],
+            max_depth,
+            weights=weights,
+            max_pages=max_pages_per_site,
+            max_seconds=max_seconds_per_site,
+            max_in_flight=max_in_flight,
+            scorer=self._link_scorer if self._priority else None,
+            depth_penalty=self._depth_penalty
+        )
+        return self._iter_frontier(frontier)
+
+    def crawl_sites(
+        self,
+        seeds: Iterable[str],
+        max_depth: int = 2,
+        weights: Optional[Dict[str, float]] = None,
+        max_pages_per_site: Optional[int] = None,
+        max_seconds_per_site: Optional[float] = None
+    ) -> Set[ScrapedArticle]:
+        """Crawl several websites at once, see crawl_sites_iter.
+
+        Args:
+            seeds (Iterable[str]): Starting URLs, one or more per website.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            weights (Optional[Dict[str, float]], optional): Share of the turns per domain name. Defaults to 1 for every website.
+            max_pages_per_site (Optional[int], optional): Page budget per website. Defaults to None.
+            max_seconds_per_site (Optional[float], optional): Wall clock budget per website. Defaults to None.
+
+        Returns:
+            Set[ScrapedArticle]: Set of scraped articles.
+        """
+        return set(self.crawl_sites_iter(seeds, max_depth, weights, max_pages_per_site, max_seconds_per_site))
+
+    def crawl_distributed_iter(
+        self,
+        seeds: Iterable[str],
+        worker_id: int,
+        workers: int,
+        max_depth: int = 2
+    ) -> Iterator[ScrapedArticle]:
+        """Crawl together with other worker processes or machines.
+
+        All workers share the frontier in `frontier_store_path` and the
+        seen store, every worker is started with the same seeds. URLs are
+        partitioned by host, so every host is fetched by one worker and
+        the politeness limits stay local. A worker that stops renewing its
+        lease for `worker_lease_seconds` is replaced by another worker
+        until it is restarted. Every worker returns when the whole crawl
+        is finished.
+
+        Args:
+            seeds (Iterable[str]): Starting URLs, one or more per website.
+            worker_id (int): Number of this worker, from 0 to workers - 1.
+            workers (int): Number of workers.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+
+        Raises:
+            ValueError: Raised for the 'json' and 'bloom' seen stores, their files can not be written by several workers.
+
+        Yields:
+            Iterator[ScrapedArticle]: Articles scraped by this worker.
+        """
+        if self._config.get("seen_store", "json") != "sqlite":
+            raise ValueError('The distributed mode needs a shared seen store, use sqlite')
+        frontier: SharedFrontier = load_shared_frontier(
+            self._config, worker_id, workers, [self._canonical_seed(seed) for seed in seeds], max_depth
+        )
+        try:
+            yield from self._iter_frontier(frontier)
+        finally:
+            frontier.close()
+
+    def _iter_frontier(
+        self,
+        frontier: Frontier,
+        retries: Optional[RetryQueue] = None,
+        checkpointer: Optional[Checkpointer] = None
+    ) -> Iterator[ScrapedArticle]:
+        """Crawl the URLs of a frontier with the configured engine.
+
+        With `checkpoint_path` configured, the state of the crawl is saved
+        every `checkpoint_interval` seconds and when the crawl stops early.
+        The checkpoint is removed once the crawl finished.
+
+        With `max_pages`, `max_bytes` or `max_seconds` configured, no page
+        is started once the budget is used up. The crawl then stops after
+        the pages in flight, and keeps its checkpoint.
+
+        Args:
+            frontier (Frontier): Frontier with the starting URLs.
+            retries (Optional[RetryQueue], optional): Retries of a resumed crawl. Defaults to None.
+            checkpointer (Optional[Checkpointer], optional): Checkpointer of a resumed crawl. Defaults to the configured one.
+
+        Yields:
+            Iterator[ScrapedArticle]: Scraped articles.
+        """
+        if checkpointer is None and not isinstance(frontier, SharedFrontier):
+            # A shared frontier is persistent by itself
+            checkpointer = load_checkpointer(self._config, flush=self._flush_sinks)
+        if self._uses_async_engine():
+            yield from self._iterate_async(self._aiter_frontier(frontier, retries=retries, checkpointer=checkpointer))
+            return
+
+        if retries is None:
+            retries = RetryQueue()
+        self._failed_urls.clear()
+        self._start_budget()
+        finished: bool = False
+        try:
+            while frontier or retries:
+                if checkpointer is not None and checkpointer.due():
+                    self._save_checkpoint(checkpointer, frontier, retries)
+                entry: Optional[Tuple[str, int, int]] = self._next_entry(frontier, retries)
+                if entry is None:
+                    wait: Optional[float] = self._idle_wait(frontier, retries)
+                    if wait is None:
+                        break
+                    # Every other URL is done, only retries or other workers are left
+                    sleep(wait)
+                    continue
+                page_url, page_depth, attempt = entry
+                if checkpointer is not None:
+                    checkpointer.started(page_url, page_depth, attempt)
+                article: Optional[ScrapedArticle] = None
+                if not self._skip_before_fetch(page_url, page_depth, frontier):
+                    try:
+                        article = self._single_scrape(page_url, frontier.is_leaf(page_depth))
+                    except Exception as e:
+                        self._handle_failure(page_url, page_depth, attempt, e, retries)
+                is_new: bool = article is not None and self._handle_article(page_url, page_depth, article, frontier)
+                frontier.done(page_url)
+                self._record_progress(frontier, retries)
+                if checkpointer is not None:
+                    checkpointer.finished(page_url)
+                    checkpointer.yielded += is_new
+                if is_new:
+                    yield article
+            # A crawl stopped by its budget keeps the checkpoint to continue later
+            finished = not self._budget_spent
+        finally:
+            self._flush_stores()
+            self._finish_checkpoint(checkpointer, frontier, retries, finished)
+
+    def _iterate_async(self, articles: AsyncIterator[ScrapedArticle]) -> Iterator[ScrapedArticle]:
+        """Drive an async iterator from synchronous code.
+
+        Args:
+            articles (AsyncIterator[ScrapedArticle]): Async iterator of articles.
+
+        Raises:
+            RuntimeError: Raised when called from a running event loop, run_until_complete would fail there.
+
+        Yields:
+            Iterator[ScrapedArticle]: Articles of the async iterator.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError('The asyncio engine can not be driven from a running event loop, use acrawl_iter instead')
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(articles.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(articles.aclose())
+            loop.close()
 
     def crawl_site(
         self, 
         url: str, 
         max_depth: int = 2, 
         depth: int = 0, 
-        scraped_articles: Set[ScrapedArticle] = set()
+        scraped_articles: Optional[Set[ScrapedArticle]] = None
     ) -> Set[ScrapedArticle]:
-        """Calls the recursive scraping function.
+        """Crawl the website breadth first, level by level.
+
+        The crawler only takes URLs into account that have the
+        same domain name. Every URL is fetched at most once per crawl.
 
         Args:
             url (str): Starting URL.
-            max_depth (int, optional): Maximum recursive depth. Defaults to 2. Defaults to 2.
-            depth (int, optional): Recursive depth state variable. Defaults to 0.
-            scraped_articles (Set[ScrapedArticle], optional): Recursive state variable for the scraped articles. Defaults to set().
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            depth (int, optional): Depth of the starting URL. Defaults to 0.
+            scraped_articles (Set[ScrapedArticle], optional): Set the scraped articles are added to. Defaults to a new set.
 
         Returns:
             Set[ScrapedArticle]: Set of scraped articles.
         """
-        netloc_source: str = urlparse(url).netloc
-        scraped_articles: Set[ScrapedArticle] = self._recursive_crawl_site(
-            url, 
-            netloc_source=netloc_source, 
-            max_depth=max_depth, 
-            depth=depth, 
-            scraped_articles=scraped_articles
-        )
-        self._write_urls_file()
         if scraped_articles is None:
-            return []
-        else:
-            return scraped_articles
+            scraped_articles = set()
+        scraped_articles.update(self.crawl_iter(url, max_depth=max_depth, depth=depth))
+        return scraped_articles
+
+    async def crawl_site_async(
+        self,
+        url: str,
+        max_depth: int = 2,
+        depth: int = 0,
+        concurrency: Optional[int] = None,
+        parse_workers: Optional[int] = None
+    ) -> Set[ScrapedArticle]:
+        """Crawl the website with the asyncio engine and collect the articles.
+
+        Args:
+            url (str): Starting URL.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            depth (int, optional): Depth of the starting URL. Defaults to 0.
+            concurrency (int, optional): Number of fetches in flight. Defaults to the `concurrency` config value, 8 if it is not set.
+            parse_workers (int, optional): Number of parse processes. Defaults to the `parse_workers` config value.
+
+        Returns:
+            Set[ScrapedArticle]: Set of scraped articles.
+        """
+        scraped_articles: Set[ScrapedArticle] = set()
+        async for article in self.acrawl_iter(url, max_depth, depth, concurrency, parse_workers):
+            scraped_articles.add(article)
+        return scraped_articles
+
+    async def acrawl_iter(
+        self,
+        url: str,
+        max_depth: int = 2,
+        depth: int = 0,
+        concurrency: Optional[int] = None,
+        parse_workers: Optional[int] = None
+    ) -> AsyncIterator[ScrapedArticle]:
+        """Crawl the website with a bounded pool of concurrent fetches.
+
+        Same traversal as crawl_iter (max_depth, same domain filtering),
+        but up to `concurrency` pages are downloaded and scraped at the
+        same time. The blocking downloads run in a thread pool, the
+        bookkeeping stays on the event loop.
+
+        With `parse_workers` the parsing and scraping runs in a pool of
+        processes instead. At most `parse_queue_size` downloaded pages wait
+        for a parse worker, further downloads hold their fetch slot until
+        a worker is free. This keeps the memory bounded when parsing falls
+        behind fetching.
+
+        Args:
+            url (str): Starting URL.
+            max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+            depth (int, optional): Depth of the starting URL. Defaults to 0.
+            concurrency (int, optional): Number of fetches in flight. Defaults to the `concurrency` config value, 8 if it is not set.
+            parse_workers (int, optional): Number of parse processes, 0 parses in the fetch threads. Defaults to the `parse_workers` config value.
+
+        Yields:
+            AsyncIterator[ScrapedArticle]: Scraped articles.
+        """
+        url = self._canonical_seed(url)
+        frontier = self._new_frontier(max_depth, urlparse(url).netloc)
+        frontier.push(url, depth)
+        async for article in self._aiter_frontier(frontier, concurrency, parse_workers):
+            yield article
+
+    async def _aiter_frontier(
+        self,
+        frontier: Frontier,
+        concurrency: Optional[int] = None,
+        parse_workers: Optional[int] = None,
+        retries: Optional[RetryQueue] = None,
+        checkpointer: Optional[Checkpointer] = None
+    ) -> AsyncIterator[ScrapedArticle]:
+        """Crawl the URLs of a frontier with the asyncio engine.
+
+        Args:
+            frontier (Frontier): Frontier with the starting URLs.
+            concurrency (int, optional): Number of fetches in flight. Defaults to the `concurrency` config value, 8 if it is not set.
+            parse_workers (int, optional): Number of parse processes. Defaults to the `parse_workers` config value.
+            retries (Optional[RetryQueue], optional): Retries of a resumed crawl. Defaults to None.
+            checkpointer (Optional[Checkpointer], optional): Saves the state of the crawl. Defaults to None.
+
+        Yields:
+            AsyncIterator[ScrapedArticle]: Scraped articles.
+        """
+        if concurrency is None:
+            # Unset in the config, the async entry points are concurrent while crawl_iter stays serial
+            concurrency = self._config.get("concurrency") or DEFAULT_CONCURRENCY
+        if parse_workers is None:
+            parse_workers = self._config.get("parse_workers") or 0
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        parse_executor: Optional[ProcessPoolExecutor] = None
+        if parse_workers > 0:
+            parse_executor = ProcessPoolExecutor(max_workers=parse_workers)
+            # Pages being parsed plus pages waiting in the queue
+            parse_slots = asyncio.Semaphore(parse_workers + self._config.get("parse_queue_size", parse_workers))
+
+        async def fetch(page_url: str, page_depth: int, attempt: int) -> Tuple[str, int, int, Optional[ScrapedArticle], Optional[Exception]]:
+            error: Optional[Exception] = None
+            article: Optional[ScrapedArticle] = None
+            try:
+                if parse_executor is None:
+                    article = await loop.run_in_executor(executor, self._single_scrape, page_url, frontier.is_leaf(page_depth))
+                else:
+                    raw_html, metadata, mode = await loop.run_in_executor(executor, self._load_page, page_url, frontier.is_leaf(page_depth))
+                    async with parse_slots:
+                        article, timings = await loop.run_in_executor(
+                            parse_executor, scrape_html_timed, page_url, raw_html, *self._scrape_args(page_url), self._profiler, metadata, mode,
+                            self._fingerprint_min_length()
+                        )
+                    self.stats.observe_all(timings)
+            except Exception as e:
+                error = e
+            return page_url, page_depth, attempt, article, error
+
+        if retries is None:
+            retries = RetryQueue()
+        self._failed_urls.clear()
+        self._start_budget()
+        pending: Set[asyncio.Future] = set()
+        finished: bool = False
+        try:
+            while frontier or pending or retries:
+                if checkpointer is not None and checkpointer.due():
+                    self._save_checkpoint(checkpointer, frontier, retries)
+                while len(pending) < concurrency:
+                    entry: Optional[Tuple[str, int, int]] = self._next_entry(frontier, retries)
+                    if entry is None:
+                        break
+                    page_url, page_depth, attempt = entry
+                    if self._skip_before_fetch(page_url, page_depth, frontier):
+                        frontier.done(page_url)
+                    else:
+                        if checkpointer is not None:
+                            checkpointer.started(page_url, page_depth, attempt)
+                        pending.add(asyncio.ensure_future(fetch(page_url, page_depth, attempt)))
+                if not pending:
+                    # Nothing in flight, the frontier is empty or only has exhausted websites left
+                    wait: Optional[float] = self._idle_wait(frontier, retries)
+                    if wait is None:
+                        break
+                    await asyncio.sleep(wait)
+                    continue
+                # Wake up for the next retry if there is a free fetch slot for it
+                timeout: Optional[float] = retries.wait_time() if len(pending) < concurrency else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page_url, page_depth, attempt, article, error = task.result()
+                    if error is not None:
+                        self._handle_failure(page_url, page_depth, attempt, error, retries)
+                    is_new: bool = article is not None and self._handle_article(page_url, page_depth, article, frontier)
+                    frontier.done(page_url)
+                    self._record_progress(frontier, retries, len(pending))
+                    if checkpointer is not None:
+                        checkpointer.finished(page_url)
+                        checkpointer.yielded += is_new
+                    if is_new:
+                        yield article
+            finished = not self._budget_spent
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            executor.shutdown(wait=False)
+            if parse_executor is not None:
+                parse_executor.shutdown(wait=False)
+            self._flush_stores()
+            self._finish_checkpoint(checkpointer, frontier, retries, finished)
@@ -0,0 +1,217 @@
+from hashlib import blake2b
+import re
+import sqlite3
+from threading import Lock
+from typing import List, Optional, Tuple
+
+SIMHASH_BITS: int = 64
+DEFAULT_MAX_DISTANCE: int = 3
+DEFAULT_MIN_LENGTH: int = 200
+DEFAULT_BATCH_SIZE: int = 100
+_WORD = re.compile(r'\w+')
+_SIGN_BIT: int = 1 << (SIMHASH_BITS - 1)
+_MASK: int = (1 << SIMHASH_BITS) - 1
+# Maps every byte to 1 if the bit is set, else to 0
+_BIT_TABLES: List[bytes] = [bytes(value >> bit & 1 for value in range(256)) for bit in range(8)]
+
+
+def content_hash(text: str) -> bytes:
+    """Exact fingerprint of a text, ignoring case and whitespace.
+
+    Args:
+        text (str): Main text of an article.
+
+    Returns:
+        bytes: 128 bit digest.
+    """
+    return blake2b(' '.join(text.lower().split()).encode('utf-8'), digest_size=16).digest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64 bit SimHash over the word shingles of a text.
+
+    Texts that share most of their shingles get fingerprints that differ
+    in only a few bits.
+
+    Args:
+        text (str): Main text of an article.
+        shingle_size (int, optional): Words per shingle. Defaults to 3.
+
+    Returns:
+        int: Unsigned 64 bit fingerprint.
+    """
+    words: List[str] = _WORD.findall(text.lower())
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    digests: bytes = b''.join(blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    threshold: float = len(shingles) / 2
+    fingerprint: int = 0
+    # Bit counts with C level slicing and counting instead of a loop over every bit of every digest
+    for position in range(8):
+        column: bytes = digests[position::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) > threshold:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def fingerprint_text(text: Optional[str], min_length: int = DEFAULT_MIN_LENGTH) -> Optional[Tuple[bytes, int]]:
+    """Content hash and SimHash of a text, the expensive part of a duplicate check.
+
+    Module level function, so it can run in the parse workers while
+    ContentDeduplicator.check_fingerprint only does the index lookup.
+
+    Args:
+        text (Optional[str]): Main text of an article.
+        min_length (int, optional): Shorter texts are not fingerprinted. Defaults to DEFAULT_MIN_LENGTH.
+
+    Returns:
+        Optional[Tuple[bytes, int]]: Content hash and SimHash, None for a short text.
+    """
+    if not text or len(text) < min_length:
+        return None
+    return content_hash(text), simhash(text)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64 bit
+    return value - (1 << SIMHASH_BITS) if value & _SIGN_BIT else value
+
+
+class ContentDeduplicator():
+    """Persistent index of article fingerprints to find copies of the same article.
+
+    Every article gets an exact content hash and a SimHash. The SimHash
+    is split into `max_distance + 1` bands, two fingerprints within
+    `max_distance` bits share at least one band. Only articles that share
+    a band are compared, so a lookup costs a few index queries no matter
+    how many articles are stored.
+
+    Texts shorter than `min_length` are not fingerprinted, overview pages
+    with little text would look alike.
+    """
+
+    def __init__(
+        self,
+        path: str = ':memory:',
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        min_length: int = DEFAULT_MIN_LENGTH,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        self._max_distance: int = max_distance
+        self._min_length: int = min_length
+        self._batch_size: int = batch_size
+        self._bands: int = max_distance + 1
+        self._band_bits: int = -(-SIMHASH_BITS // self._bands)
+        self._uncommitted: int = 0
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints ('
+            'url TEXT PRIMARY KEY, content_hash BLOB, simhash INTEGER, canonical_url TEXT) WITHOUT ROWID'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS fingerprints_content_hash ON fingerprints (content_hash)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS simhash_bands (band_key INTEGER, url TEXT, PRIMARY KEY (band_key, url)) WITHOUT ROWID'
+        )
+        self._connection.commit()
+
+    @property
+    def min_length(self) -> int:
+        return self._min_length
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        mask: int = (1 << self._band_bits) - 1
+        return [
+            _signed(band << self._band_bits | (fingerprint >> (band * self._band_bits) & mask)) for band in range(self._bands)
+        ]
+
+    def check(self, url: str, text: Optional[str]) -> Optional[str]:
+        """Look up the canonical copy of an article and index the article.
+
+        Args:
+            url (str): URL of the article.
+            text (Optional[str]): Main text of the article.
+
+        Returns:
+            Optional[str]: URL of the first stored copy if the article is a duplicate, else None.
+        """
+        return self.check_fingerprint(url, fingerprint_text(text, self._min_length))
+
+    def check_fingerprint(self, url: str, fingerprints: Optional[Tuple[bytes, int]]) -> Optional[str]:
+        """Same as check, with the fingerprints of fingerprint_text.
+
+        Args:
+            url (str): URL of the article.
+            fingerprints (Optional[Tuple[bytes, int]]): Content hash and SimHash of the main text, None for a short text.
+
+        Returns:
+            Optional[str]: URL of the first stored copy if the article is a duplicate, else None.
+        """
+        if fingerprints is None:
+            return None
+        exact, fingerprint = fingerprints
+        band_keys: List[int] = self._band_keys(fingerprint)
+        with self._lock:
+            previous: Optional[Tuple[int, Optional[str]]] = self._connection.execute(
+                'SELECT simhash, canonical_url FROM fingerprints WHERE url = ?', (url,)
+            ).fetchone()
+            if previous is not None and previous[1] is None:
+                # The article was recrawled, its old fingerprint leaves the index
+                self._connection.executemany(
+                    'DELETE FROM simhash_bands WHERE band_key = ? AND url = ?',
+                    ((key, url) for key in self._band_keys(previous[0] & _MASK))
+                )
+            canonical_url: Optional[str] = self._find(url, exact, fingerprint, band_keys)
+            self._connection.execute(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)', (url, exact, _signed(fingerprint), canonical_url)
+            )
+            if canonical_url is None:
+                # Only originals are indexed, duplicates point to them
+                self._connection.executemany('INSERT INTO simhash_bands VALUES (?, ?)', ((key, url) for key in band_keys))
+            self._uncommitted += 1
+            if self._uncommitted >= self._batch_size:
+                self._commit()
+            return canonical_url
+
+    def _find(self, url: str, exact: bytes, fingerprint: int, band_keys: List[int]) -> Optional[str]:
+        row: Optional[Tuple[str, Optional[str]]] = self._connection.execute(
+            'SELECT url, canonical_url FROM fingerprints WHERE content_hash = ? AND url != ? LIMIT 1', (exact, url)
+        ).fetchone()
+        if row is not None:
+            # A recrawled original finds its own duplicates
+            canonical_url: str = row[1] or row[0]
+            return canonical_url if canonical_url != url else None
+        candidates = self._connection.execute(
+            'SELECT DISTINCT f.url, f.simhash FROM simhash_bands b JOIN fingerprints f ON f.url = b.url '
+            'WHERE b.band_key IN ({}) AND b.url != ?'.format(','.join('?' * len(band_keys))),
+            (*band_keys, url)
+        ).fetchall()
+        best: Optional[Tuple[int, str]] = None
+        for candidate_url, candidate_hash in candidates:
+            distance: int = hamming_distance(fingerprint, candidate_hash & _MASK)
+            if distance <= self._max_distance and (best is None or distance < best[0]):
+                best = (distance, candidate_url)
+        return best[1] if best is not None else None
+
+    def _commit(self) -> None:
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM fingerprints').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._connection.close()
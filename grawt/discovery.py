@@ -0,0 +1,224 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import gzip
+import io
+import json
+import logging
+import os
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+from dateutil import parser as date_parser
+
+from grawt.document import Document
+
+FEED_TYPES: List[str] = ['application/rss+xml', 'application/atom+xml']
+_GZIP_MAGIC: bytes = b'\x1f\x8b'
+_ENTRY_TAGS = ('url', 'sitemap', 'item', 'entry')
+_DATE_TAGS = ('lastmod', 'publication_date', 'pubDate', 'updated', 'published')
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveredUrl():
+    """URL listed in a sitemap or feed.
+
+    Args:
+        url (str): Listed URL.
+        lastmod (Optional[datetime]): Last modification or publication date in UTC, None if not listed.
+        is_sitemap (bool): True for the child sitemaps of a sitemap index.
+    """
+
+    __slots__ = ('url', 'lastmod', 'is_sitemap')
+
+    def __init__(self, url: str, lastmod: Optional[datetime] = None, is_sitemap: bool = False) -> None:
+        self.url: str = url
+        self.lastmod: Optional[datetime] = lastmod
+        self.is_sitemap: bool = is_sitemap
+
+    def is_newer(self, since: Optional[datetime]) -> bool:
+        """Check if the URL changed after a point in time.
+
+        Args:
+            since (Optional[datetime]): Start of the last run, None for the first run.
+
+        Returns:
+            bool: True if the URL changed after since or has no date.
+        """
+        return since is None or self.lastmod is None or self.lastmod > since
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse the W3C datetimes of sitemaps and the RFC 822 dates of RSS feeds.
+
+    Args:
+        value (Optional[str]): Date string.
+
+    Returns:
+        Optional[datetime]: Date in UTC, dates without time zone are taken as UTC. None if invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    parsed: Optional[datetime] = None
+    try:
+        # fromisoformat is much faster than dateutil but only accepts 'Z' since Python 3.11
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            try:
+                parsed = date_parser.parse(value)
+            except (ValueError, OverflowError):
+                return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def sitemaps_from_robots(robots_txt: Optional[str]) -> List[str]:
+    """Sitemap URLs listed in a robots.txt.
+
+    Args:
+        robots_txt (Optional[str]): Content of the robots.txt.
+
+    Returns:
+        List[str]: Sitemap URLs.
+    """
+    sitemaps: List[str] = []
+    for line in (robots_txt or '').splitlines():
+        key, _, value = line.partition(':')
+        if key.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+
+def feed_links(document: Document) -> List[str]:
+    """RSS and Atom feeds announced with <link rel="alternate"> on a page.
+
+    Args:
+        document (Document): Parsed page, usually the homepage.
+
+    Returns:
+        List[str]: Feed links as found on the page, possibly relative.
+    """
+    links: List[str] = []
+    for tag in document.iter_tags(['link']):
+        rel = tag.get('rel', '') or ''
+        # BeautifulSoup returns rel as list of values
+        rels: List[str] = rel if isinstance(rel, list) else rel.split()
+        if 'alternate' in [value.lower() for value in rels] and (tag.get('type', '') or '').lower() in FEED_TYPES:
+            href: Optional[str] = tag.get('href', None)
+            if href:
+                links.append(href)
+    return links
+
+
+def open_xml(stream: BinaryIO) -> BinaryIO:
+    """Transparently decompress a gzipped sitemap.
+
+    Args:
+        stream (BinaryIO): Raw stream of the file or the response.
+
+    Returns:
+        BinaryIO: Stream of the XML.
+    """
+    buffered = stream if hasattr(stream, 'peek') else io.BufferedReader(stream)
+    if buffered.peek(2)[:2] == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=buffered)
+    return buffered
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _namespace(tag: str) -> str:
+    return tag[1:].split('}', 1)[0] if tag.startswith('{') else ''
+
+
+def iter_sitemap(stream: BinaryIO) -> Iterator[DiscoveredUrl]:
+    """Stream the URLs of a sitemap, sitemap index, RSS or Atom feed.
+
+    The XML is parsed incrementally and every entry is released after it
+    was read, so the memory stays flat for sitemaps of any size.
+
+    The URL of an entry is its direct <loc> or <link> child in the
+    namespace of the entry. Extensions like image and video sitemaps
+    bring their own <loc> tags, these are ignored. Dates may come from
+    an extension, e.g. the publication date of a news sitemap.
+
+    Args:
+        stream (BinaryIO): Stream of the XML, gzip is detected.
+
+    Raises:
+        ParseError: Raised for a broken or truncated file, after its complete entries were yielded.
+
+    Yields:
+        Iterator[DiscoveredUrl]: Listed URLs.
+    """
+    loc: Optional[str] = None
+    lastmod: Optional[str] = None
+    parents: list = []
+    for event, element in iterparse(open_xml(stream), events=('start', 'end')):
+        name: str = _local_name(element.tag)
+        if event == 'start':
+            if name in _ENTRY_TAGS:
+                # Ignore the link and date of the feed itself
+                loc, lastmod = None, None
+            parents.append(element)
+            continue
+        parents.pop()
+        if name in ('loc', 'link'):
+            parent = parents[-1] if parents else None
+            is_entry_url: bool = (
+                parent is not None and _local_name(parent.tag) in _ENTRY_TAGS and _namespace(parent.tag) == _namespace(element.tag)
+            )
+            if is_entry_url and (name == 'loc' or loc is None):
+                # Atom links are attributes, RSS links are text
+                href: Optional[str] = element.get('href')
+                if href is None or element.get('rel', 'alternate') == 'alternate':
+                    loc = (href or element.text or '').strip() or None
+        elif name in _DATE_TAGS:
+            # The first date wins, e.g. <updated> before <published> in Atom
+            lastmod = lastmod or element.text
+        elif name in _ENTRY_TAGS:
+            if loc is not None:
+                yield DiscoveredUrl(loc, parse_lastmod(lastmod), is_sitemap=name == 'sitemap')
+            loc, lastmod = None, None
+            if parents:
+                parents[-1].remove(element)
+
+
+class DiscoveryState():
+    """Start time of the last finished discovery run per website, in a JSON file."""
+
+    def __init__(self, path: str) -> None:
+        self._path: str = path
+        self._runs: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self._runs = json.load(file)
+
+    def last_run(self, site: str) -> Optional[datetime]:
+        value: Optional[str] = self._runs.get(site)
+        return datetime.fromisoformat(value) if value else None
+
+    def finish_run(self, site: str, started: datetime) -> None:
+        self._runs[site] = started.isoformat()
+        with open(self._path, 'w') as file:
+            json.dump(self._runs, file)
+
+
+def newest_first(urls: Iterable[DiscoveredUrl]) -> List[DiscoveredUrl]:
+    """Sort discovered URLs so the latest articles are crawled first.
+
+    Args:
+        urls (Iterable[DiscoveredUrl]): Discovered URLs.
+
+    Returns:
+        List[DiscoveredUrl]: URLs by descending date, URLs without a date last.
+    """
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(urls, key=lambda discovered: discovered.lastmod or oldest, reverse=True)
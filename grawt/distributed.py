@@ -0,0 +1,290 @@
+from collections import deque
+from hashlib import blake2b
+import logging
+import sqlite3
+from threading import Lock
+from time import monotonic, time
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+import uuid
+
+from grawt.urls import same_site
+
+DEFAULT_LEASE_SECONDS: float = 60.0
+DEFAULT_CLAIM_SIZE: int = 50
+DEFAULT_POLL_INTERVAL: float = 1.0
+DEFAULT_WRITE_BATCH_SIZE: int = 200
+_QUEUED, _LEASED, _DONE = 0, 1, 2
+
+logger = logging.getLogger(__name__)
+
+
+def host_partition(url: str, partitions: int) -> int:
+    """Stable partition of the host of an URL.
+
+    All URLs of a host land in the same partition, so a single worker
+    fetches from a host and its politeness limits stay local.
+
+    Args:
+        url (str): Absolute URL.
+        partitions (int): Number of partitions.
+
+    Returns:
+        int: Partition between 0 and partitions - 1.
+    """
+    host: str = urlparse(url).netloc.lower()
+    return int.from_bytes(blake2b(host.encode('utf-8'), digest_size=8).digest(), 'big') % partitions
+
+
+class SharedFrontier():
+    """Frontier in a SQLite file that several worker processes crawl together.
+
+    URLs are partitioned by host, worker i owns partition i through a
+    lease that it renews while it is alive. If a worker stops renewing,
+    another worker takes over its partition until it comes back, and
+    URLs that the lost worker claimed but did not finish are claimed
+    again once their lease expired.
+
+    A worker claims `claim_size` URLs at once in breadth first order and
+    writes finished URLs and found links in batches, so the shared file
+    sees a few transactions per batch instead of several per page. The
+    heartbeat, the partition leases and the leases of the claimed URLs
+    are renewed every third of `lease_seconds` that a page is popped or
+    finished, so a worker that is slowed down by politeness keeps them.
+
+    The crawl is over for a worker when no partition has queued or
+    claimed URLs left. Until then `wait_time` tells the crawl engines to
+    poll for URLs that other workers still add.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: int,
+        workers: int,
+        seeds: Iterable[str] = (),
+        max_depth: int = 2,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        claim_size: int = DEFAULT_CLAIM_SIZE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE
+    ) -> None:
+        if not 0 <= worker_id < workers:
+            raise ValueError('worker_id has to be between 0 and {}, got {}'.format(workers - 1, worker_id))
+        self.max_depth: int = max_depth
+        self.worker_id: int = worker_id
+        self.workers: int = workers
+        self._lease_seconds: float = lease_seconds
+        self._claim_size: int = claim_size
+        self._poll_interval: float = poll_interval
+        self._write_batch_size: int = write_batch_size
+        # Identifies this process, a restarted worker does not own the claims of its crashed predecessor
+        self._token: str = '{}-{}'.format(worker_id, uuid.uuid4().hex[:12])
+        self._claimed: Deque[Tuple[str, int]] = deque()
+        self._pushed: Dict[str, int] = {}
+        self._finished: List[str] = []
+        self._owned: Set[int] = set()
+        self._remaining: int = 0
+        self._renewed: float = 0.0
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, timeout=60.0, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS frontier ('
+            'url TEXT PRIMARY KEY, partition INTEGER, depth INTEGER, state INTEGER, lease_owner TEXT, lease_until REAL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS frontier_claim ON frontier (partition, state, depth)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS workers (worker_id INTEGER PRIMARY KEY, heartbeat REAL)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS partitions (partition INTEGER PRIMARY KEY, owner INTEGER, lease_until REAL)'
+        )
+        self._sites: List[str] = []
+        for seed in seeds:
+            site: str = urlparse(seed).netloc
+            if site not in self._sites:
+                self._sites.append(site)
+            # Every worker adds the seeds, the first one wins
+            self._pushed.setdefault(seed, 0)
+        self._sync()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock at once, concurrent claims can not interleave
+        self._connection.execute('BEGIN IMMEDIATE')
+
+    def _renewal_due(self) -> bool:
+        return monotonic() - self._renewed > self._lease_seconds / 3
+
+    def _renew(self, now: float) -> None:
+        """Heartbeat, renew the own partition and claims and take over partitions of lost workers."""
+        lease_until: float = now + self._lease_seconds
+        self._connection.execute('INSERT OR REPLACE INTO workers VALUES (?, ?)', (self.worker_id, now))
+        self._connection.execute(
+            'UPDATE frontier SET lease_until = ? WHERE state = ? AND lease_owner = ?', (lease_until, _LEASED, self._token)
+        )
+        alive: Set[int] = {
+            row[0] for row in self._connection.execute('SELECT worker_id FROM workers WHERE heartbeat > ?', (now - self._lease_seconds,))
+        }
+        owners: Dict[int, Tuple[int, float]] = {
+            partition: (owner, until) for partition, owner, until in self._connection.execute('SELECT * FROM partitions')
+        }
+        owned: Set[int] = set()
+        for partition in range(self.workers):
+            owner, until = owners.get(partition, (None, 0.0))
+            mine: bool = owner == self.worker_id and until > now
+            if partition == self.worker_id:
+                take: bool = mine or owner is None or until <= now
+            elif mine:
+                # The home worker is back, give its partition back
+                take = partition not in alive
+                if not take:
+                    self._connection.execute('UPDATE partitions SET lease_until = 0 WHERE partition = ?', (partition,))
+            else:
+                take = partition not in alive and until <= now
+            if take:
+                self._connection.execute('INSERT OR REPLACE INTO partitions VALUES (?, ?, ?)', (partition, self.worker_id, lease_until))
+                owned.add(partition)
+        if owned - self._owned:
+            logger.info(
+                'Worker %d owns the partitions %s', self.worker_id, sorted(owned),
+                extra={'event': 'partitions', 'worker_id': self.worker_id, 'partitions': sorted(owned)}
+            )
+        self._owned = owned
+        self._renewed = monotonic()
+
+    def _write(self) -> None:
+        if self._pushed:
+            self._connection.executemany(
+                'INSERT INTO frontier VALUES (?, ?, ?, ?, NULL, 0) ON CONFLICT (url) DO UPDATE SET '
+                'depth = excluded.depth, state = CASE WHEN state = {} THEN {} ELSE state END '
+                'WHERE excluded.depth < depth'.format(_DONE, _QUEUED),
+                ((url, host_partition(url, self.workers), depth, _QUEUED) for url, depth in self._pushed.items())
+            )
+            self._pushed.clear()
+        if self._finished:
+            self._connection.executemany(
+                'UPDATE frontier SET state = ?, lease_owner = NULL WHERE url = ? AND lease_owner = ?',
+                ((_DONE, url, self._token) for url in self._finished)
+            )
+            self._finished.clear()
+
+    def _sync(self, claim: bool = False) -> None:
+        """Write the buffered changes and optionally claim the next URLs, in one transaction."""
+        now: float = time()
+        self._transaction()
+        try:
+            self._write()
+            if claim or self._renewal_due():
+                self._renew(now)
+            if claim and self._owned:
+                rows = self._connection.execute(
+                    'SELECT url, depth FROM frontier WHERE partition IN ({}) AND '
+                    '(state = ? OR (state = ? AND lease_until < ? AND lease_owner != ?)) ORDER BY depth LIMIT ?'.format(
+                        ','.join(str(partition) for partition in self._owned)
+                    ),
+                    (_QUEUED, _LEASED, now, self._token, self._claim_size)
+                ).fetchall()
+                self._connection.executemany(
+                    'UPDATE frontier SET state = ?, lease_owner = ?, lease_until = ? WHERE url = ?',
+                    ((_LEASED, self._token, now + self._lease_seconds, url) for url, _ in rows)
+                )
+                self._claimed.extend(rows)
+            self._remaining = self._connection.execute(
+                'SELECT COUNT(*) FROM frontier WHERE state IN (?, ?)', (_QUEUED, _LEASED)
+            ).fetchone()[0]
+            self._connection.execute('COMMIT')
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+
+    def push(self, url: str, depth: int) -> bool:
+        if depth > self.max_depth:
+            return False
+        with self._lock:
+            if self._pushed.get(url, self.max_depth + 1) <= depth:
+                return False
+            self._pushed[url] = depth
+            if len(self._pushed) >= self._write_batch_size:
+                self._sync()
+        return True
+
+    def accepts(self, link: str) -> bool:
+        return any(same_site(link, site) for site in self._sites)
+
+    def push_links(self, links: Iterable[str], depth: int, source_url: str, anchor_texts: Optional[Dict[str, str]] = None) -> None:
+        # Claimed in breadth first order, the link texts are not used
+        for link in links:
+            if self.accepts(link):
+                self.push(link, depth)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Take the next claimed URL, claim the next batch when none is left.
+
+        Returns:
+            Optional[Tuple[str, int]]: URL and its depth, None if the own partitions have nothing to claim right now.
+        """
+        with self._lock:
+            if not self._claimed:
+                self._sync(claim=True)
+            elif self._renewal_due():
+                self._sync()
+            return self._claimed.popleft() if self._claimed else None
+
+    def done(self, url: str) -> None:
+        with self._lock:
+            self._finished.append(url)
+            if len(self._finished) >= self._write_batch_size or self._renewal_due():
+                self._sync()
+
+    def is_leaf(self, depth: int) -> bool:
+        return depth >= self.max_depth
+
+    def wait_time(self) -> Optional[float]:
+        """Seconds until the next poll for URLs added by other workers.
+
+        Returns:
+            Optional[float]: Poll interval while URLs are left anywhere, None when the crawl is over.
+        """
+        with self._lock:
+            if self._pushed or self._finished:
+                self._sync()
+            return self._poll_interval if self._remaining or self._claimed else None
+
+    def flush(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def __len__(self) -> int:
+        # Includes the URLs of other workers, they may still push links into the own partition
+        return len(self._claimed) + self._remaining
+
+    def close(self) -> None:
+        with self._lock:
+            self._sync()
+            self._connection.close()
+
+
+def load_shared_frontier(config: dict, worker_id: int, workers: int, seeds: Iterable[str], max_depth: int) -> SharedFrontier:
+    """Open the shared frontier that is configured by `frontier_store_path`.
+
+    Args:
+        config (dict): Crawler config.
+        worker_id (int): Number of this worker, from 0 to workers - 1.
+        workers (int): Number of workers.
+        seeds (Iterable[str]): Canonical starting URLs, the same for every worker.
+        max_depth (int): Maximum crawl depth.
+
+    Returns:
+        SharedFrontier: Frontier of this worker.
+    """
+    return SharedFrontier(
+        config.get("frontier_store_path", "./frontier.sqlite"),
+        worker_id,
+        workers,
+        seeds,
+        max_depth,
+        config.get("worker_lease_seconds", DEFAULT_LEASE_SECONDS),
+        config.get("worker_claim_size", DEFAULT_CLAIM_SIZE),
+        config.get("worker_poll_interval", DEFAULT_POLL_INTERVAL)
+    )
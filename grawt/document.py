@@ -0,0 +1,114 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+
+SOUP_PARSERS: List[str] = ['html.parser', 'lxml', 'html5lib']
+PARSERS: List[str] = SOUP_PARSERS + ['selectolax']
+
+
+class Document(ABC):
+    """Parsed HTML page that scrapers can run on, independent of the parser.
+
+    Elements returned by iter_tags provide `name`, `get(attribute, default)`
+    and `get_text()`, like the tags of BeautifulSoup.
+    """
+
+    @abstractmethod
+    def iter_tags(self, names: Iterable[str]) -> Iterator[Any]:
+        """Implement a method that yields all tags with the given names.
+
+        Args:
+            names (Iterable[str]): Tag names.
+
+        Returns:
+            Iterator[Any]: Matching elements in document order.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def soup(self) -> BeautifulSoup:
+        """Implement a property that returns the page as BeautifulSoup.
+
+        Returns:
+            BeautifulSoup: Websites soup.
+        """
+        pass
+
+
+class SoupDocument(Document):
+    """Document backed by BeautifulSoup and one of its tree builders."""
+
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self._soup: BeautifulSoup = soup
+
+    def iter_tags(self, names: Iterable[str]) -> Iterator[Any]:
+        return iter(self._soup.find_all(list(names)))
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        return self._soup
+
+
+class SelectolaxElement():
+    """Adapter that gives a selectolax node the BeautifulSoup tag interface."""
+
+    __slots__ = ('_node',)
+
+    def __init__(self, node: Any) -> None:
+        self._node = node
+
+    @property
+    def name(self) -> str:
+        return self._node.tag
+
+    def get(self, attribute: str, default: Any = None) -> Any:
+        return self._node.attributes.get(attribute, default)
+
+    def get_text(self) -> str:
+        return self._node.text(deep=True)
+
+
+class SelectolaxDocument(Document):
+    """Document backed by the selectolax (lexbor) parser.
+
+    Only the GeneralScraper runs on it directly. Scrapers that need a
+    soup get the page parsed a second time by BeautifulSoup.
+    """
+
+    def __init__(self, raw_html: str) -> None:
+        from selectolax.lexbor import LexborHTMLParser
+        self._raw_html: str = raw_html
+        self._tree = LexborHTMLParser(raw_html)
+        self._soup: Optional[BeautifulSoup] = None
+
+    def iter_tags(self, names: Iterable[str]) -> Iterator[Any]:
+        for node in self._tree.css(', '.join(names)):
+            yield SelectolaxElement(node)
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = BeautifulSoup(self._raw_html, 'html.parser')
+        return self._soup
+
+
+def parse_document(raw_html: str, parser: str = 'html.parser') -> Document:
+    """Parse a page with the configured parser backend.
+
+    Args:
+        raw_html (str): Raw html of the page.
+        parser (str, optional): One of PARSERS. Defaults to 'html.parser'.
+
+    Raises:
+        ValueError: Raised for an unknown parser.
+
+    Returns:
+        Document: Parsed page.
+    """
+    if parser in SOUP_PARSERS:
+        return SoupDocument(BeautifulSoup(raw_html, parser))
+    if parser == 'selectolax':
+        return SelectolaxDocument(raw_html)
+    raise ValueError('Unknown parser: {}'.format(parser))
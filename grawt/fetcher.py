@@ -0,0 +1,286 @@
+import codecs
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from grawt.http_cache import HttpCache
+
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE: bool = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+DEFAULT_USER_AGENT: str = 'grawt/1.0 (+https://github.com/lukasmetzner/grawt)'
+DEFAULT_MAX_BODY_SIZE: int = 10 * 1024 * 1024
+DEFAULT_HEAD_PROBE_EXTENSIONS: Tuple[str, ...] = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.mp3', '.mp4', '.m4a', '.mov', '.avi', '.webm',
+    '.zip', '.gz', '.tar', '.rar', '.7z', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.exe', '.dmg', '.iso', '.epub'
+)
+CHUNK_SIZE: int = 64 * 1024
+NOT_HTML: str = 'not_html'
+TOO_LARGE: str = 'too_large'
+HTML_CONTENT_TYPES = frozenset({'text/html', 'application/xhtml+xml'})
+# Servers send these for anything, the first bytes decide
+UNSPECIFIC_CONTENT_TYPES = frozenset({'', 'application/octet-stream', 'text/plain', 'binary/octet-stream'})
+MAGIC_BYTES: Tuple[bytes, ...] = (
+    b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'ID3', b'OggS', b'RIFF', b'\x1aE\xdf\xa3', b'fLaC',
+    b'\x1f\x8b', b'7z\xbc\xaf', b'Rar!', b'wOFF', b'wOF2', b'\x00\x00\x01\x00', b'MZ', b'%!PS', b'\xd0\xcf\x11\xe0'
+)
+_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+
+
+class ResponseRejected(Exception):
+    """A download that was aborted because it can not be an usable page.
+
+    Args:
+        message (str): Description of the rejection.
+        kind (str): NOT_HTML or TOO_LARGE.
+    """
+
+    def __init__(self, message: str, kind: str) -> None:
+        super().__init__(message)
+        self.kind: str = kind
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """Media type of a Content-Type header without its parameters, e.g. 'text/html'."""
+    return (content_type or '').split(';', 1)[0].strip().lower()
+
+
+def is_binary(head: bytes) -> bool:
+    """Check the first bytes of a body for the signature of a non HTML format.
+
+    Args:
+        head (bytes): Start of the body.
+
+    Returns:
+        bool: True for images, video, audio, archives, PDFs and other documents.
+    """
+    # ISO media files (mp4, mov, heic) have their signature at offset 4
+    return head.startswith(MAGIC_BYTES) or head[4:8] == b'ftyp'
+
+
+def _valid_encoding(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(content_type: Optional[str], content: bytes) -> str:
+    """Charset of a body, decided once on the bytes.
+
+    The charset parameter of the Content-Type wins, then a byte order
+    mark, then a <meta charset> in the first 2 KB. The default is
+    UTF-8, not the ISO-8859-1 of HTTP/1.1 that requests assumes, and no
+    statistical guessing over the whole body.
+
+    Args:
+        content_type (Optional[str]): Content-Type header.
+        content (bytes): Body.
+
+    Returns:
+        str: Python codec name.
+    """
+    for parameter in (content_type or '').split(';')[1:]:
+        key, _, value = parameter.partition('=')
+        if key.strip().lower() == 'charset':
+            encoding: Optional[str] = _valid_encoding(value)
+            if encoding is not None:
+                return encoding
+    if content.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    match = _CHARSET.search(content, 0, 2048)
+    if match is not None:
+        encoding = _valid_encoding(match.group(1).decode('ascii'))
+        if encoding is not None:
+            return encoding
+    return 'utf-8'
+
+
+class FetchResult():
+    """Downloaded response of a single URL."""
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        encoding: Optional[str] = None,
+        from_cache: bool = False
+    ) -> None:
+        self.url: str = url
+        self.status_code: int = status_code
+        self.headers: Mapping[str, str] = headers
+        self.content: bytes = content
+        self.encoding: Optional[str] = encoding
+        self.from_cache: bool = from_cache
+
+    @property
+    def text(self) -> str:
+        """Decoded body of the response.
+
+        Returns:
+            str: The body as string.
+        """
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class Fetcher():
+    """Shared HTTP client of a crawler.
+
+    Connections are pooled and kept alive per host, every request has a
+    connect and a read timeout and compressed responses are negotiated.
+    If `http_cache_path` is configured, cached responses are revalidated
+    with a conditional GET and reused on a 304.
+
+    Bodies are streamed. A fetch for a page is aborted as soon as the
+    headers or the first bytes show that it is no HTML, and once the body
+    exceeds `max_body_size`. With `head_probes`, URLs with an extension
+    of `head_probe_extensions` are checked with a HEAD request first.
+    """
+
+    def __init__(self, config: dict) -> None:
+        self._timeout = (config.get("connect_timeout", 5.0), config.get("read_timeout", 20.0))
+        self._session = requests.Session()
+        self._session.headers['User-Agent'] = config.get("user_agent", DEFAULT_USER_AGENT)
+        self._session.headers['Accept-Encoding'] = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+        self._mount('http://', config.get("pool_connections", 10), config.get("pool_maxsize", 10))
+        self._mount('https://', config.get("pool_connections", 10), config.get("pool_maxsize", 10))
+        host: str
+        size: int
+        for host, size in (config.get("host_pool_sizes") or {}).items():
+            self._mount('http://{}/'.format(host), 1, size)
+            self._mount('https://{}/'.format(host), 1, size)
+        self._max_body_size: Optional[int] = config.get("max_body_size", DEFAULT_MAX_BODY_SIZE)
+        self._head_probes: bool = config.get("head_probes", True)
+        self._head_probe_extensions: Tuple[str, ...] = tuple(
+            extension.lower() for extension in config.get("head_probe_extensions", DEFAULT_HEAD_PROBE_EXTENSIONS)
+        )
+        self._cache: Optional[HttpCache] = None
+        if config.get("http_cache_path"):
+            self._cache = HttpCache(config["http_cache_path"], config.get("http_cache_max_size", 512 * 1024 * 1024))
+
+    def _mount(self, prefix: str, pool_connections: int, pool_maxsize: int) -> None:
+        # pool_block caps the number of open connections per host at pool_maxsize
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self._session.mount(prefix, adapter)
+
+    def _check_headers(self, url: str, headers: Mapping[str, str]) -> None:
+        """Reject a page by its Content-Type and Content-Length."""
+        content_type: str = media_type(headers.get('Content-Type'))
+        if content_type not in HTML_CONTENT_TYPES and content_type not in UNSPECIFIC_CONTENT_TYPES:
+            raise ResponseRejected('{} is no HTML: {}'.format(url, content_type), NOT_HTML)
+        length: Optional[str] = headers.get('Content-Length')
+        if self._max_body_size is not None and length is not None and length.isdigit() and int(length) > self._max_body_size:
+            raise ResponseRejected('{} has {} bytes, more than max_body_size'.format(url, length), TOO_LARGE)
+
+    def _probe(self, url: str) -> None:
+        """Check an URL with a suspicious extension by a HEAD request.
+
+        A failed or refused HEAD request is ignored, the GET is checked as well.
+        """
+        if not self._head_probes or not urlparse(url).path.lower().endswith(self._head_probe_extensions):
+            return
+        try:
+            response = self._session.head(url, timeout=self._timeout, allow_redirects=True)
+        except requests.RequestException:
+            return
+        if response.status_code == 200:
+            self._check_headers(url, response.headers)
+
+    def _read_body(self, url: str, response: requests.Response, html_only: bool) -> bytes:
+        """Read a streamed body in chunks, abort on binary content or beyond max_body_size."""
+        chunks: List[bytes] = []
+        size: int = 0
+        chunk: bytes
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if html_only and size == 0 and is_binary(chunk):
+                raise ResponseRejected('{} is no HTML, its body starts with {!r}'.format(url, chunk[:8]), NOT_HTML)
+            size += len(chunk)
+            if self._max_body_size is not None and size > self._max_body_size:
+                raise ResponseRejected('{} is larger than max_body_size'.format(url), TOO_LARGE)
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def fetch(self, url: str, html_only: bool = False) -> FetchResult:
+        """Download an URL over the shared session.
+
+        Args:
+            url (str): URL to download.
+            html_only (bool, optional): Abort successful responses that are no HTML page. Defaults to False.
+
+        Raises:
+            ResponseRejected: Raised if html_only is set and the response is no HTML, or if the body exceeds max_body_size.
+            requests.RequestException: Raised on connection errors and timeouts.
+
+        Returns:
+            FetchResult: Downloaded response.
+        """
+        entry = self._cache.get(url) if self._cache is not None else None
+        if html_only and entry is None:
+            self._probe(url)
+        headers: Dict[str, str] = entry.conditional_headers() if entry is not None else {}
+        # Closing a response with an unread body drops its connection instead of draining it
+        with self._session.get(url, headers=headers, timeout=self._timeout, stream=True) as response:
+            if response.status_code == 304 and entry is not None:
+                self._cache.touch(url)
+                return FetchResult(url, 200, entry.headers, entry.content, entry.encoding, from_cache=True)
+            # Error pages are read anyway, their status decides about a retry
+            check_content: bool = html_only and 200 <= response.status_code < 300
+            if check_content:
+                self._check_headers(url, response.headers)
+            content: bytes = self._read_body(url, response, check_content)
+
+        result = FetchResult(
+            response.url,
+            response.status_code,
+            response.headers,
+            content,
+            detect_encoding(response.headers.get('Content-Type'), content)
+        )
+        if self._cache is not None and response.status_code == 200:
+            self._cache.store(url, response.headers, result.content, result.encoding)
+        return result
+
+    def stream(self, url: str) -> requests.Response:
+        """Start a download without reading the body, e.g. for large sitemaps.
+
+        The body is read from `response.raw`, a Content-Encoding is already
+        decoded. The response has to be closed, it can be used as context
+        manager.
+
+        Args:
+            url (str): URL to download.
+
+        Raises:
+            requests.RequestException: Raised on connection errors and timeouts.
+
+        Returns:
+            requests.Response: Response with unread body.
+        """
+        response = self._session.get(url, stream=True, timeout=self._timeout)
+        response.raw.decode_content = True
+        # Stay readable at the end of the body, io readers expect an empty read there
+        response.raw.auto_close = False
+        return response
+
+    def close(self) -> None:
+        """Close all pooled connections and the response cache.
+        """
+        self._session.close()
+        if self._cache is not None:
+            self._cache.close()
@@ -0,0 +1,531 @@
+from collections import deque
+import heapq
+import logging
+import math
+from time import monotonic
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from grawt.scoring import LinkScorer
+from grawt.urls import registrable_domain, same_site
+
+DEFAULT_DEPTH_PENALTY: float = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class Frontier():
+    """Breadth first queue of URLs of one website that still have to be crawled.
+
+    Every URL is only accepted once per crawl, so pages that are linked
+    from many parents are fetched a single time. The only exception is an
+    URL that shows up again at a lower depth, which can happen when pages
+    finish out of order in a concurrent crawl. If the URL is still
+    queued then, its deeper entry is outdated and skipped, so the page is
+    fetched once.
+    """
+
+    def __init__(self, max_depth: int = 2, netloc_source: str = '') -> None:
+        self.max_depth: int = max_depth
+        self.netloc_source: str = netloc_source
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._visited: Dict[str, int] = {}
+        # Depth of the current queue entry per queued URL, older entries of an URL are outdated
+        self._queued: Dict[str, int] = {}
+        # Visited URLs that were added or lowered since the last checkpoint, None until the first one
+        self._changes: Optional[Dict[str, int]] = None
+
+    def push(self, url: str, depth: int) -> bool:
+        """Add an URL to the frontier.
+
+        Args:
+            url (str): URL to crawl.
+            depth (int): Depth at which the URL was found.
+
+        Returns:
+            bool: False if the URL is too deep or was already visited at the same or a lower depth.
+        """
+        if depth > self.max_depth or self._visited.get(url, self.max_depth + 1) <= depth:
+            return False
+        self._visit(url, depth)
+        self._queued[url] = depth
+        self._queue.append((url, depth))
+        return True
+
+    def _visit(self, url: str, depth: int) -> None:
+        self._visited[url] = depth
+        if self._changes is not None:
+            self._changes[url] = depth
+
+    def visited_changes(self) -> Dict[str, int]:
+        """Take the visited URLs that were added or lowered since the last call.
+
+        The first call returns every visited URL.
+
+        Returns:
+            Dict[str, int]: Depth per URL.
+        """
+        changes: Dict[str, int] = dict(self._visited) if self._changes is None else self._changes
+        self._changes = {}
+        return changes
+
+    def add_visited(self, visited: Dict[str, int]) -> None:
+        """Restore visited URLs from a checkpoint, they count as saved.
+
+        Args:
+            visited (Dict[str, int]): Depth per URL.
+        """
+        self._visited.update(visited)
+        self._changes = {}
+
+    def accepts(self, link: str) -> bool:
+        """Check if a link belongs to the website of this frontier.
+
+        Args:
+            link (str): Found link, absolute and canonical.
+
+        Returns:
+            bool: True if the link has the same registrable domain, e.g. 'dailymail.co.uk'.
+        """
+        return same_site(link, self.netloc_source)
+
+    def push_links(self, links: Iterable[str], depth: int, source_url: str, anchor_texts: Optional[Dict[str, str]] = None) -> None:
+        """Add the links of a page that belong to the website.
+
+        Args:
+            links (Iterable[str]): Links found on the page.
+            depth (int): Depth of the links.
+            source_url (str): URL of the page.
+            anchor_texts (Optional[Dict[str, str]], optional): Link text per link, only used by the PriorityFrontier. Defaults to None.
+        """
+        link: str
+        for link in links:
+            if self.accepts(link):
+                self.push(link, depth)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Take the next URL in breadth first order.
+
+        Returns:
+            Optional[Tuple[str, int]]: URL and its depth, None if only outdated entries were left.
+        """
+        while self._queue:
+            url, depth = self._queue.popleft()
+            # Pushed again at a lower depth, the newer entry counts
+            if self._queued.get(url) == depth:
+                del self._queued[url]
+                return url, depth
+        return None
+
+    def done(self, url: str) -> None:
+        """Mark a popped URL as finished.
+
+        Args:
+            url (str): Popped URL.
+        """
+        pass
+
+    def is_leaf(self, depth: int) -> bool:
+        """Check if links found at this depth would be too deep to follow.
+
+        Args:
+            depth (int): Depth of a page.
+
+        Returns:
+            bool: True if the links of the page are not crawled.
+        """
+        return depth >= self.max_depth
+
+    def wait_time(self) -> Optional[float]:
+        """Seconds until URLs may show up that pop can not return now.
+
+        Returns:
+            Optional[float]: Always None, only other workers add URLs to a shared frontier.
+        """
+        return None
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def to_dict(self, visited: bool = True) -> dict:
+        """State of the frontier for a checkpoint.
+
+        Args:
+            visited (bool, optional): Include the visited URLs, a Checkpointer saves them separately. Defaults to True.
+
+        Returns:
+            dict: Queued URLs with their depths and the depths of all visited URLs.
+        """
+        doc: dict = {
+            'type': 'frontier',
+            'max_depth': self.max_depth,
+            'netloc_source': self.netloc_source,
+            'queue': [[url, depth] for url, depth in self._queue if self._queued.get(url) == depth]
+        }
+        if visited:
+            doc['visited'] = self._visited
+        return doc
+
+    @classmethod
+    def from_dict(cls, doc: dict) -> 'Frontier':
+        frontier = cls(doc['max_depth'], doc['netloc_source'])
+        for url, depth in doc['queue']:
+            frontier._queue.append((url, depth))
+            frontier._queued[url] = depth
+        frontier._visited.update(doc.get('visited', {}))
+        return frontier
+
+
+class PriorityFrontier(Frontier):
+    """Best first queue, the links that most likely lead to an article come first.
+
+    Every link is scored once when it is pushed, see LinkScorer. Each
+    level of depth lowers the priority by `depth_penalty`, so a crawl
+    still finishes the articles near the seeds before it goes deeper.
+    Hubs and navigation pages are only fetched when nothing better is
+    queued, which matters once the crawl has a page or time budget.
+
+    Args:
+        max_depth (int, optional): Maximum crawl depth. Defaults to 2.
+        netloc_source (str, optional): Host of the website. Defaults to ''.
+        scorer (Optional[LinkScorer], optional): Scores the links. Defaults to the heuristics only.
+        depth_penalty (float, optional): Priority lost per level of depth. Defaults to 0.1.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = 2,
+        netloc_source: str = '',
+        scorer: Optional[LinkScorer] = None,
+        depth_penalty: float = DEFAULT_DEPTH_PENALTY
+    ) -> None:
+        super().__init__(max_depth, netloc_source)
+        self.scorer: LinkScorer = scorer or LinkScorer()
+        self.depth_penalty: float = depth_penalty
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._pushed: int = 0
+
+    def push(self, url: str, depth: int, anchor_text: Optional[str] = None) -> bool:
+        """Score an URL and add it to the frontier.
+
+        Args:
+            url (str): URL to crawl.
+            depth (int): Depth at which the URL was found.
+            anchor_text (Optional[str], optional): Text of the link. Defaults to None.
+
+        Returns:
+            bool: False if the URL is too deep or was already visited at the same or a lower depth.
+        """
+        if depth > self.max_depth or self._visited.get(url, self.max_depth + 1) <= depth:
+            return False
+        self._visit(url, depth)
+        priority: float = depth * self.depth_penalty - self.scorer.score(url, anchor_text)
+        self._push_entry(priority, url, depth)
+        return True
+
+    def _push_entry(self, priority: float, url: str, depth: int) -> None:
+        # The counter keeps the order of equal priorities stable
+        heapq.heappush(self._heap, (priority, self._pushed, url, depth))
+        self._pushed += 1
+
+    def push_links(self, links: Iterable[str], depth: int, source_url: str, anchor_texts: Optional[Dict[str, str]] = None) -> None:
+        link: str
+        for link in links:
+            if self.accepts(link):
+                self.push(link, depth, (anchor_texts or {}).get(link))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Take the URL with the highest priority.
+
+        Returns:
+            Optional[Tuple[str, int]]: URL and its depth, None if only outdated entries were left.
+        """
+        while self._heap:
+            _, _, url, depth = heapq.heappop(self._heap)
+            # Pushed again at a lower depth, the newer entry counts
+            if self._visited.get(url) == depth:
+                return url, depth
+        return None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def to_dict(self, visited: bool = True) -> dict:
+        """State of the frontier for a checkpoint.
+
+        Args:
+            visited (bool, optional): Include the visited URLs, a Checkpointer saves them separately. Defaults to True.
+
+        Returns:
+            dict: Queued URLs with their depths and priorities and the depths of all visited URLs.
+        """
+        doc: dict = {
+            'type': 'priority_frontier',
+            'max_depth': self.max_depth,
+            'netloc_source': self.netloc_source,
+            'depth_penalty': self.depth_penalty,
+            'queue': [[url, depth, priority] for priority, _, url, depth in sorted(self._heap)]
+        }
+        if visited:
+            doc['visited'] = self._visited
+        return doc
+
+    @classmethod
+    def from_dict(cls, doc: dict, scorer: Optional[LinkScorer] = None) -> 'PriorityFrontier':
+        frontier = cls(doc['max_depth'], doc['netloc_source'], scorer, doc['depth_penalty'])
+        for url, depth, priority in doc['queue']:
+            frontier._push_entry(priority, url, depth)
+        frontier._visited.update(doc.get('visited', {}))
+        return frontier
+
+
+class SiteBudget():
+    """Limits for the pages, the downloaded bytes and the wall clock time of a crawl or one website."""
+
+    def __init__(self, max_pages: Optional[int] = None, max_seconds: Optional[float] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_pages: Optional[int] = max_pages
+        self.max_seconds: Optional[float] = max_seconds
+        self.max_bytes: Optional[int] = max_bytes
+        self.pages: int = 0
+        self.bytes: int = 0
+        self.started: Optional[float] = None
+
+    def start(self) -> None:
+        if self.started is None:
+            self.started = monotonic()
+
+    def take(self) -> None:
+        self.start()
+        self.pages += 1
+
+    def elapsed(self) -> Optional[float]:
+        return None if self.started is None else monotonic() - self.started
+
+    def exhausted(self) -> bool:
+        if self.max_pages is not None and self.pages >= self.max_pages:
+            return True
+        if self.max_bytes is not None and self.bytes >= self.max_bytes:
+            return True
+        return self.max_seconds is not None and self.started is not None and monotonic() - self.started > self.max_seconds
+
+
+class MultiSiteFrontier():
+    """One frontier per website with weighted round robin between the websites.
+
+    Every round a website may hand out as many URLs as its weight. A
+    website whose budget is exhausted is dropped, a website that already
+    has `max_in_flight` URLs being fetched is skipped until one finishes.
+    Both keep a slow or huge website from starving the others.
+
+    With a scorer, every website gets a PriorityFrontier instead of a
+    breadth first one.
+
+    Raises:
+        ValueError: Raised for a weight that is not greater than 0.
+    """
+
+    def __init__(
+        self,
+        seeds: Iterable[str],
+        max_depth: int = 2,
+        weights: Optional[Dict[str, float]] = None,
+        max_pages: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        max_in_flight: Optional[int] = None,
+        scorer: Optional[LinkScorer] = None,
+        depth_penalty: float = DEFAULT_DEPTH_PENALTY
+    ) -> None:
+        self.max_depth: int = max_depth
+        self._max_in_flight: Optional[int] = max_in_flight
+        self._scorer: Optional[LinkScorer] = scorer
+        self._depth_penalty: float = depth_penalty
+        self._frontiers: Dict[str, Frontier] = {}
+        self._weights: Dict[str, float] = {}
+        self._credits: Dict[str, float] = {}
+        self._budgets: Dict[str, SiteBudget] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._sites: List[str] = []
+        self._site_of: Dict[str, str] = {}
+        self._position: int = 0
+        name: str
+        weight: float
+        for name, weight in (weights or {}).items():
+            # A weight of 0 would never refill the credits of its site, NaN fails this check as well
+            if not weight > 0:
+                raise ValueError('The weight of {} has to be greater than 0, got {}'.format(name, weight))
+        for seed in seeds:
+            site: str = urlparse(seed).netloc
+            if site not in self._frontiers:
+                self._frontiers[site] = self._new_frontier(site)
+                self._weights[site] = (weights or {}).get(site, 1.0)
+                self._credits[site] = 0.0
+                self._budgets[site] = SiteBudget(max_pages, max_seconds)
+                self._in_flight[site] = 0
+                self._sites.append(site)
+            self._frontiers[site].push(seed, 0)
+
+    def _new_frontier(self, site: str) -> Frontier:
+        if self._scorer is None:
+            return Frontier(self.max_depth, site)
+        return PriorityFrontier(self.max_depth, site, self._scorer, self._depth_penalty)
+
+    def push(self, url: str, depth: int) -> bool:
+        site: Optional[str] = self._site_for(url)
+        return site is not None and self._frontiers[site].push(url, depth)
+
+    def _site_for(self, url: str) -> Optional[str]:
+        # The site with the same host wins over other sites of the registrable domain
+        netloc: str = urlparse(url).netloc
+        if netloc in self._frontiers:
+            return netloc
+        domain: str = registrable_domain(netloc.split(':')[0])
+        for site in self._sites:
+            if registrable_domain(site.split(':')[0]) == domain:
+                return site
+        return None
+
+    def push_links(self, links: Iterable[str], depth: int, source_url: str, anchor_texts: Optional[Dict[str, str]] = None) -> None:
+        site: Optional[str] = self._site_of.get(source_url) or self._site_for(source_url)
+        if site in self._frontiers:
+            self._frontiers[site].push_links(links, depth, source_url, anchor_texts)
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Take the next URL of the next website in turn.
+
+        Returns:
+            Optional[Tuple[str, int]]: URL and its depth, None if every website with URLs is busy.
+        """
+        for site in list(self._sites):
+            if self._budgets[site].exhausted():
+                logger.info(
+                    'Budget of %s exhausted after %d pages', site, self._budgets[site].pages,
+                    extra={'event': 'budget_exhausted', 'site': site, 'pages': self._budgets[site].pages}
+                )
+                self._sites.remove(site)
+                del self._frontiers[site]
+        if not self._sites:
+            return None
+        # Enough passes to refill the credits of the lowest weight
+        passes: int = 1 + math.ceil(1.0 / min(self._weights[site] for site in self._sites))
+        for _ in range(passes * len(self._sites)):
+            self._position %= len(self._sites)
+            site: str = self._sites[self._position]
+            frontier: Frontier = self._frontiers[site]
+            busy: bool = self._max_in_flight is not None and self._in_flight[site] >= self._max_in_flight
+            if frontier and not busy and self._credits[site] >= 1.0:
+                entry: Optional[Tuple[str, int]] = frontier.pop()
+                if entry is None:
+                    continue
+                self._credits[site] -= 1.0
+                url, depth = entry
+                self._budgets[site].take()
+                self._in_flight[site] += 1
+                self._site_of[url] = site
+                return url, depth
+            if self._credits[site] < 1.0:
+                self._credits[site] += self._weights[site]
+            self._position += 1
+        return None
+
+    def done(self, url: str) -> None:
+        site: Optional[str] = self._site_of.pop(url, None)
+        if site is not None and site in self._in_flight:
+            self._in_flight[site] -= 1
+
+    def is_leaf(self, depth: int) -> bool:
+        return depth >= self.max_depth
+
+    def wait_time(self) -> Optional[float]:
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(self._frontiers[site]) for site in self._sites)
+
+    def visited_changes(self) -> Dict[str, Dict[str, int]]:
+        """Take the visited URLs of every website that were added or lowered since the last call.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Depth per URL per website.
+        """
+        return {site: self._frontiers[site].visited_changes() for site in self._sites}
+
+    def add_visited(self, visited: Dict[str, Dict[str, int]]) -> None:
+        """Restore the visited URLs of every website from a checkpoint.
+
+        Args:
+            visited (Dict[str, Dict[str, int]]): Depth per URL per website.
+        """
+        for site in self._sites:
+            self._frontiers[site].add_visited(visited.get(site, {}))
+
+    def to_dict(self, visited: bool = True) -> dict:
+        """State of all websites for a checkpoint.
+
+        The wall clock budgets only count the time the crawl was running.
+
+        Args:
+            visited (bool, optional): Include the visited URLs, a Checkpointer saves them separately. Defaults to True.
+
+        Returns:
+            dict: Frontier, weight, credits and budget per website.
+        """
+        return {
+            'type': 'multi_site_frontier',
+            'max_depth': self.max_depth,
+            'max_in_flight': self._max_in_flight,
+            'depth_penalty': self._depth_penalty,
+            'position': self._position,
+            'sites': [
+                {
+                    'site': site,
+                    'weight': self._weights[site],
+                    'credits': self._credits[site],
+                    'max_pages': self._budgets[site].max_pages,
+                    'max_seconds': self._budgets[site].max_seconds,
+                    'pages': self._budgets[site].pages,
+                    'elapsed': self._budgets[site].elapsed(),
+                    'frontier': self._frontiers[site].to_dict(visited)
+                }
+                for site in self._sites
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, doc: dict, scorer: Optional[LinkScorer] = None) -> 'MultiSiteFrontier':
+        frontier = cls([], doc['max_depth'], max_in_flight=doc['max_in_flight'], scorer=scorer, depth_penalty=doc.get('depth_penalty', DEFAULT_DEPTH_PENALTY))
+        for entry in doc['sites']:
+            site: str = entry['site']
+            frontier._frontiers[site] = frontier_from_dict(entry['frontier'], scorer)
+            frontier._weights[site] = entry['weight']
+            frontier._credits[site] = entry['credits']
+            budget = SiteBudget(entry['max_pages'], entry['max_seconds'])
+            budget.pages = entry['pages']
+            if entry['elapsed'] is not None:
+                budget.started = monotonic() - entry['elapsed']
+            frontier._budgets[site] = budget
+            frontier._in_flight[site] = 0
+            frontier._sites.append(site)
+        frontier._position = doc['position']
+        return frontier
+
+
+def frontier_from_dict(doc: dict, scorer: Optional[LinkScorer] = None) -> Union[Frontier, MultiSiteFrontier]:
+    """Rebuild a frontier from the state in a checkpoint.
+
+    Args:
+        doc (dict): State written by to_dict.
+        scorer (Optional[LinkScorer], optional): Scorer of a restored PriorityFrontier. Defaults to the heuristics only.
+
+    Raises:
+        ValueError: Raised for an unknown frontier type.
+
+    Returns:
+        Union[Frontier, MultiSiteFrontier]: Restored frontier.
+    """
+    if doc['type'] == 'frontier':
+        return Frontier.from_dict(doc)
+    if doc['type'] == 'priority_frontier':
+        return PriorityFrontier.from_dict(doc, scorer)
+    if doc['type'] == 'multi_site_frontier':
+        return MultiSiteFrontier.from_dict(doc, scorer)
+    raise ValueError('Unknown frontier type: {}'.format(doc['type']))
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import time
+from threading import Lock
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit, urlunsplit
+import zlib
+
+DEFAULT_MAX_SIZE: int = 512 * 1024 * 1024
+
+
+def cache_key(url: str) -> str:
+    """Normalize an URL to the key of its cache entry.
+
+    Args:
+        url (str): Requested URL.
+
+    Returns:
+        str: URL without fragment and with lower case scheme and host.
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+class CacheEntry():
+    """Cached response of an URL together with its validators."""
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        content: bytes,
+        encoding: Optional[str],
+        etag: Optional[str],
+        last_modified: Optional[str]
+    ) -> None:
+        self.headers: Dict[str, str] = headers
+        self.content: bytes = content
+        self.encoding: Optional[str] = encoding
+        self.etag: Optional[str] = etag
+        self.last_modified: Optional[str] = last_modified
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers that revalidate this entry.
+
+        Returns:
+            Dict[str, str]: If-None-Match and If-Modified-Since headers.
+        """
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache():
+    """On disk cache of responses that carry an ETag or Last-Modified header.
+
+    Bodies are stored zlib compressed in SQLite. If the stored bodies
+    exceed `max_size` bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self._max_size: int = max_size
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, encoding TEXT, '
+            'headers TEXT, body BLOB, size INTEGER, accessed REAL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._connection.commit()
+        self._size: int = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Look up the cached response of an URL.
+
+        Args:
+            url (str): Requested URL.
+
+        Returns:
+            Optional[CacheEntry]: Cached response or None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT headers, body, encoding, etag, last_modified FROM responses WHERE url = ?',
+                (cache_key(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), zlib.decompress(row[1]), row[2], row[3], row[4])
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as used after a successful revalidation.
+
+        Args:
+            url (str): Requested URL.
+        """
+        with self._lock, self._connection:
+            self._connection.execute('UPDATE responses SET accessed = ? WHERE url = ?', (time.time(), cache_key(url)))
+
+    def store(self, url: str, headers: Mapping[str, str], content: bytes, encoding: Optional[str]) -> bool:
+        """Cache a response if it can be revalidated.
+
+        Args:
+            url (str): Requested URL.
+            headers (Mapping[str, str]): Response headers.
+            content (bytes): Response body.
+            encoding (Optional[str]): Encoding of the body.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        etag: Optional[str] = headers.get('ETag')
+        last_modified: Optional[str] = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+        body: bytes = zlib.compress(content)
+        if len(body) > self._max_size:
+            return False
+        key: str = cache_key(url)
+        with self._lock, self._connection:
+            old = self._connection.execute('SELECT size FROM responses WHERE url = ?', (key,)).fetchone()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, etag, last_modified, encoding, json.dumps(dict(headers)), body, len(body), time.time())
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self._max_size:
+                self._evict()
+        return True
+
+    def _evict(self) -> None:
+        # Free some headroom, so eviction does not run on every store
+        target: int = int(self._max_size * 0.9)
+        cursor = self._connection.execute('SELECT url, size FROM responses ORDER BY accessed')
+        evicted = []
+        for url, size in cursor:
+            if self._size <= target:
+                break
+            evicted.append((url,))
+            self._size -= size
+        self._connection.executemany('DELETE FROM responses WHERE url = ?', evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,221 @@
+from datetime import datetime
+from functools import lru_cache
+from html.parser import HTMLParser
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dateutil import parser as date_parser
+
+DATE_CACHE_SIZE: int = 4096
+ARTICLE_TYPES = frozenset({
+    'Article', 'NewsArticle', 'ReportageNewsArticle', 'AnalysisNewsArticle', 'OpinionNewsArticle', 'BackgroundNewsArticle',
+    'ReviewNewsArticle', 'BlogPosting', 'LiveBlogPosting', 'Report', 'ScholarlyArticle', 'TechArticle'
+})
+HUB_TYPES = frozenset({'CollectionPage', 'ItemList', 'SearchResultsPage', 'ProfilePage', 'WebSite', 'SiteNavigationElement'})
+DATE_META_NAMES: Tuple[str, ...] = (
+    'article:published_time', 'datepublished', 'pubdate', 'publishdate', 'publish-date', 'date', 'dc.date',
+    'dc.date.issued', 'dcterms.created', 'parsely-pub-date', 'sailthru.date', 'og:published_time'
+)
+_HEAD_END = re.compile(r'</head\s*>|<body[\s>]', re.IGNORECASE)
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+logger = logging.getLogger(__name__)
+
+
+def split_head(raw_html: str) -> Optional[str]:
+    """Cut a page after its </head>, or before <body> if the end tag is omitted.
+
+    Args:
+        raw_html (str): Raw html of the page.
+
+    Returns:
+        Optional[str]: The page up to the end of the head, None if the page has no recognizable head.
+    """
+    match = _HEAD_END.search(raw_html)
+    return None if match is None else raw_html[:match.start()]
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date_slow(value: str) -> Optional[datetime]:
+    # Pages of a site repeat the same few formats and values, e.g. the date of the teasers
+    try:
+        return date_parser.parse(value)
+    except (date_parser.ParserError, ValueError, OverflowError) as e:
+        logger.debug('Could not parse a date: %s', e, extra={'event': 'date_failed'})
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse a date of a page, ISO 8601 without dateutil.
+
+    Almost every <time datetime> and structured date is ISO 8601, which
+    datetime.fromisoformat parses in microseconds. Everything else goes
+    to dateutil, the results are memoized.
+
+    Args:
+        value (Optional[str]): Date string.
+
+    Returns:
+        Optional[datetime]: Parsed date, None if it is empty or no date.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if _ISO_DATE.match(value):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return _parse_date_slow(value)
+
+
+class PageMetadata():
+    """Structured metadata from the head of a page."""
+
+    def __init__(self) -> None:
+        self.headline: Optional[str] = None
+        self.title: Optional[str] = None
+        self.published: Optional[datetime] = None
+        self.canonical_url: Optional[str] = None
+        self.types: List[str] = []
+        self.og_type: Optional[str] = None
+
+    @property
+    def is_article(self) -> bool:
+        return self.og_type == 'article' or any(t in ARTICLE_TYPES for t in self.types)
+
+    @property
+    def is_hub(self) -> bool:
+        """True if the page declares itself as an overview page and not as an article.
+
+        Only JSON-LD counts, many websites send og:type 'website' for every page.
+        """
+        return not self.is_article and any(t in HUB_TYPES for t in self.types)
+
+
+class _HeadParser(HTMLParser):
+    """Collects the meta, link, title and JSON-LD tags of a head."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.canonical: Optional[str] = None
+        self.title: Optional[str] = None
+        self.json_ld: List[str] = []
+        self._capture: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == 'meta':
+            attributes: Dict[str, Optional[str]] = dict(attrs)
+            key: Optional[str] = attributes.get('property') or attributes.get('name') or attributes.get('itemprop')
+            content: Optional[str] = attributes.get('content')
+            if key and content:
+                # The first value wins, like in the body scan
+                self.meta.setdefault(key.strip().lower(), content.strip())
+        elif tag == 'link':
+            attributes = dict(attrs)
+            if self.canonical is None and 'canonical' in (attributes.get('rel') or '').lower().split():
+                self.canonical = attributes.get('href')
+        elif tag == 'title' and self.title is None:
+            self._capture = 'title'
+        elif tag == 'script' and (dict(attrs).get('type') or '').lower().strip() == 'application/ld+json':
+            self._capture = 'json_ld'
+
+    def handle_data(self, data: str) -> None:
+        if self._capture is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._capture == 'title' and tag == 'title':
+            self.title = ''.join(self._text).strip()
+        elif self._capture == 'json_ld' and tag == 'script':
+            self.json_ld.append(''.join(self._text))
+        else:
+            return
+        self._capture = None
+        self._text = []
+
+
+def _json_ld_objects(value: Any) -> Iterator[dict]:
+    """All objects of a JSON-LD document, including the ones of an @graph."""
+    if isinstance(value, list):
+        for item in value:
+            yield from _json_ld_objects(item)
+    elif isinstance(value, dict):
+        yield value
+        if '@graph' in value:
+            yield from _json_ld_objects(value['@graph'])
+
+
+def _types(obj: dict) -> List[str]:
+    value: Any = obj.get('@type') or []
+    return [value] if isinstance(value, str) else [t for t in value if isinstance(t, str)]
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get('@id') or value.get('url')
+    return ' '.join(value.split()) if isinstance(value, str) and value.strip() else None
+
+
+def parse_head(head_html: str) -> PageMetadata:
+    """Read the structured metadata of a page from its head.
+
+    JSON-LD of an article type wins over OpenGraph, OpenGraph over the
+    other meta tags. The <title> is no headline, it usually carries the
+    name of the website.
+
+    Args:
+        head_html (str): The page up to the end of its head, see split_head.
+
+    Returns:
+        PageMetadata: Found metadata, empty values if the head has none.
+    """
+    head = _HeadParser()
+    try:
+        head.feed(head_html)
+        head.close()
+    except Exception as e:
+        # HTMLParser is lenient, but a broken head must never fail the page
+        logger.debug('Could not parse a head: %s', e, extra={'event': 'head_failed'})
+    metadata = PageMetadata()
+    date_str: Optional[str] = None
+    for script in head.json_ld:
+        try:
+            document: Any = json.loads(script)
+        except ValueError:
+            continue
+        for obj in _json_ld_objects(document):
+            types: List[str] = _types(obj)
+            metadata.types.extend(types)
+            if metadata.headline is None and any(t in ARTICLE_TYPES for t in types):
+                metadata.headline = _text(obj.get('headline'))
+                date_str = _text(obj.get('datePublished')) or _text(obj.get('dateCreated'))
+                metadata.canonical_url = _text(obj.get('mainEntityOfPage')) or _text(obj.get('url'))
+    metadata.og_type = head.meta.get('og:type')
+    metadata.title = head.title
+    metadata.headline = metadata.headline or head.meta.get('og:title') or head.meta.get('twitter:title')
+    if date_str is None:
+        date_str = next((head.meta[name] for name in DATE_META_NAMES if name in head.meta), None)
+    metadata.published = parse_date(date_str)
+    # The link tag is meant for search engines and more reliable than the JSON-LD url
+    metadata.canonical_url = head.canonical or metadata.canonical_url or head.meta.get('og:url')
+    return metadata
+
+
+def read_metadata(raw_html: str) -> Optional[PageMetadata]:
+    """Parse only the head of a page for its structured metadata.
+
+    Args:
+        raw_html (str): Raw html of the page.
+
+    Returns:
+        Optional[PageMetadata]: Metadata, None if the page has no recognizable head.
+    """
+    head_html: Optional[str] = split_head(raw_html)
+    return None if head_html is None else parse_head(head_html)
@@ -1,32 +1,257 @@
 from datetime import datetime
-from typing import List
-from hashlib import sha3_256
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+RECORD_VERSION: int = 1
+_LENGTH = struct.Struct('<I')
+_HEADER = struct.Struct('<BBII')
+_HAS_HREFS: int = 1
+_HAS_NETLOC_LINKS: int = 2
+_NETLOC_LINKS_INDEXED: int = 4
+_HAS_CANONICAL_URL: int = 8
+_HAS_ANCHOR_TEXTS: int = 16
+_HAS_FINGERPRINT: int = 32
+_FINGERPRINT = struct.Struct('<16sQ')
 
 
 class ScrapedArticle():
-    url: str
-    headline: str
-    main_text: str
-    datetime_: datetime
-    hrefs: List[str]
-    netloc_links: List[str]
+    """Scraped page.
+
+    The link lists are optional, the crawler drops them after the links
+    were pushed to the frontier unless `keep_links` is configured.
+    `canonical_url` is set on duplicates of an article that was scraped
+    under another URL. `anchor_texts` holds the link text of every netloc
+    link, in the same order, it is only collected for the priority
+    frontier. `fingerprint` is the content hash and SimHash of the main
+    text, computed by the parse worker when duplicates are detected. The
+    crawler removes it after the lookup, it is never written to a sink.
+    """
+
+    __slots__ = ('url', 'headline', 'main_text', 'datetime_', 'hrefs', 'netloc_links', 'canonical_url', 'anchor_texts', 'fingerprint')
+
+    def __init__(
+        self,
+        url: str = None,
+        headline: str = None,
+        main_text: str = None,
+        datetime_: datetime = None,
+        hrefs: Optional[List[str]] = None,
+        netloc_links: Optional[List[str]] = None,
+        canonical_url: Optional[str] = None,
+        anchor_texts: Optional[List[str]] = None,
+        fingerprint: Optional[Tuple[bytes, int]] = None
+    ) -> None:
+        self.url: str = url
+        self.headline: str = headline
+        self.main_text: str = main_text
+        self.datetime_: datetime = datetime_
+        self.hrefs: Optional[List[str]] = hrefs
+        self.netloc_links: Optional[List[str]] = netloc_links
+        self.canonical_url: Optional[str] = canonical_url
+        self.anchor_texts: Optional[List[str]] = anchor_texts
+        self.fingerprint: Optional[Tuple[bytes, int]] = fingerprint
 
     def to_dict(self) -> dict:
-        self.__dict__
+        """Convert the article to a JSON serializable dict.
+
+        Returns:
+            dict: Article with the datetime as ISO 8601 string.
+        """
+        doc: dict = {
+            'url': self.url,
+            'headline': self.headline,
+            'main_text': self.main_text,
+            'datetime_': self.datetime_.isoformat() if isinstance(self.datetime_, datetime) else self.datetime_,
+            'hrefs': self.hrefs,
+            'netloc_links': self.netloc_links,
+            'canonical_url': self.canonical_url
+        }
+        if self.anchor_texts is not None:
+            doc['anchor_texts'] = self.anchor_texts
+        return doc
 
     @staticmethod
     def from_dict(doc: dict):
         sa = ScrapedArticle()
         sa.url = doc['url']
         sa.headline = doc['headline']
-        sa.main_text = doc['maintext']
+        sa.main_text = doc['main_text'] if 'main_text' in doc else doc['maintext']
         sa.datetime_ = doc['datetime_']
-        sa.hrefs = doc['hrefs']
-        sa.netloc_links = doc['netloc_links']
+        if isinstance(sa.datetime_, str):
+            sa.datetime_ = datetime.fromisoformat(sa.datetime_)
+        sa.hrefs = doc.get('hrefs')
+        sa.netloc_links = doc.get('netloc_links')
+        sa.canonical_url = doc.get('canonical_url')
+        sa.anchor_texts = doc.get('anchor_texts')
         return sa
 
+    def to_bytes(self) -> bytes:
+        """Encode the article in the compact binary record format.
+
+        The record starts with a header of version, flags and the number
+        of links, followed by all strings as one NUL separated UTF-8 blob.
+        If every netloc link is also in hrefs, the netloc links are stored
+        as indices into hrefs in front of the blob. Anchor texts follow the
+        links, one per netloc link. A canonical URL is the last string of
+        the blob. A fingerprint sits between the link indices and the blob.
+        A missing url, headline or main text is stored as empty string.
+
+        Raises:
+            ValueError: Raised if the anchor texts do not match the netloc links one to one.
+
+        Returns:
+            bytes: Encoded article.
+        """
+        hrefs: List[str] = self.hrefs if self.hrefs is not None else []
+        netloc_links: List[str] = self.netloc_links if self.netloc_links is not None else []
+        flags: int = (_HAS_HREFS if self.hrefs is not None else 0) | (_HAS_NETLOC_LINKS if self.netloc_links is not None else 0)
+        indices: bytes = b''
+        strings: List[str] = [
+            self.url or '',
+            self.headline or '',
+            self.main_text or '',
+            self.datetime_.isoformat() if isinstance(self.datetime_, datetime) else ''
+        ]
+        strings.extend(hrefs)
+        if netloc_links:
+            positions: dict = {}
+            for i, href in enumerate(hrefs):
+                positions.setdefault(href, i)
+            try:
+                indices = struct.pack('<{}I'.format(len(netloc_links)), *[positions[link] for link in netloc_links])
+                flags |= _NETLOC_LINKS_INDEXED
+            except KeyError:
+                strings.extend(netloc_links)
+        if self.anchor_texts is not None:
+            if len(self.anchor_texts) != len(netloc_links):
+                raise ValueError('{} anchor texts for {} netloc links'.format(len(self.anchor_texts), len(netloc_links)))
+            flags |= _HAS_ANCHOR_TEXTS
+            strings.extend(self.anchor_texts)
+        if self.canonical_url is not None:
+            flags |= _HAS_CANONICAL_URL
+            strings.append(self.canonical_url)
+        if self.fingerprint is not None:
+            flags |= _HAS_FINGERPRINT
+            indices += _FINGERPRINT.pack(*self.fingerprint)
+        joined: str = '\0'.join(strings)
+        if joined.count('\0') != len(strings) - 1:
+            # HTML parsers replace NUL anyway, do the same for strings set by hand
+            joined = '\0'.join(string.replace('\0', '\ufffd') for string in strings)
+        blob: bytes = joined.encode('utf-8', errors='surrogatepass')
+        return _HEADER.pack(RECORD_VERSION, flags, len(hrefs), len(netloc_links)) + indices + blob
+
+    @staticmethod
+    def from_bytes(data: bytes):
+        """Decode an article from the binary record format.
+
+        Args:
+            data (bytes): Encoded article.
+
+        Raises:
+            ValueError: Raised for an unknown record version and for a truncated or corrupt record.
+
+        Returns:
+            ScrapedArticle: Decoded article.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError('Truncated record of {} bytes'.format(len(data)))
+        version, flags, num_hrefs, num_netloc_links = _HEADER.unpack_from(data, 0)
+        if version != RECORD_VERSION:
+            raise ValueError('Unknown record version: {}'.format(version))
+        offset: int = _HEADER.size
+        end: int = offset + (4 * num_netloc_links if flags & _NETLOC_LINKS_INDEXED else 0)
+        end += _FINGERPRINT.size if flags & _HAS_FINGERPRINT else 0
+        if end > len(data):
+            raise ValueError('Truncated record of {} bytes'.format(len(data)))
+        indices: tuple = ()
+        if flags & _NETLOC_LINKS_INDEXED:
+            indices = struct.unpack_from('<{}I'.format(num_netloc_links), data, offset)
+            offset += 4 * num_netloc_links
+        fingerprint: Optional[Tuple[bytes, int]] = None
+        if flags & _HAS_FINGERPRINT:
+            fingerprint = _FINGERPRINT.unpack_from(data, offset)
+            offset += _FINGERPRINT.size
+        strings: List[str] = data[offset:].decode('utf-8', errors='surrogatepass').split('\0')
+        expected: int = 4 + num_hrefs + (1 if flags & _HAS_CANONICAL_URL else 0)
+        if flags & _HAS_NETLOC_LINKS and not flags & _NETLOC_LINKS_INDEXED:
+            expected += num_netloc_links
+        if flags & _HAS_ANCHOR_TEXTS:
+            expected += num_netloc_links
+        # The count of the strings is exact, to_bytes replaces NUL inside of them
+        if len(strings) != expected or any(i >= num_hrefs for i in indices):
+            raise ValueError('Corrupt record: {} strings instead of {}'.format(len(strings), expected))
+        sa = ScrapedArticle(strings[0], strings[1], strings[2])
+        sa.datetime_ = datetime.fromisoformat(strings[3]) if strings[3] else None
+        hrefs: List[str] = strings[4:4 + num_hrefs]
+        position: int = 4 + num_hrefs
+        if flags & _HAS_HREFS:
+            sa.hrefs = hrefs
+        if flags & _HAS_NETLOC_LINKS:
+            if flags & _NETLOC_LINKS_INDEXED:
+                sa.netloc_links = [hrefs[i] for i in indices]
+            else:
+                sa.netloc_links = strings[position:position + num_netloc_links]
+                position += num_netloc_links
+        if flags & _HAS_ANCHOR_TEXTS:
+            sa.anchor_texts = strings[position:position + num_netloc_links]
+        if flags & _HAS_CANONICAL_URL:
+            sa.canonical_url = strings[-1]
+        sa.fingerprint = fingerprint
+        return sa
+
+    def __reduce__(self):
+        # Transfer between processes in the compact record format
+        return (ScrapedArticle.from_bytes, (self.to_bytes(),))
+
     def __eq__(self, o: object) -> bool:
+        if not isinstance(o, ScrapedArticle):
+            return NotImplemented
         return self.url == o.url
 
     def __hash__(self) -> int:
-        return int(sha3_256(self.url.encode()).hexdigest(), 16)
\ No newline at end of file
+        # str caches its own hash, so this is computed once per url
+        return hash(self.url)
+
+
+def write_records(file: BinaryIO, articles: Iterable[ScrapedArticle]) -> int:
+    """Write articles as length prefixed binary records.
+
+    Args:
+        file (BinaryIO): File opened in binary mode.
+        articles (Iterable[ScrapedArticle]): Articles to write.
+
+    Returns:
+        int: Number of written articles.
+    """
+    count: int = 0
+    for article in articles:
+        record: bytes = article.to_bytes()
+        file.write(_LENGTH.pack(len(record)))
+        file.write(record)
+        count += 1
+    return count
+
+
+def iter_records(file: BinaryIO) -> Iterator[ScrapedArticle]:
+    """Read articles written by write_records.
+
+    Args:
+        file (BinaryIO): File opened in binary mode.
+
+    Raises:
+        ValueError: Raised for a truncated or corrupt record, after the complete records before it were yielded.
+
+    Yields:
+        Iterator[ScrapedArticle]: Decoded articles.
+    """
+    while True:
+        prefix: bytes = file.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise ValueError('Truncated record length of {} bytes'.format(len(prefix)))
+        length: int = _LENGTH.unpack(prefix)[0]
+        record: bytes = file.read(length)
+        if len(record) < length:
+            raise ValueError('Truncated record of {} instead of {} bytes'.format(len(record), length))
+        yield ScrapedArticle.from_bytes(record)
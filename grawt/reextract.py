@@ -0,0 +1,54 @@
+"""Scrape the pages of an archive again, without any network I/O.
+
+Usage:
+    python -m grawt.reextract ./archive.warc.gz --output ./articles.reextracted.jsonl
+    python -m grawt.reextract --workers 8
+
+The archive is written by a crawl with `archive_path` configured. The
+articles are written to the configured sink, --output overrides its
+path. The articles per second of the run are printed, the archive can be
+used as a fixed corpus to benchmark scraper changes.
+"""
+import argparse
+from time import perf_counter
+from typing import Optional
+
+from grawt.crawler import DEFAULT_CONFIG_PATH, Crawler
+
+
+def run_reextract(config_path: str, archive_path: Optional[str] = None, output_path: Optional[str] = None, workers: Optional[int] = None) -> int:
+    """Scrape an archive again and write the articles to the sink.
+
+    Args:
+        config_path (str): Path of the config.
+        archive_path (Optional[str], optional): Path of the archive. Defaults to the `archive_path` config value.
+        output_path (Optional[str], optional): Path that overrides `output_path`. Defaults to None.
+        workers (Optional[int], optional): Number of parse processes. Defaults to `parse_workers` or the number of CPUs.
+
+    Returns:
+        int: Number of written articles.
+    """
+    crawler = Crawler(config_path)
+    try:
+        with crawler.open_sink(output_path) as sink:
+            return sink.consume(crawler.reextract(archive_path, workers))
+    finally:
+        crawler.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archive', nargs='?', default=None, help='Archive to read, defaults to archive_path of the config.')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--output', default=None, help='Output path instead of output_path of the config.')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    start: float = perf_counter()
+    count: int = run_reextract(args.config, args.archive, args.output, args.workers)
+    seconds: float = perf_counter() - start
+    print('Wrote {} articles in {:.1f} s, {:.1f} articles/s'.format(count, seconds, count / seconds if seconds else 0.0))
+
+
+if __name__ == '__main__':
+    main()
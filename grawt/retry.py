@@ -0,0 +1,295 @@
+import heapq
+import random
+import socket
+import sqlite3
+from threading import Lock
+from time import monotonic, time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from grawt.fetcher import NOT_HTML, TOO_LARGE, ResponseRejected
+from grawt.scheduler import parse_retry_after
+
+TIMEOUT: str = 'timeout'
+CONNECTION: str = 'connection'
+SERVER_ERROR: str = 'server_error'
+RATE_LIMITED: str = 'rate_limited'
+PERMANENT: str = 'permanent'
+OTHER: str = 'other'
+RETRYABLE: Tuple[str, ...] = (TIMEOUT, CONNECTION, SERVER_ERROR, RATE_LIMITED)
+# Failures that say something about the URL, OTHER is usually a bug of the crawler or a scraper
+DEAD_URL_EVIDENCE: Tuple[str, ...] = RETRYABLE + (PERMANENT, NOT_HTML, TOO_LARGE)
+
+
+class FetchFailed(Exception):
+    """A download that did not return a usable page.
+
+    Args:
+        message (str): Description of the failure.
+        kind (str): One of the failure kinds of this module.
+        status_code (Optional[int], optional): HTTP status of the response. Defaults to None.
+        retry_after (Optional[float], optional): Seconds the server asked to wait. Defaults to None.
+    """
+
+    def __init__(self, message: str, kind: str, status_code: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.kind: str = kind
+        self.status_code: Optional[int] = status_code
+        self.retry_after: Optional[float] = retry_after
+
+
+def classify_status(status_code: int) -> Optional[str]:
+    """Failure kind of an HTTP status.
+
+    Args:
+        status_code (int): HTTP status of a response.
+
+    Returns:
+        Optional[str]: Failure kind or None for a successful response.
+    """
+    if status_code < 400:
+        return None
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code == 408:
+        return TIMEOUT
+    if status_code >= 500:
+        return SERVER_ERROR
+    return PERMANENT
+
+
+def check_status(url: str, status_code: int, retry_after: Optional[str] = None) -> None:
+    """Raise a FetchFailed for an HTTP error status.
+
+    Args:
+        url (str): Downloaded URL.
+        status_code (int): HTTP status of the response.
+        retry_after (Optional[str], optional): Retry-After header of the response. Defaults to None.
+
+    Raises:
+        FetchFailed: Raised for every 4xx and 5xx status.
+    """
+    kind: Optional[str] = classify_status(status_code)
+    if kind is not None:
+        raise FetchFailed('HTTP {} for {}'.format(status_code, url), kind, status_code, parse_retry_after(retry_after))
+
+
+def classify_exception(error: Exception) -> str:
+    """Failure kind of an exception raised while downloading and scraping.
+
+    Args:
+        error (Exception): Raised exception.
+
+    Returns:
+        str: Failure kind, OTHER for errors that a retry would not fix.
+    """
+    if isinstance(error, (FetchFailed, ResponseRejected)):
+        return error.kind
+    if isinstance(error, (requests.Timeout, socket.timeout)):
+        return TIMEOUT
+    if isinstance(error, (requests.ConnectionError, ConnectionError)):
+        return CONNECTION
+    return OTHER
+
+
+class RetryPolicy():
+    """Exponential backoff with jitter.
+
+    The n-th retry waits between half and all of `base_delay * 2**n`,
+    capped at `max_delay`. A Retry-After of the server is the lower bound.
+    """
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 300.0) -> None:
+        self.max_retries: int = max_retries
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+
+    def should_retry(self, kind: str, attempt: int) -> bool:
+        """Decide if a failed download is tried again.
+
+        Args:
+            kind (str): Failure kind.
+            attempt (int): Number of retries that already happened.
+
+        Returns:
+            bool: True if the URL goes into the retry queue.
+        """
+        return kind in RETRYABLE and attempt < self.max_retries
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next retry.
+
+        Args:
+            attempt (int): Number of retries that already happened.
+            retry_after (Optional[float], optional): Seconds the server asked to wait. Defaults to None.
+
+        Returns:
+            float: Delay in seconds.
+        """
+        backoff: float = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay: float = backoff / 2 + random.uniform(0, backoff / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class RetryQueue():
+    """URLs that wait for their next attempt, ordered by due time.
+
+    The crawl engines take due retries before new URLs of the frontier
+    and keep working on the frontier while retries are waiting.
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, str, int, int]] = []
+        self._counter: int = 0
+
+    def push(self, url: str, depth: int, attempt: int, delay: float) -> None:
+        """Schedule a retry.
+
+        Args:
+            url (str): Failed URL.
+            depth (int): Depth of the URL.
+            attempt (int): Number of the upcoming retry, starting at 1.
+            delay (float): Seconds until the retry is due.
+        """
+        self._counter += 1
+        heapq.heappush(self._heap, (monotonic() + delay, self._counter, url, depth, attempt))
+
+    def pop_due(self) -> Optional[Tuple[str, int, int]]:
+        """Take the retry that is due first.
+
+        Returns:
+            Optional[Tuple[str, int, int]]: URL, depth and attempt, None if no retry is due yet.
+        """
+        if not self._heap or self._heap[0][0] > monotonic():
+            return None
+        _, _, url, depth, attempt = heapq.heappop(self._heap)
+        return url, depth, attempt
+
+    def wait_time(self) -> Optional[float]:
+        """Seconds until the next retry is due.
+
+        Returns:
+            Optional[float]: 0 if a retry is due, None if the queue is empty.
+        """
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - monotonic())
+
+    def entries(self) -> List[Tuple[str, int, int, float]]:
+        """Waiting retries, e.g. for a checkpoint.
+
+        Returns:
+            List[Tuple[str, int, int, float]]: URL, depth, attempt and seconds until the retry is due.
+        """
+        now: float = monotonic()
+        return [(url, depth, attempt, max(0.0, due - now)) for due, _, url, depth, attempt in sorted(self._heap)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class FailureStore():
+    """Failure state of URLs across crawls.
+
+    Every URL that was given up is stored with its failure kind, last
+    error and the number of crawls it failed in. URLs with a permanent
+    4xx, or that failed `max_failed_runs` crawls in a row, are dead and
+    skipped until `dead_url_ttl` seconds have passed. A successful
+    download clears the state of an URL.
+
+    Only network and HTTP failures count towards `max_failed_runs`. An
+    OTHER failure, e.g. a scraper exception, is stored with its error
+    but never makes an URL dead, so a scraper bug can not take healthy
+    URLs out of the crawl.
+    """
+
+    def __init__(self, path: str = ':memory:', max_failed_runs: int = 3, dead_url_ttl: float = 30 * 86400) -> None:
+        self._max_failed_runs: int = max_failed_runs
+        self._dead_url_ttl: float = dead_url_ttl
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS failures ('
+            'url TEXT PRIMARY KEY, kind TEXT, status_code INTEGER, error TEXT, '
+            'failed_runs INTEGER, dead INTEGER, last_failure REAL) WITHOUT ROWID'
+        )
+        self._connection.commit()
+        # Only failing URLs are stored, so their state fits in memory
+        self._failed_runs: Dict[str, int] = {}
+        self._dead_since: Dict[str, float] = {}
+        for url, failed_runs, dead, last_failure in self._connection.execute(
+            'SELECT url, failed_runs, dead, last_failure FROM failures'
+        ):
+            self._failed_runs[url] = failed_runs
+            if dead:
+                self._dead_since[url] = last_failure
+
+    def is_dead(self, url: str) -> bool:
+        """Check if an URL is skipped because it failed permanently.
+
+        Args:
+            url (str): URL to look up.
+
+        Returns:
+            bool: True if the URL is dead and its time to live has not passed.
+        """
+        dead_since: Optional[float] = self._dead_since.get(url)
+        return dead_since is not None and time() - dead_since < self._dead_url_ttl
+
+    def record(self, url: str, kind: str, error: str, status_code: Optional[int] = None) -> bool:
+        """Store that an URL was given up in this crawl.
+
+        Args:
+            url (str): Failed URL.
+            kind (str): Failure kind of the last attempt.
+            error (str): Message of the last error.
+            status_code (Optional[int], optional): HTTP status of the last attempt. Defaults to None.
+
+        Returns:
+            bool: True if the URL is dead from now on.
+        """
+        with self._lock:
+            evidence: bool = kind in DEAD_URL_EVIDENCE
+            failed_runs: int = self._failed_runs.get(url, 0) + int(evidence)
+            dead: bool = evidence and (kind == PERMANENT or failed_runs >= self._max_failed_runs)
+            now: float = time()
+            self._failed_runs[url] = failed_runs
+            if dead:
+                self._dead_since[url] = now
+            with self._connection:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (url, kind, status_code, error, failed_runs, int(dead), now)
+                )
+            return dead
+
+    def clear(self, url: str) -> None:
+        """Forget the failures of an URL after a successful download.
+
+        Args:
+            url (str): Downloaded URL.
+        """
+        if url not in self._failed_runs:
+            return
+        with self._lock:
+            self._failed_runs.pop(url, None)
+            self._dead_since.pop(url, None)
+            with self._connection:
+                self._connection.execute('DELETE FROM failures WHERE url = ?', (url,))
+
+    def errors(self) -> List[Tuple[str, str, Optional[int], str]]:
+        """All stored failures.
+
+        Returns:
+            List[Tuple[str, str, Optional[int], str]]: URL, failure kind, HTTP status and error message.
+        """
+        with self._lock:
+            return self._connection.execute('SELECT url, kind, status_code, error FROM failures').fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,255 @@
+from email.utils import parsedate_to_datetime
+from threading import Condition, Lock
+from time import monotonic, sleep, time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from grawt.fetcher import DEFAULT_USER_AGENT
+
+
+class DisallowedByRobots(Exception):
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header.
+
+    Args:
+        value (Optional[str]): Header value, either seconds or an HTTP date.
+
+    Returns:
+        Optional[float]: Seconds to wait or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_crawl_delay(lines: List[str], user_agent: str) -> Optional[float]:
+    """Read the Crawl-delay for a user agent from robots.txt lines.
+
+    urllib.robotparser only understands whole seconds, this also accepts
+    fractions like 0.5.
+
+    Args:
+        lines (List[str]): Lines of the robots.txt.
+        user_agent (str): User agent of the crawler.
+
+    Returns:
+        Optional[float]: Delay in seconds, the value of a matching agent wins over '*'.
+    """
+    agent_token: str = user_agent.split('/')[0].lower()
+    agents: List[str] = []
+    in_rules: bool = False
+    delays: Dict[str, float] = {}
+    for line in lines:
+        key, _, value = line.split('#', 1)[0].partition(':')
+        key, value = key.strip().lower(), value.strip()
+        if key == 'user-agent':
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+        elif key:
+            in_rules = True
+            if key == 'crawl-delay':
+                try:
+                    delay: float = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays[agent] = delay
+    for agent, delay in delays.items():
+        if agent != '*' and agent in agent_token:
+            return delay
+    return delays.get('*')
+
+
+class TokenBucket():
+    """Token bucket that hands out start times instead of blocking."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self._tokens: float = burst
+        self._updated: float = monotonic()
+
+    def reserve(self, now: float) -> float:
+        """Take a token, possibly one that is only available in the future.
+
+        Args:
+            now (float): Current monotonic time.
+
+        Returns:
+            float: Monotonic time at which the request may start.
+        """
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return now
+        return now + -self._tokens / self.rate
+
+
+class HostState():
+    """Politeness state of a single netloc."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.max_rate: float = rate
+        self.active: int = 0
+        self.blocked_until: float = 0.0
+        # Monotonic time of the last backoff, older requests saw the rate before it
+        self.backed_off: float = float('-inf')
+        self.robots: Optional[RobotFileParser] = None
+        self.robots_fetched: float = 0.0
+        self.robots_lock = Lock()
+
+
+class PolitenessScheduler():
+    """Per host request rates, concurrency caps and robots.txt rules.
+
+    Every host gets a token bucket with `requests_per_second` and at most
+    `max_per_host` requests in flight. A `Crawl-delay` in the robots.txt
+    lowers the rate of its host. On a 429 or 503 the rate of the host is
+    multiplied by `backoff_factor` (and a Retry-After is honored), every
+    healthy response raises it by `recovery_step` times the allowed
+    maximum, up to that maximum.
+
+    A host backs off once per window: 429s and 503s of requests that
+    started before its last backoff were answered at the old rate and
+    are not counted again.
+
+    The scheduler blocks the calling thread, so it works for the serial
+    crawl as well as for the fetch threads of the asyncio engine.
+    """
+
+    def __init__(self, config: dict, fetch_robots: Callable[[str], Optional[str]]) -> None:
+        self._fetch_robots: Callable[[str], Optional[str]] = fetch_robots
+        self._rate: float = config.get("requests_per_second", 2.0)
+        self._burst: float = config.get("burst", 1.0)
+        self._max_per_host: int = config.get("max_per_host", 2)
+        self._min_rate: float = config.get("min_requests_per_second", 0.05)
+        self._backoff_factor: float = config.get("backoff_factor", 0.5)
+        self._recovery_step: float = config.get("recovery_step", 0.05)
+        self._respect_robots: bool = config.get("respect_robots", True)
+        self._robots_ttl: float = config.get("robots_cache_ttl", 86400)
+        self._user_agent: str = config.get("user_agent", DEFAULT_USER_AGENT)
+        self._hosts: Dict[str, HostState] = {}
+        self._condition = Condition()
+
+    def _host(self, netloc: str) -> HostState:
+        with self._condition:
+            host: Optional[HostState] = self._hosts.get(netloc)
+            if host is None:
+                host = HostState(self._rate, self._burst)
+                self._hosts[netloc] = host
+            return host
+
+    def robots(self, url: str) -> Optional[RobotFileParser]:
+        """Get the cached robots.txt rules of the host of an URL.
+
+        Args:
+            url (str): Any URL of the host.
+
+        Returns:
+            Optional[RobotFileParser]: Parsed rules or None if robots.txt is ignored.
+        """
+        if not self._respect_robots:
+            return None
+        parsed = urlparse(url)
+        host: HostState = self._host(parsed.netloc)
+        with host.robots_lock:
+            if host.robots is None or monotonic() - host.robots_fetched > self._robots_ttl:
+                robots = RobotFileParser()
+                # A missing or broken robots.txt allows everything
+                lines: List[str] = (self._fetch_robots('{}://{}/robots.txt'.format(parsed.scheme, parsed.netloc)) or '').splitlines()
+                robots.parse(lines)
+                delay: Optional[float] = parse_crawl_delay(lines, self._user_agent)
+                if delay:
+                    with self._condition:
+                        host.max_rate = min(self._rate, 1.0 / float(delay))
+                        host.bucket.rate = min(host.bucket.rate, host.max_rate)
+                host.robots = robots
+                host.robots_fetched = monotonic()
+            return host.robots
+
+    def allowed(self, url: str) -> bool:
+        """Check the robots.txt rules for an URL.
+
+        Args:
+            url (str): URL to fetch.
+
+        Returns:
+            bool: True if the URL may be fetched.
+        """
+        robots: Optional[RobotFileParser] = self.robots(url)
+        return robots is None or robots.can_fetch(self._user_agent, url)
+
+    def acquire(self, url: str) -> float:
+        """Wait until a request to the host of the URL may start.
+
+        Args:
+            url (str): URL to fetch.
+
+        Returns:
+            float: Monotonic start time of the request, to be passed to release.
+        """
+        host: HostState = self._host(urlparse(url).netloc)
+        with self._condition:
+            while host.active >= self._max_per_host:
+                self._condition.wait()
+            host.active += 1
+            now: float = monotonic()
+            start: float = max(host.bucket.reserve(now), host.blocked_until)
+        if start > now:
+            sleep(start - now)
+        return max(start, now)
+
+    def release(
+        self,
+        url: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[str] = None,
+        started: Optional[float] = None
+    ) -> None:
+        """Finish a request and adapt the rate of its host.
+
+        Args:
+            url (str): Fetched URL.
+            status_code (Optional[int], optional): Response status, None on connection errors. Defaults to None.
+            retry_after (Optional[str], optional): Retry-After header of the response. Defaults to None.
+            started (Optional[float], optional): Start time returned by acquire, None counts every 429 and 503. Defaults to None.
+        """
+        host: HostState = self._host(urlparse(url).netloc)
+        with self._condition:
+            host.active -= 1
+            if status_code in (429, 503):
+                now: float = monotonic()
+                if started is None or started >= host.backed_off:
+                    host.bucket.rate = max(self._min_rate, host.bucket.rate * self._backoff_factor)
+                    host.backed_off = now
+                delay: Optional[float] = parse_retry_after(retry_after)
+                if delay is not None:
+                    host.blocked_until = max(host.blocked_until, now + delay)
+            elif status_code is not None and status_code < 500:
+                host.bucket.rate = min(host.max_rate, host.bucket.rate + self._recovery_step * host.max_rate)
+            self._condition.notify_all()
+
+    def rate(self, url: str) -> float:
+        """Current request rate of the host of an URL.
+
+        Args:
+            url (str): Any URL of the host.
+
+        Returns:
+            float: Requests per second.
+        """
+        return self._host(urlparse(url).netloc).bucket.rate
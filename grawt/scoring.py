@@ -0,0 +1,205 @@
+import math
+import re
+import sqlite3
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PRIOR_WEIGHT: float = 10.0
+DEFAULT_BATCH_SIZE: int = 100
+HUB_SEGMENTS = frozenset({
+    'tag', 'tags', 'topic', 'topics', 'author', 'authors', 'profile', 'category', 'categories', 'section', 'sections',
+    'page', 'search', 'login', 'signin', 'register', 'subscribe', 'account', 'video', 'videos', 'gallery', 'galleries',
+    'archive', 'archives', 'about', 'contact', 'privacy', 'terms', 'newsletter', 'newsletters', 'rss', 'feed', 'feeds'
+})
+NAVIGATION_TEXTS = frozenset({'more', 'next', 'previous', 'prev', 'home', 'menu', 'all', 'back', 'top', 'login', 'subscribe'})
+_DATE_PATH = re.compile(r'/(?:19|20)\d{2}/(?:0?[1-9]|1[0-2])(?:/|$)|(?:19|20)\d{2}-[01]\d-[0-3]\d')
+_LONG_ID = re.compile(r'\d{5,}')
+_PAGE_PARAM = re.compile(r'(?:^|&)(?:page|p|offset|start)=\d', re.IGNORECASE)
+_SLUG_SPLIT = re.compile(r'[-_]+')
+_DIGITS = re.compile(r'\d')
+
+
+def url_pattern(url: str) -> Tuple[str, str]:
+    """Host and path shape of an URL, the unit the scores are learned for.
+
+    Digit segments become 'N', other segments with digits 'D', slugs 'S'.
+    The last segment is always abstracted, the sections before it are
+    kept, e.g. '/sport/football/some-long-slug-123' -> '/sport/football/D'.
+
+    Args:
+        url (str): Canonical URL.
+
+    Returns:
+        Tuple[str, str]: Host and pattern.
+    """
+    parts = urlsplit(url)
+    segments: List[str] = [segment for segment in parts.path.split('/') if segment]
+    shape: List[str] = []
+    for i, segment in enumerate(segments):
+        if segment.isdigit():
+            shape.append('N')
+        elif _DIGITS.search(segment):
+            shape.append('D')
+        elif segment.count('-') + segment.count('_') >= 2:
+            shape.append('S')
+        elif i == len(segments) - 1:
+            shape.append('W')
+        else:
+            shape.append(segment.lower())
+    return parts.netloc, '/' + '/'.join(shape)
+
+
+def heuristic_score(url: str, anchor_text: Optional[str] = None) -> float:
+    """Likelihood that an URL is an article, from its shape and link text.
+
+    Date paths, long slugs and numeric ids point to articles. Tag,
+    author and other hub paths, pagination and very short paths point
+    to overview pages. Headlines are longer than navigation texts.
+
+    Args:
+        url (str): Canonical URL.
+        anchor_text (Optional[str], optional): Text of the link. Defaults to None.
+
+    Returns:
+        float: Score between 0 and 1.
+    """
+    parts = urlsplit(url)
+    path: str = parts.path.lower()
+    segments: List[str] = [segment for segment in path.split('/') if segment]
+    points: float = 0.0
+    if _DATE_PATH.search(path):
+        points += 1.5
+    if segments:
+        last: str = segments[-1].rsplit('.', 1)[0]
+        words: int = len([word for word in _SLUG_SPLIT.split(last) if word and not word.isdigit()])
+        if words >= 4:
+            points += 1.5
+        elif words >= 2:
+            points += 0.5
+        if _LONG_ID.search(last):
+            points += 1.0
+        if segments[-1].endswith(('.html', '.htm', '.shtml')):
+            points += 0.3
+    if any(segment in HUB_SEGMENTS for segment in segments):
+        points -= 2.0
+    if _PAGE_PARAM.search(parts.query):
+        points -= 1.0
+    if len(segments) == 0 or (len(segments) == 1 and len(segments[0]) < 15 and not _DIGITS.search(segments[0])):
+        points -= 1.0
+    if anchor_text:
+        words = len(anchor_text.split())
+        if words >= 5:
+            points += 1.0
+        elif words >= 3:
+            points += 0.3
+        elif anchor_text.lower() in NAVIGATION_TEXTS:
+            points -= 1.0
+    return 1.0 / (1.0 + math.exp(-points))
+
+
+class LinkScorer():
+    """Scores links by how likely they lead to an article.
+
+    Without a path only the URL and link text heuristics are used. With
+    a path, the scorer also learns per host and URL pattern how many of
+    the fetched pages had a main text, and keeps these counts in SQLite
+    across crawls. The learned rate replaces the heuristic the more
+    pages of a pattern were seen.
+
+    Args:
+        path (Optional[str], optional): SQLite file of the learned counts. Defaults to None.
+        prior_weight (float, optional): Pages of a pattern at which heuristic and learned rate weigh the same. Defaults to 10.
+    """
+
+    def __init__(self, path: Optional[str] = None, prior_weight: float = DEFAULT_PRIOR_WEIGHT, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self._prior_weight: float = prior_weight
+        self._batch_size: int = batch_size
+        self._counts: Dict[Tuple[str, str], List[int]] = {}
+        self._dirty: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS link_patterns ('
+                'host TEXT, pattern TEXT, articles INTEGER, pages INTEGER, PRIMARY KEY (host, pattern)) WITHOUT ROWID'
+            )
+            self._connection.commit()
+            # Few patterns per host, all of them fit into memory
+            for host, pattern, articles, pages in self._connection.execute('SELECT * FROM link_patterns'):
+                self._counts[(host, pattern)] = [articles, pages]
+
+    def score(self, url: str, anchor_text: Optional[str] = None) -> float:
+        """Score a link before it is fetched.
+
+        Args:
+            url (str): Canonical URL.
+            anchor_text (Optional[str], optional): Text of the link. Defaults to None.
+
+        Returns:
+            float: Score between 0 and 1, higher is fetched first.
+        """
+        score: float = heuristic_score(url, anchor_text)
+        if self._connection is None:
+            return score
+        counts: Optional[List[int]] = self._counts.get(url_pattern(url))
+        if counts is None:
+            return score
+        articles, pages = counts
+        rate: float = (articles + 1) / (pages + 2)
+        weight: float = pages / (pages + self._prior_weight)
+        return (1.0 - weight) * score + weight * rate
+
+    def record(self, url: str, is_article: bool) -> None:
+        """Learn from a fetched page.
+
+        Args:
+            url (str): Canonical URL of the page.
+            is_article (bool): True if the page had a main text.
+        """
+        if self._connection is None:
+            return
+        key: Tuple[str, str] = url_pattern(url)
+        with self._lock:
+            counts: List[int] = self._counts.setdefault(key, [0, 0])
+            counts[0] += int(is_article)
+            counts[1] += 1
+            self._dirty[key] = counts
+            if len(self._dirty) >= self._batch_size:
+                self._write()
+
+    def _write(self) -> None:
+        if not self._dirty:
+            return
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO link_patterns VALUES (?, ?, ?, ?)',
+                ((host, pattern, articles, pages) for (host, pattern), (articles, pages) in self._dirty.items())
+            )
+        self._dirty.clear()
+
+    def flush(self) -> None:
+        if self._connection is None:
+            return
+        with self._lock:
+            self._write()
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        self.flush()
+        self._connection.close()
+
+
+def load_link_scorer(config: dict) -> LinkScorer:
+    """Create the scorer that is configured by `link_scores_path`.
+
+    Args:
+        config (dict): Crawler config.
+
+    Returns:
+        LinkScorer: Scorer, learning if a path is configured.
+    """
+    return LinkScorer(config.get("link_scores_path"), config.get("link_scores_prior_weight", DEFAULT_PRIOR_WEIGHT))
@@ -3,7 +3,10 @@ from datetime import datetime
 from typing import List
 
 from bs4 import BeautifulSoup
+from grawt.document import Document
+from grawt.metadata import PageMetadata
 from grawt.models import ScrapedArticle
+from grawt.stats import stage
 
 
 class BaseScraper(ABC):
@@ -83,9 +86,57 @@ class BaseScraper(ABC):
             ScrapedArticle: Scraped article.
         """
         sa = ScrapedArticle()
-        sa.headline = self.extract_headline(soup)
-        sa.main_text = self.extract_main_text(soup, main_text_min_length)
-        sa.datetime_ = self.extract_date(soup)
-        sa.hrefs = self.extract_all_hrefs(soup)
-        sa.netloc_links = self.extract_netloc_links(soup)
+        with stage('extract_headline'):
+            sa.headline = self.extract_headline(soup)
+        with stage('extract_main_text'):
+            sa.main_text = self.extract_main_text(soup, main_text_min_length)
+        with stage('extract_date'):
+            sa.datetime_ = self.extract_date(soup)
+        with stage('extract_all_hrefs'):
+            sa.hrefs = self.extract_all_hrefs(soup)
+        with stage('extract_netloc_links'):
+            sa.netloc_links = self.extract_netloc_links(soup)
         return sa
+
+    def scrape_document(self, document: Document, main_text_min_length: int) -> ScrapedArticle:
+        """Scrape an article from a parsed document.
+
+        Runs scrape_article on the soup of the document. Scrapers that can
+        work on any parser backend override this method.
+
+        Args:
+            document (Document): Parsed website.
+            main_text_min_length (int): Min length for a paragraph.
+
+        Returns:
+            ScrapedArticle: Scraped article.
+        """
+        return self.scrape_article(document.soup, main_text_min_length)
+
+    def scrape_links(self, document: Document) -> ScrapedArticle:
+        """Scrape only the links of a page, e.g. of a hub whose text is not needed.
+
+        Args:
+            document (Document): Parsed website.
+
+        Returns:
+            ScrapedArticle: Article with hrefs and netloc_links only.
+        """
+        sa = ScrapedArticle()
+        with stage('extract_all_hrefs'):
+            sa.hrefs = self.extract_all_hrefs(document.soup)
+        with stage('extract_netloc_links'):
+            sa.netloc_links = self.extract_netloc_links(document.soup)
+        return sa
+
+    def apply_metadata(self, article: ScrapedArticle, metadata: PageMetadata) -> None:
+        """Fill an article from the structured metadata in the head of its page.
+
+        Does nothing by default, a scraper for a single website knows
+        better where its headline and date are.
+
+        Args:
+            article (ScrapedArticle): Scraped article.
+            metadata (PageMetadata): Metadata of the page, see grawt.metadata.parse_head.
+        """
+        pass
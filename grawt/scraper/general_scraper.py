@@ -1,16 +1,87 @@
-from datetime import date, datetime
-from typing import Any, List
-from urllib.parse import urlparse
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
 
 from bs4 import BeautifulSoup
-from dateutil import parser
+from grawt.document import Document, SoupDocument
+from grawt.metadata import PageMetadata, parse_date
+from grawt.models import ScrapedArticle
 from grawt.scraper.base_scraper import BaseScraper
+from grawt.stats import stage
 
+HEADLINE_TAGS: List[str] = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+SCAN_TAGS: List[str] = ['title', 'base', 'p', 'time', 'a'] + HEADLINE_TAGS
+NO_CRAWL_SCHEMES = ('#', 'mailto:', 'javascript:', 'tel:', 'data:')
 
-class GeneralScraper(BaseScraper):
+
+class PageScan():
+    """Everything the GeneralScraper needs from a page, in document order."""
 
     def __init__(self) -> None:
+        self.title: Any = None
+        self.base: Optional[str] = None
+        self.headline: Any = None
+        self.headline_level: int = 7
+        self.paragraphs: List[str] = []
+        self.date_strs: List[Any] = []
+        self.hrefs: List[str] = []
+        self.anchor_texts: Optional[List[str]] = None
+
+
+def scan_page(document: Document, tags: Iterable[str] = SCAN_TAGS, anchor_texts: bool = False) -> PageScan:
+    """Collect headline candidates, paragraphs, time tags and hrefs.
+
+    The document is traversed only once, no matter how many kinds of
+    tags are collected.
+
+    Args:
+        document (Document): Parsed website.
+        tags (Iterable[str], optional): Tag names to collect. Defaults to SCAN_TAGS.
+        anchor_texts (bool, optional): Also collect the text of every link, in the order of hrefs. Defaults to False.
+
+    Returns:
+        PageScan: Collected values.
+    """
+    scan = PageScan()
+    if anchor_texts:
+        scan.anchor_texts = []
+    for tag in document.iter_tags(tags):
+        name: str = tag.name
+        if name == 'a':
+            link = tag.get('href', None)
+            if link is not None:
+                scan.hrefs.append(link)
+                if scan.anchor_texts is not None:
+                    scan.anchor_texts.append(' '.join(tag.get_text().split()))
+        elif name == 'p':
+            scan.paragraphs.append(tag.get_text())
+        elif name == 'time':
+            scan.date_strs.append(tag.get('datetime'))
+        elif name == 'base':
+            if scan.base is None:
+                scan.base = tag.get('href', None)
+        elif name == 'title':
+            if scan.title is None:
+                scan.title = tag
+        else:
+            # The first headline of the highest level wins
+            level: int = int(name[1])
+            if level < scan.headline_level:
+                scan.headline = tag
+                scan.headline_level = level
+    return scan
+
+
+class GeneralScraper(BaseScraper):
+    """Scraper for any news website.
+
+    Args:
+        anchor_texts (bool, optional): Collect the link texts for the priority frontier. Defaults to False.
+    """
+
+    def __init__(self, anchor_texts: bool = False) -> None:
         super().__init__()
+        self.anchor_texts: bool = anchor_texts
 
     def extract_headline(self, soup: BeautifulSoup) -> str:
         """Extract the headline of the website.
@@ -25,14 +96,7 @@ class GeneralScraper(BaseScraper):
         Returns:
             str: Headline string
         """
-        headlines: List[Any] = []
-        for i in range(1, 7):
-            curr_hl: List[Any] = soup.find_all(f'h{i}')
-            headlines.extend(curr_hl)
-        if len(headlines) > 0:
-            return headlines[0].get_text()
-        else:
-            return soup.find('title').get_text()
+        return self._headline(scan_page(SoupDocument(soup), ['title'] + HEADLINE_TAGS))
 
     def extract_main_text(self, soup: BeautifulSoup, min_chars: int) -> str:
         """Extract the main text of the website.
@@ -47,12 +111,7 @@ class GeneralScraper(BaseScraper):
         Returns:
             str: Main text of the website.
         """
-        full_text: str = ''
-        for p in soup.find_all('p'):
-            text: str = p.get_text()
-            if len(text) >= min_chars:
-                full_text += text + '\n'
-        return full_text
+        return self._main_text(scan_page(SoupDocument(soup), ['p']), min_chars)
 
     def extract_date(self, soup: BeautifulSoup) -> datetime:
         """Extract the publish date of a website.
@@ -65,18 +124,7 @@ class GeneralScraper(BaseScraper):
         Returns:
             datetime: Latest html time object.
         """
-        datetimes: List[datetime] = []
-        for time in soup.find_all('time'):
-            date_str = time.get('datetime')
-            dt: datetime 
-            try:
-                datetimes.append(parser.parse(date_str))
-            except parser.ParserError as pe:
-                print(pe)
-        if len(datetimes) > 0:
-            return min(datetimes)
-        else:
-            return datetime.now()
+        return self._date(scan_page(SoupDocument(soup), ['time']))
 
     def extract_all_hrefs(self, soup: BeautifulSoup) -> List[str]:
         """Extract all hrefs found on a website.
@@ -87,17 +135,15 @@ class GeneralScraper(BaseScraper):
         Returns:
             List[str]: List with hrefs.
         """
-        links: List[str] = []
-        for a in soup.find_all('a'):
-            link = a.get('href', None)
-            if link is not None:
-                links.append(link)
-        return links
+        return scan_page(SoupDocument(soup), ['a']).hrefs
 
     def extract_netloc_links(self, soup: BeautifulSoup) -> List[str]:
-        """Tries to find all links other websites.
+        """Tries to find all links that can be crawled.
 
-        Take all urls that have a netloc value from the urllib.parse.urlparse().
+        Takes absolute links and relative links, but no anchors or mailto
+        and javascript links. If the page has a <base> tag, relative links
+        are resolved against it. The remaining relative links are resolved
+        against the page URL by the crawler.
 
         Args:
             soup (BeautifulSoup): Websites soup.
@@ -105,9 +151,121 @@ class GeneralScraper(BaseScraper):
         Returns:
             List[str]: List of links.
         """
+        scan: PageScan = scan_page(SoupDocument(soup), ['base', 'a'])
+        return self._netloc_links(scan.hrefs, scan.base)
+
+    def scrape_article(self, soup: BeautifulSoup, main_text_min_length: int) -> ScrapedArticle:
+        """Scrape an article with a single pass over the websites soup.
+
+        Produces the same article as the separate extract methods.
+
+        Args:
+            soup (BeautifulSoup): Websites soup.
+            main_text_min_length (int): Min length for a paragraph.
+
+        Returns:
+            ScrapedArticle: Scraped article.
+        """
+        return self.scrape_document(SoupDocument(soup), main_text_min_length)
+
+    def scrape_document(self, document: Document, main_text_min_length: int) -> ScrapedArticle:
+        """Scrape an article with a single pass over a document of any parser backend.
+
+        Args:
+            document (Document): Parsed website.
+            main_text_min_length (int): Min length for a paragraph.
+
+        Returns:
+            ScrapedArticle: Scraped article.
+        """
+        with stage('scan'):
+            scan: PageScan = scan_page(document, anchor_texts=self.anchor_texts)
+        sa = ScrapedArticle()
+        with stage('extract_headline'):
+            sa.headline = self._headline(scan)
+        with stage('extract_main_text'):
+            sa.main_text = self._main_text(scan, main_text_min_length)
+        with stage('extract_date'):
+            sa.datetime_ = self._date(scan)
+        sa.hrefs = scan.hrefs
+        with stage('extract_netloc_links'):
+            if scan.anchor_texts is None:
+                sa.netloc_links = self._netloc_links(scan.hrefs, scan.base)
+            else:
+                sa.netloc_links, sa.anchor_texts = self._netloc_links_with_texts(scan.hrefs, scan.anchor_texts, scan.base)
+        return sa
+
+    def scrape_links(self, document: Document) -> ScrapedArticle:
+        """Scrape only the links of a page, without its headings and paragraphs.
+
+        Args:
+            document (Document): Parsed website.
+
+        Returns:
+            ScrapedArticle: Article with hrefs, netloc_links and optionally anchor_texts.
+        """
+        with stage('scan'):
+            scan: PageScan = scan_page(document, ['base', 'a'], anchor_texts=self.anchor_texts)
+        sa = ScrapedArticle()
+        sa.hrefs = scan.hrefs
+        with stage('extract_netloc_links'):
+            if scan.anchor_texts is None:
+                sa.netloc_links = self._netloc_links(scan.hrefs, scan.base)
+            else:
+                sa.netloc_links, sa.anchor_texts = self._netloc_links_with_texts(scan.hrefs, scan.anchor_texts, scan.base)
+        return sa
+
+    def apply_metadata(self, article: ScrapedArticle, metadata: PageMetadata) -> None:
+        """Prefer the headline and publish date that the page declares in its head.
+
+        They are meant for search engines and social networks, and more
+        reliable than the first heading and the oldest <time> tag.
+
+        Args:
+            article (ScrapedArticle): Scraped article.
+            metadata (PageMetadata): Metadata of the page.
+        """
+        if metadata.headline:
+            article.headline = metadata.headline
+        if metadata.published is not None:
+            article.datetime_ = metadata.published
+
+    def _headline(self, scan: PageScan) -> str:
+        if scan.headline is not None:
+            return scan.headline.get_text()
+        return scan.title.get_text()
+
+    def _main_text(self, scan: PageScan, min_chars: int) -> str:
+        return ''.join([text + '\n' for text in scan.paragraphs if len(text) >= min_chars])
+
+    def _date(self, scan: PageScan) -> datetime:
+        datetimes: List[datetime] = [parsed for parsed in map(parse_date, scan.date_strs) if parsed is not None]
+        if len(datetimes) > 0:
+            # Pages mix dates with and without time zone, the latter are compared as UTC
+            return min(datetimes, key=lambda value: value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc))
+        else:
+            return datetime.now()
+
+    def _netloc_links(self, hrefs: List[str], base: Optional[str] = None) -> List[str]:
         netloc_urls: List[str] = []
-        for url in self.extract_all_hrefs(soup):
-            parsed = urlparse(url)
-            if parsed.netloc:
-                netloc_urls.append(url)
+        for url in hrefs:
+            url = url.strip()
+            if not url or url.lower().startswith(NO_CRAWL_SCHEMES):
+                continue
+            if base and not urlparse(url).netloc:
+                url = urljoin(base, url)
+            netloc_urls.append(url)
         return netloc_urls
+
+    def _netloc_links_with_texts(self, hrefs: List[str], texts: List[str], base: Optional[str] = None) -> Tuple[List[str], List[str]]:
+        netloc_urls: List[str] = []
+        netloc_texts: List[str] = []
+        for url, text in zip(hrefs, texts):
+            url = url.strip()
+            if not url or url.lower().startswith(NO_CRAWL_SCHEMES):
+                continue
+            if base and not urlparse(url).netloc:
+                url = urljoin(base, url)
+            netloc_urls.append(url)
+            netloc_texts.append(text)
+        return netloc_urls, netloc_texts
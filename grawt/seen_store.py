@@ -0,0 +1,294 @@
+from abc import ABC, abstractmethod
+import json
+import logging
+import os
+import sqlite3
+from threading import Lock
+from typing import Iterable, Iterator, List, Set
+
+from grawt.bloom_filter import BloomFilter
+
+DEFAULT_BATCH_SIZE: int = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSeenStore(ABC):
+    """Persistent set of URLs that were already scraped."""
+
+    @abstractmethod
+    def __contains__(self, url: str) -> bool:
+        """Implement a lookup for an URL.
+
+        Args:
+            url (str): URL to look up.
+
+        Returns:
+            bool: True if the URL was already scraped.
+        """
+        pass
+
+    @abstractmethod
+    def add(self, url: str) -> None:
+        """Implement a method that marks an URL as scraped.
+
+        Args:
+            url (str): Scraped URL.
+        """
+        pass
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Implement a method that persists all pending URLs.
+        """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[str]:
+        pass
+
+    def close(self) -> None:
+        """Persist pending URLs and release the backend.
+        """
+        self.flush()
+
+
+class JsonSeenStore(BaseSeenStore):
+    """The original 'urls.json' list, kept completely in memory.
+
+    The file is rewritten as a whole on every flush.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path: str = path
+        if not os.path.exists(self._path):
+            with open(self._path, 'w') as file:
+                json.dump([], file)
+        with open(self._path, 'r') as file:
+            self._urls: Set[str] = set(json.load(file))
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._urls
+
+    def add(self, url: str) -> None:
+        self._urls.add(url)
+
+    def flush(self) -> None:
+        with open(self._path, 'w') as file:
+            json.dump(list(self._urls), file)
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._urls)
+
+
+class SqliteSeenStore(BaseSeenStore):
+    """URLs in an indexed SQLite table.
+
+    Lookups use the primary key index and only the URLs of the current
+    batch are held in memory. A batch is committed every `batch_size`
+    added URLs, so a crash loses at most one batch.
+
+    Every commit that adds URLs increments a generation in the meta
+    table, a BloomSeenStore compares it with its filter.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE, migrate_from: str = None) -> None:
+        self._batch_size: int = batch_size
+        self._pending: Set[str] = set()
+        self._lock = Lock()
+        # Workers of a distributed crawl share the file, wait for their commits instead of failing
+        self._connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY) WITHOUT ROWID')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self._connection.commit()
+        if migrate_from is not None:
+            self.migrate_json(migrate_from)
+
+    def migrate_json(self, json_path: str) -> int:
+        """Import an 'urls.json' file once.
+
+        Args:
+            json_path (str): Path to the urls file.
+
+        Returns:
+            int: Number of imported URLs, 0 if the file was already imported or does not exist.
+        """
+        with self._lock:
+            key: str = 'migrated:' + os.path.abspath(json_path)
+            if not os.path.exists(json_path):
+                return 0
+            if self._connection.execute('SELECT 1 FROM meta WHERE key = ?', (key,)).fetchone():
+                return 0
+            with open(json_path, 'r') as file:
+                urls: List[str] = json.load(file)
+            with self._connection:
+                self._insert(urls)
+                self._connection.execute('INSERT INTO meta (key, value) VALUES (?, ?)', (key, str(len(urls))))
+            logger.info('Migrated %d urls from %s', len(urls), json_path, extra={'event': 'migrated', 'urls': len(urls)})
+            return len(urls)
+
+    @property
+    def generation(self) -> int:
+        """Number of commits that added URLs, over the lifetime of the file.
+
+        Returns:
+            int: Current generation.
+        """
+        with self._lock:
+            return int(self._connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def _insert(self, urls: Iterable[str]) -> None:
+        # Runs inside the transaction of the caller, so the generation and the URLs are committed together
+        cursor = self._connection.executemany('INSERT OR IGNORE INTO urls (url) VALUES (?)', ((url,) for url in urls))
+        if cursor.rowcount > 0:
+            self._connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            if url in self._pending:
+                return True
+            return self._connection.execute('SELECT 1 FROM urls WHERE url = ?', (url,)).fetchone() is not None
+
+    def add(self, url: str) -> None:
+        with self._lock:
+            self._pending.add(url)
+            if len(self._pending) >= self._batch_size:
+                self._write_pending()
+
+    def add_many(self, urls: Iterable[str]) -> None:
+        """Mark several URLs as scraped.
+
+        Args:
+            urls (Iterable[str]): Scraped URLs.
+        """
+        for url in urls:
+            self.add(url)
+
+    def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        with self._connection:
+            self._insert(self._pending)
+        self._pending.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_pending()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        self.flush()
+        cursor = self._connection.cursor()
+        cursor.execute('SELECT url FROM urls')
+        while True:
+            rows = cursor.fetchmany(DEFAULT_BATCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._connection.close()
+
+
+class BloomSeenStore(BaseSeenStore):
+    """Bloom filter in front of an exact seen store.
+
+    Most lookups are for new URLs, these are answered by the memory
+    mapped filter alone. Only possible hits are confirmed with the
+    exact store.
+
+    A filter that misses URLs would answer with false negatives, so it is
+    rebuilt from the exact store when its generation differs from the one
+    of the store, e.g. after a crawl in 'sqlite' mode or a crash between
+    the two flushes.
+    """
+
+    def __init__(self, exact_store: SqliteSeenStore, path: str, capacity: int = 10_000_000, error_rate: float = 0.001) -> None:
+        self._exact_store: SqliteSeenStore = exact_store
+        self._bloom_filter = BloomFilter(path, capacity=capacity, error_rate=error_rate)
+        generation: int = self._exact_store.generation
+        if self._bloom_filter.created or self._bloom_filter.generation != generation:
+            if not self._bloom_filter.created:
+                logger.info(
+                    'Rebuilding the bloom filter %s, it is at generation %d and the seen store at %d', path, self._bloom_filter.generation,
+                    generation, extra={'event': 'bloom_filter_rebuilt'}
+                )
+                self._bloom_filter.reset()
+            for url in self._exact_store:
+                self._bloom_filter.add(url)
+            self._bloom_filter.generation = self._exact_store.generation
+            self._bloom_filter.flush()
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self._bloom_filter:
+            return False
+        return url in self._exact_store
+
+    def add(self, url: str) -> None:
+        self._bloom_filter.add(url)
+        self._exact_store.add(url)
+
+    def flush(self) -> None:
+        self._exact_store.flush()
+        self._bloom_filter.generation = self._exact_store.generation
+        self._bloom_filter.flush()
+
+    def __len__(self) -> int:
+        return len(self._exact_store)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._exact_store)
+
+    def close(self) -> None:
+        self._exact_store.close()
+        self._bloom_filter.close()
+
+
+def load_seen_store(config: dict) -> BaseSeenStore:
+    """Create the seen store that is configured by `seen_store`.
+
+    Args:
+        config (dict): Crawler config.
+
+    Raises:
+        ValueError: Raised for an unknown seen store type.
+
+    Returns:
+        BaseSeenStore: Configured seen store.
+    """
+    store_type: str = config.get("seen_store", "json")
+    urls_file: str = config["urls_file_path"]
+    if store_type == "json":
+        return JsonSeenStore(urls_file)
+    if store_type in ("sqlite", "bloom"):
+        sqlite_store = SqliteSeenStore(
+            config.get("seen_store_path", "./urls.sqlite"),
+            batch_size=config.get("seen_store_batch_size", DEFAULT_BATCH_SIZE),
+            migrate_from=urls_file
+        )
+        if store_type == "sqlite":
+            return sqlite_store
+        return BloomSeenStore(
+            sqlite_store,
+            config.get("bloom_filter_path", "./urls.bloom"),
+            capacity=config.get("bloom_filter_capacity", 10_000_000),
+            error_rate=config.get("bloom_filter_error_rate", 0.001)
+        )
+    raise ValueError('Unknown seen store: {}'.format(store_type))
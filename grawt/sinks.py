@@ -0,0 +1,155 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+from typing import Iterable, List
+
+from grawt.models import ScrapedArticle
+
+DEFAULT_BATCH_SIZE: int = 100
+
+
+class BaseSink(ABC):
+    """Incremental output for scraped articles.
+
+    Articles are buffered and written in batches of `batch_size`. With
+    `fsync` every batch is forced to disk before the next one starts.
+    """
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, fsync: bool = False) -> None:
+        self._batch_size: int = batch_size
+        self._fsync: bool = fsync
+        self._batch: List[ScrapedArticle] = []
+        self.written: int = 0
+
+    def write(self, article: ScrapedArticle) -> None:
+        """Add an article to the current batch.
+
+        Args:
+            article (ScrapedArticle): Scraped article.
+        """
+        self._batch.append(article)
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def consume(self, articles: Iterable[ScrapedArticle]) -> int:
+        """Write all articles of an iterable, e.g. Crawler.crawl_iter.
+
+        Args:
+            articles (Iterable[ScrapedArticle]): Scraped articles.
+
+        Returns:
+            int: Number of written articles.
+        """
+        count: int = 0
+        for article in articles:
+            self.write(article)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self) -> None:
+        """Write the current batch.
+        """
+        if not self._batch:
+            return
+        self._write_batch(self._batch)
+        self.written += len(self._batch)
+        self._batch = []
+
+    @abstractmethod
+    def _write_batch(self, articles: List[ScrapedArticle]) -> None:
+        """Implement a method that persists a batch of articles.
+
+        Args:
+            articles (List[ScrapedArticle]): Batch of articles.
+        """
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class JsonlSink(BaseSink):
+    """Appends one JSON document per article to a file."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE, fsync: bool = False) -> None:
+        super().__init__(batch_size, fsync)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _write_batch(self, articles: List[ScrapedArticle]) -> None:
+        self._file.write(''.join(json.dumps(article.to_dict(), ensure_ascii=False) + '\n' for article in articles))
+        self._file.flush()
+        if self._fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class SqliteSink(BaseSink):
+    """Stores articles in an 'articles' table, one row per URL."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE, fsync: bool = False) -> None:
+        super().__init__(batch_size, fsync)
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous={}'.format('FULL' if fsync else 'NORMAL'))
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS articles ('
+            'url TEXT PRIMARY KEY, headline TEXT, main_text TEXT, datetime TEXT, hrefs TEXT, netloc_links TEXT, canonical_url TEXT)'
+        )
+        columns: List[str] = [row[1] for row in self._connection.execute('PRAGMA table_info(articles)')]
+        if 'canonical_url' not in columns:
+            # Tables created before duplicates were linked
+            self._connection.execute('ALTER TABLE articles ADD COLUMN canonical_url TEXT')
+        self._connection.commit()
+
+    def _write_batch(self, articles: List[ScrapedArticle]) -> None:
+        rows = []
+        for article in articles:
+            doc: dict = article.to_dict()
+            rows.append((
+                doc['url'], doc['headline'], doc['main_text'], doc['datetime_'],
+                json.dumps(doc['hrefs']), json.dumps(doc['netloc_links']), doc['canonical_url']
+            ))
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO articles '
+                '(url, headline, main_text, datetime, hrefs, netloc_links, canonical_url) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def close(self) -> None:
+        super().close()
+        self._connection.close()
+
+
+def load_sink(config: dict) -> BaseSink:
+    """Create the sink that is configured by `output_sink` and `output_path`.
+
+    Args:
+        config (dict): Crawler config.
+
+    Raises:
+        ValueError: Raised for an unknown sink type.
+
+    Returns:
+        BaseSink: Configured sink.
+    """
+    sink_type: str = config.get("output_sink", "jsonl")
+    path: str = config.get("output_path", "./articles.{}".format(sink_type))
+    batch_size: int = config.get("output_batch_size", DEFAULT_BATCH_SIZE)
+    fsync: bool = config.get("output_fsync", False)
+    if sink_type == "jsonl":
+        return JsonlSink(path, batch_size, fsync)
+    if sink_type == "sqlite":
+        return SqliteSink(path, batch_size, fsync)
+    raise ValueError('Unknown output sink: {}'.format(sink_type))
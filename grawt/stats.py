@@ -0,0 +1,369 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+import cProfile
+import http.server
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from time import perf_counter, time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+Labels = Tuple[Tuple[str, str], ...]
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage of the page that is processed by the current thread.
+
+    Does nothing unless the caller collects stage timings with
+    collect_stages, so scrapers can use it unconditionally.
+
+    Args:
+        name (str): Name of the stage, e.g. 'extract_date'.
+    """
+    timings: Optional[Dict[str, float]] = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+    start: float = perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + perf_counter() - start
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collect the timings of all stages run by the current thread.
+
+    Yields:
+        Iterator[Dict[str, float]]: Seconds per stage name, filled when the block ends.
+    """
+    previous: Optional[Dict[str, float]] = getattr(_local, 'timings', None)
+    timings: Dict[str, float] = {}
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+class Histogram():
+    """Latency histogram with the cumulative buckets of Prometheus."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, share: float) -> float:
+        """Upper bound of the bucket that holds the quantile.
+
+        Args:
+            share (float): Quantile, e.g. 0.99.
+
+        Returns:
+            float: Seconds, the maximum for the open-ended bucket.
+        """
+        rank: float = share * self.count
+        seen: int = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return 0.0
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class CrawlStats():
+    """Counters, gauges and stage latencies of a crawler.
+
+    All methods are thread safe. `snapshot` returns the values as dict,
+    `to_prometheus` in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = 'grawt') -> None:
+        self._prefix: str = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self._gauges: Dict[str, float] = {}
+        self._stages: Dict[str, Histogram] = {}
+        self.started: float = time()
+
+    def incr(self, name: str, value: float = 1, **labels: object) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): Counter name, e.g. 'http_responses'.
+            value (float, optional): Increment. Defaults to 1.
+            labels: Labels of the counter, e.g. status=200.
+        """
+        key: Labels = _labels(labels)
+        with self._lock:
+            series: Dict[Labels, float] = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, stage_name: str, seconds: float) -> None:
+        """Record the duration of a stage.
+
+        Args:
+            stage_name (str): Stage, e.g. 'fetch' or 'parse'.
+            seconds (float): Duration.
+        """
+        with self._lock:
+            histogram: Optional[Histogram] = self._stages.get(stage_name)
+            if histogram is None:
+                histogram = self._stages[stage_name] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_all(self, timings: Dict[str, float]) -> None:
+        for stage_name, seconds in timings.items():
+            self.observe(stage_name, seconds)
+
+    @contextmanager
+    def timer(self, stage_name: str) -> Iterator[None]:
+        """Time the block as a stage.
+
+        Args:
+            stage_name (str): Stage, e.g. 'seen_store'.
+        """
+        start: float = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage_name, perf_counter() - start)
+
+    def counter(self, name: str, **labels: object) -> float:
+        """Current value of a counter, summed over all labels if none are given.
+
+        Args:
+            name (str): Counter name.
+
+        Returns:
+            float: Counter value.
+        """
+        with self._lock:
+            series: Dict[Labels, float] = self._counters.get(name, {})
+            if labels:
+                return series.get(_labels(labels), 0)
+            return sum(series.values())
+
+    def snapshot(self) -> dict:
+        """All values as JSON serializable dict.
+
+        Returns:
+            dict: Counters, gauges and per stage count, total, mean, p50, p99 and max in seconds.
+        """
+        with self._lock:
+            counters: dict = {}
+            for name, series in self._counters.items():
+                for labels, value in series.items():
+                    key: str = name + ''.join('{{{}={}}}'.format(k, v) for k, v in labels)
+                    counters[key] = value
+            stages: dict = {
+                name: {
+                    'count': histogram.count,
+                    'total': round(histogram.total, 6),
+                    'mean': round(histogram.total / histogram.count, 6) if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                    'max': round(histogram.max, 6)
+                }
+                for name, histogram in self._stages.items()
+            }
+            return {
+                'uptime_seconds': round(time() - self.started, 3),
+                'counters': counters,
+                'gauges': dict(self._gauges),
+                'stages': stages
+            }
+
+    def to_prometheus(self) -> str:
+        """Values in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric: str = '{}_{}_total'.format(self._prefix, name)
+                lines.append('# TYPE {} counter'.format(metric))
+                for labels, value in sorted(series.items()):
+                    lines.append('{}{} {}'.format(metric, _format_labels(labels), value))
+            for name, value in sorted(self._gauges.items()):
+                metric = '{}_{}'.format(self._prefix, name)
+                lines.append('# TYPE {} gauge'.format(metric))
+                lines.append('{} {}'.format(metric, value))
+            if self._stages:
+                metric = '{}_stage_seconds'.format(self._prefix)
+                lines.append('# TYPE {} histogram'.format(metric))
+                for name, histogram in sorted(self._stages.items()):
+                    cumulative: int = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), histogram.counts):
+                        cumulative += count
+                        le: str = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(metric, name, le, cumulative))
+                    lines.append('{}_sum{{stage="{}"}} {}'.format(metric, name, histogram.total))
+                    lines.append('{}_count{{stage="{}"}} {}'.format(metric, name, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the metrics to a file, e.g. for the textfile collector of the node exporter.
+
+        The file is replaced atomically, a scraper never reads half a file.
+
+        Args:
+            path (str): Path of the .prom file.
+        """
+        temporary_path: str = path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, value.replace('"', '\\"')) for key, value in labels) + '}'
+
+
+def serve_prometheus(stats: CrawlStats, port: int, host: str = '127.0.0.1') -> http.server.ThreadingHTTPServer:
+    """Serve the metrics on http://host:port/metrics in a background thread.
+
+    Args:
+        stats (CrawlStats): Stats of the crawler.
+        port (int): Port of the endpoint.
+        host (str, optional): Interface to bind. Defaults to '127.0.0.1'.
+
+    Returns:
+        http.server.ThreadingHTTPServer: Running server, call shutdown() to stop it.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body: bytes = stats.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class PageProfiler():
+    """Opt-in cProfile of the parse and extraction of single pages.
+
+    Every page is profiled, but only the profiles of pages that take
+    longer than `threshold` seconds are written to `directory`, one
+    .prof file per page that can be opened with pstats or snakeviz.
+    """
+
+    def __init__(self, directory: str, threshold: float = 1.0) -> None:
+        self.directory: str = directory
+        self.threshold: float = threshold
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def profile(self, url: str) -> Iterator[None]:
+        """Profile the block and keep the profile if it was slow.
+
+        Args:
+            url (str): URL of the page, used for the file name.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this thread or process
+            yield
+            return
+        start: float = perf_counter()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed: float = perf_counter() - start
+            if elapsed >= self.threshold:
+                name: str = re.sub(r'[^A-Za-z0-9._-]+', '_', url)[:150]
+                path: str = os.path.join(self.directory, '{}-{}.prof'.format(int(time()), name))
+                profiler.dump_stats(path)
+                logging.getLogger(__name__).warning(
+                    'Slow page %s took %.2fs, profile written to %s', url, elapsed, path,
+                    extra={'event': 'slow_page', 'url': url, 'seconds': round(elapsed, 3), 'profile': path}
+                )
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per log record, with the fields passed as `extra`."""
+
+    _RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc: dict = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in self._RESERVED:
+                doc[key] = value
+        if record.exc_info:
+            doc['exception'] = self.formatException(record.exc_info)
+        return json.dumps(doc, default=str)
+
+
+def setup_logging(config: dict) -> None:
+    """Attach a stdout handler to the 'grawt' logger unless the application configured one.
+
+    Args:
+        config (dict): Crawler config, `log_level` and `log_format` ('text' or 'json').
+    """
+    logger: logging.Logger = logging.getLogger('grawt')
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if config.get("log_format", "text") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(config.get("log_level", "INFO"))
+    # Records of the crawler do not need to reach the root logger twice
+    logger.propagate = False
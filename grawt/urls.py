@@ -0,0 +1,212 @@
+from fnmatch import translate
+from functools import lru_cache
+import ipaddress
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote_plus, urljoin, urlsplit, urlunsplit
+
+try:
+    import tldextract
+    # The bundled public suffix list, no download at runtime. Its private part splits e.g. github.io into sites
+    _TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True)
+    TLDEXTRACT_AVAILABLE: bool = True
+except ImportError:
+    TLDEXTRACT_AVAILABLE = False
+
+DEFAULT_STRIP_PARAMS: List[str] = [
+    'utm_*', 'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', 'ref_src', 'cmpid', 'ito'
+]
+DEFAULT_CACHE_SIZE: int = 100_000
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Second level labels under country code TLDs that are sold like TLDs, e.g. co.uk or com.au
+_GENERIC_SECOND_LEVEL = {'ac', 'co', 'com', 'edu', 'gov', 'gv', 'ltd', 'mil', 'ne', 'net', 'or', 'org', 'plc', 'sch'}
+# Hosting domains of the private public suffix list where every subdomain is a site of its own
+_SHARED_HOSTING_SUFFIXES = {
+    'appspot.com', 'azurewebsites.net', 'blogspot.com', 'cloudfront.net', 'github.io', 'gitlab.io', 'herokuapp.com',
+    'netlify.app', 'pages.dev'
+}
+
+
+@lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def registrable_domain(host: str) -> str:
+    """Domain under the public suffix, e.g. 'dailymail.co.uk' for 'www.dailymail.co.uk'.
+
+    Uses the public suffix list of `tldextract` if it is installed and
+    otherwise a heuristic for the common country code suffixes and a few
+    large hosting domains. Without `tldextract`, the subdomains of other
+    hosting domains count as one site, e.g. all blogs of a blog hoster.
+
+    Args:
+        host (str): Host name without port.
+
+    Returns:
+        str: Registrable domain, the host itself for IP addresses and single labels.
+    """
+    host = host.lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return host
+    except ValueError:
+        pass
+    if TLDEXTRACT_AVAILABLE:
+        extracted = _TLD_EXTRACT(host)
+        if extracted.domain and extracted.suffix:
+            return '{}.{}'.format(extracted.domain, extracted.suffix)
+        return host
+    labels: List[str] = host.split('.')
+    shared_hosting: bool = '.'.join(labels[-2:]) in _SHARED_HOSTING_SUFFIXES
+    if len(labels) >= 3 and (shared_hosting or (len(labels[-1]) == 2 and labels[-2] in _GENERIC_SECOND_LEVEL)):
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def same_site(url: str, site: str) -> bool:
+    """Check if an URL belongs to the registrable domain of a site.
+
+    Args:
+        url (str): Absolute URL.
+        site (str): Host name of the site, e.g. 'www.dailymail.co.uk'.
+
+    Returns:
+        bool: True if both share the registrable domain.
+    """
+    host: Optional[str] = urlsplit(url).hostname
+    return host is not None and registrable_domain(host) == registrable_domain(site.split(':')[0])
+
+
+def _param_name(param: str) -> str:
+    return unquote_plus(param.partition('=')[0])
+
+
+class UrlCanonicalizer():
+    """Brings URLs into one canonical form before they are queued or stored.
+
+    Relative links are resolved against the page, the scheme and host are
+    lowercased and default ports, fragments and tracking parameters are
+    removed. The remaining query parameters are sorted by name but keep
+    their encoding, and a trailing slash is removed from the path. Results
+    are memoized, most links of a website show up on many of its pages.
+
+    Args:
+        strip_params (Iterable[str], optional): Query parameters to remove, '*' wildcards are allowed. Defaults to DEFAULT_STRIP_PARAMS.
+        sort_params (bool, optional): Sort the query parameters. Defaults to True.
+        strip_trailing_slash (bool, optional): Remove a trailing slash from the path. Defaults to True.
+        cache_size (int, optional): Number of memoized URLs. Defaults to DEFAULT_CACHE_SIZE.
+    """
+
+    def __init__(
+        self,
+        strip_params: Iterable[str] = DEFAULT_STRIP_PARAMS,
+        sort_params: bool = True,
+        strip_trailing_slash: bool = True,
+        cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        patterns: List[str] = [translate(pattern.lower()) for pattern in strip_params]
+        self._strip_param = re.compile('|'.join(patterns)).match if patterns else None
+        self._sort_params: bool = sort_params
+        self._strip_trailing_slash: bool = strip_trailing_slash
+        self._canonical_absolute = lru_cache(maxsize=cache_size)(self._canonicalize_absolute)
+
+    def canonicalize(self, url: str, base_url: Optional[str] = None) -> Optional[str]:
+        """Canonical form of an URL.
+
+        Args:
+            url (str): Absolute URL or a link relative to base_url.
+            base_url (Optional[str], optional): URL of the page the link was found on. Defaults to None.
+
+        Returns:
+            Optional[str]: Canonical URL, None for other schemes than http and https or invalid URLs.
+        """
+        url = url.strip()
+        if not url.lower().startswith(('http://', 'https://')):
+            if base_url is None:
+                return None
+            url = urljoin(base_url, url)
+        return self._canonical_absolute(url)
+
+    def canonicalize_links(self, links: Iterable[str], base_url: Optional[str] = None) -> List[str]:
+        """Canonical forms of the links of a page, without duplicates.
+
+        Args:
+            links (Iterable[str]): Links found on the page.
+            base_url (Optional[str], optional): URL of the page. Defaults to None.
+
+        Returns:
+            List[str]: Canonical URLs in the order of their first occurrence.
+        """
+        canonical: dict = {}
+        for link in links:
+            url: Optional[str] = self.canonicalize(link, base_url)
+            if url is not None:
+                canonical[url] = None
+        return list(canonical)
+
+    def canonicalize_anchors(self, links: Iterable[str], texts: Iterable[str], base_url: Optional[str] = None) -> Dict[str, str]:
+        """Canonical forms of the links of a page with their link texts.
+
+        A page often links an article several times, e.g. from an image
+        and from the headline. The longest text is kept.
+
+        Args:
+            links (Iterable[str]): Links found on the page.
+            texts (Iterable[str]): Link texts, in the order of links.
+            base_url (Optional[str], optional): URL of the page. Defaults to None.
+
+        Returns:
+            Dict[str, str]: Link text per canonical URL, in the order of their first occurrence.
+        """
+        anchors: Dict[str, str] = {}
+        for link, text in zip(links, texts):
+            url: Optional[str] = self.canonicalize(link, base_url)
+            if url is not None and len(text) >= len(anchors.get(url, '')):
+                anchors[url] = text
+        return anchors
+
+    def _canonicalize_absolute(self, url: str) -> Optional[str]:
+        try:
+            parts = urlsplit(url)
+            port: Optional[int] = parts.port
+        except ValueError:
+            return None
+        scheme: str = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            return None
+        netloc: str = parts.hostname
+        if ':' in netloc:
+            netloc = '[{}]'.format(netloc)
+        if port is not None and port != DEFAULT_PORTS[scheme]:
+            netloc = '{}:{}'.format(netloc, port)
+        path: str = parts.path or '/'
+        if '/.' in path:
+            # Resolve '.' and '..' segments
+            path = urlsplit(urljoin('http://host/', path)).path
+        if self._strip_trailing_slash and len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/') or '/'
+        query: str = parts.query
+        if query:
+            # The kept parameters stay as they were written, re-encoding would turn '?amp' into '?amp=' and fetch another URL
+            params: List[str] = [param for param in query.split('&') if param]
+            if self._strip_param is not None:
+                params = [param for param in params if not self._strip_param(_param_name(param).lower())]
+            if self._sort_params:
+                params.sort(key=_param_name)
+            query = '&'.join(params)
+        return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def load_canonicalizer(config: dict) -> UrlCanonicalizer:
+    """Create the URL canonicalizer configured by the `url_*` keys.
+
+    Args:
+        config (dict): Crawler config.
+
+    Returns:
+        UrlCanonicalizer: Configured canonicalizer.
+    """
+    strip_params: Optional[List[str]] = config.get("url_strip_params")
+    return UrlCanonicalizer(
+        DEFAULT_STRIP_PARAMS if strip_params is None else strip_params,
+        config.get("url_sort_params", True),
+        config.get("url_strip_trailing_slash", True),
+        config.get("url_cache_size", DEFAULT_CACHE_SIZE)
+    )
@@ -0,0 +1,84 @@
+"""Worker of a distributed crawl.
+
+Usage:
+    python -m grawt.worker --worker-id 0 --workers 4 https://www.dailymail.co.uk/home/index.html
+    python -m grawt.worker --spawn 4 https://www.dailymail.co.uk/home/index.html
+
+Every worker is started with the same config and seeds, the config
+points all of them to the same `frontier_store_path` and seen store.
+With --spawn, all workers are started as local processes. Each worker
+writes its articles to the configured sink, a JSONL file gets the
+worker id in its name.
+"""
+import argparse
+import multiprocessing
+import os
+from typing import List, Optional
+
+from grawt.config_loader import load_config
+from grawt.crawler import DEFAULT_CONFIG_PATH, Crawler
+
+
+def worker_output_path(config: dict, worker_id: int) -> Optional[str]:
+    """Output path of a worker, workers must not append to the same JSONL file.
+
+    Args:
+        config (dict): Crawler config.
+        worker_id (int): Number of the worker.
+
+    Returns:
+        Optional[str]: Path with the worker id for a JSONL sink, None to keep the configured path.
+    """
+    if config.get("output_sink", "jsonl") != "jsonl":
+        return None
+    root, extension = os.path.splitext(config.get("output_path", "./articles.jsonl"))
+    return '{}.worker-{}{}'.format(root, worker_id, extension)
+
+
+def run_worker(config_path: str, seeds: List[str], worker_id: int, workers: int, max_depth: int) -> int:
+    """Crawl as one worker until the whole crawl is finished.
+
+    Args:
+        config_path (str): Path of the config.
+        seeds (List[str]): Starting URLs.
+        worker_id (int): Number of this worker.
+        workers (int): Number of workers.
+        max_depth (int): Maximum crawl depth.
+
+    Returns:
+        int: Number of articles written by this worker.
+    """
+    crawler = Crawler(config_path)
+    try:
+        with crawler.open_sink(worker_output_path(load_config(config_path), worker_id)) as sink:
+            return sink.consume(crawler.crawl_distributed_iter(seeds, worker_id, workers, max_depth))
+    finally:
+        crawler.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('seeds', nargs='+', help='Starting URLs, the same for every worker.')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH)
+    parser.add_argument('--worker-id', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--spawn', type=int, default=0, help='Start this many local worker processes.')
+    parser.add_argument('--max-depth', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.spawn <= 0:
+        count: int = run_worker(args.config, args.seeds, args.worker_id, args.workers, args.max_depth)
+        print('Worker {} wrote {} articles'.format(args.worker_id, count))
+        return
+    processes: List[multiprocessing.Process] = [
+        multiprocessing.Process(target=run_worker, args=(args.config, args.seeds, worker_id, args.spawn, args.max_depth))
+        for worker_id in range(args.spawn)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+import contextlib
+import http.server
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pytest
+import yaml
+
+from grawt.crawler import Crawler
+
+Response = Tuple[int, Dict[str, str], bytes]
+WORDS: List[str] = (
+    'market river council winter station report budget storm court player season energy school harbour museum '
+    'railway election doctor festival village bridge factory garden island minister police science theatre'
+).split()
+HTML_HEADERS: Dict[str, str] = {'Content-Type': 'text/html; charset=utf-8'}
+CHUNK_SIZE: int = 16 * 1024
+
+
+def article_html(headline: str, links: Iterable[str] = (), paragraphs: int = 3, head: str = '') -> str:
+    """Page that the GeneralScraper scrapes as an article, the text is unique per headline."""
+    rng = random.Random(headline)
+    texts: List[str] = [' '.join(rng.choice(WORDS) for _ in range(40)) for _ in range(paragraphs)]
+    return (
+        '<html><head><title>{0} - Example</title>{1}</head><body><nav>{2}</nav><article><h1>{0}</h1>'
+        '<time datetime="2021-07-01T10:00:00+00:00">July</time>{3}</article></body></html>'
+    ).format(
+        headline,
+        head,
+        ''.join('<a href="{}">{}</a>'.format(link, link) for link in links),
+        ''.join('<p>{}</p>'.format(text) for text in texts)
+    )
+
+
+class StubRequest():
+
+    def __init__(self, method: str, path: str, headers: Dict[str, str], count: int, client_port: int = 0) -> None:
+        self.method: str = method
+        self.path: str = path
+        self.headers: Dict[str, str] = headers
+        # Requests of this path so far, including this one
+        self.count: int = count
+        # Requests over the same connection have the same port
+        self.client_port: int = client_port
+
+
+Route = Union[Response, Callable[[StubRequest], Response]]
+
+
+class StubServer():
+    """Local HTTP server with fixed responses per path that records every request."""
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, Route] = {}
+        self.requests: List[StubRequest] = []
+        self.delay: float = 0.0
+        self.in_flight: int = 0
+        self.max_in_flight: int = 0
+        self._lock = threading.Lock()
+        stub: StubServer = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                stub._handle(self, send_body=True)
+
+            def do_HEAD(self) -> None:
+                stub._handle(self, send_body=False)
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def host(self) -> str:
+        return '127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def url(self, path: str = '/') -> str:
+        return 'http://{}{}'.format(self.host, path)
+
+    def add(self, path: str, body: Union[str, bytes], status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.routes[path] = (status, dict(HTML_HEADERS if headers is None else headers), body)
+
+    def count(self, path: str, method: str = 'GET') -> int:
+        with self._lock:
+            return sum(1 for request in self.requests if request.path == path and request.method == method)
+
+    def _handle(self, handler: http.server.BaseHTTPRequestHandler, send_body: bool) -> None:
+        with self._lock:
+            count: int = sum(1 for request in self.requests if request.path == handler.path) + 1
+            request = StubRequest(handler.command, handler.path, dict(handler.headers.items()), count, handler.client_address[1])
+            self.requests.append(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            route: Optional[Route] = self.routes.get(handler.path) or self.routes.get(handler.path.split('?')[0])
+            status, headers, body = (404, {}, b'not found') if route is None else route(request) if callable(route) else route
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        handler.send_response(status)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        # A route with Transfer-Encoding: chunked is streamed without a Content-Length
+        chunked: bool = headers.get('Transfer-Encoding') == 'chunked'
+        if not chunked:
+            handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if send_body and chunked:
+            for start in range(0, len(body), CHUNK_SIZE):
+                chunk: bytes = body[start:start + CHUNK_SIZE]
+                handler.wfile.write('{:x}\r\n'.format(len(chunk)).encode('ascii') + chunk + b'\r\n')
+            handler.wfile.write(b'0\r\n\r\n')
+        elif send_body:
+            handler.wfile.write(body)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def news_site(server: StubServer, articles: int = 8, prefix: str = '/news/') -> List[str]:
+    """Homepage that links `articles` articles, which link back to the homepage.
+
+    Returns:
+        List[str]: Paths of the articles.
+    """
+    paths: List[str] = ['{}story-{}.html'.format(prefix, i) for i in range(articles)]
+    server.add('/', article_html('Front page', paths, paragraphs=1))
+    for i, path in enumerate(paths):
+        server.add(path, article_html('Story number {}'.format(i), ['/']))
+    return paths
+
+
+@pytest.fixture
+def server() -> Iterable[StubServer]:
+    stub = StubServer()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def base_config(tmp_path) -> dict:
+    """Config of a crawler that keeps every file in the temporary directory of the test."""
+    return {
+        'urls_file_path': str(tmp_path / 'urls.json'),
+        'seen_store': 'sqlite',
+        'seen_store_path': str(tmp_path / 'urls.sqlite'),
+        'bloom_filter_path': str(tmp_path / 'urls.bloom'),
+        'bloom_filter_capacity': 10000,
+        'connect_timeout': 5.0,
+        'read_timeout': 10.0,
+        'http_cache_path': None,
+        'politeness': False,
+        'url_retry_delay': 0.01,
+        'max_retry_delay': 0.1,
+        'failure_store_path': None,
+        'main_text_min_length': 150,
+        'parser': 'html.parser',
+        'duplicates': None,
+        'fingerprint_store_path': None,
+        'discovery_state_path': str(tmp_path / 'discovery.json'),
+        'output_sink': 'jsonl',
+        'output_path': str(tmp_path / 'articles.jsonl'),
+        'concurrency': None,
+        'parse_workers': 0,
+        'log_level': 'WARNING',
+        'checkpoint_path': None,
+        'frontier_store_path': str(tmp_path / 'frontier.sqlite'),
+        'archive_path': None
+    }
+
+
+@pytest.fixture
+def make_crawler(tmp_path, base_config) -> Iterable[Callable[..., Crawler]]:
+    """Factory of crawlers, config values are overridden by the keyword arguments."""
+    crawlers: List[Crawler] = []
+
+    def make(**overrides) -> Crawler:
+        path = tmp_path / 'config-{}.yaml'.format(len(crawlers))
+        with open(path, 'w') as file:
+            yaml.safe_dump(dict(base_config, **overrides), file)
+        crawler = Crawler(str(path))
+        crawlers.append(crawler)
+        return crawler
+
+    yield make
+    for crawler in crawlers:
+        # Tests may have closed their crawler already
+        with contextlib.suppress(Exception):
+            crawler.close()
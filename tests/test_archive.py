@@ -0,0 +1,131 @@
+import gzip
+from typing import List
+
+import pytest
+
+from grawt.archive import ArchiveWriter, iter_archive, load_archive_writer, lookup, read_response
+from tests.conftest import article_html, news_site
+
+PAGE: bytes = '<html><head><meta charset="iso-8859-1"></head><body>Gr\xfc\xdfe</body></html>'.encode('iso-8859-1')
+
+
+def test_archive_round_trips_responses(tmp_path):
+    path: str = str(tmp_path / 'archive.warc.gz')
+    writer = ArchiveWriter(path)
+    first: int = writer.write('https://example.com/a', 200, {'Content-Type': 'text/html', 'Content-Encoding': 'gzip'}, PAGE)
+    second: int = writer.write('https://example.com/b', 404, {'Content-Type': 'text/html'}, b'Not found')
+    writer.close()
+
+    responses = list(iter_archive(path))
+    assert [(response.url, response.status_code) for response in responses] == [
+        ('https://example.com/a', 200), ('https://example.com/b', 404)
+    ]
+    assert responses[0].content == PAGE and responses[0].text == '<html><head><meta charset="iso-8859-1"></head><body>Grüße</body></html>'
+    # The body is stored decoded, its transfer headers are replaced
+    assert 'Content-Encoding' not in responses[0].headers
+    assert responses[0].headers['Content-Length'] == str(len(PAGE))
+    assert read_response(path, second).content == b'Not found'
+    assert read_response(path, first).url == 'https://example.com/a'
+    # Every record is a gzip member of a standard WARC file
+    with gzip.open(path, 'rb') as file:
+        assert file.read().count(b'WARC/1.0\r\nWARC-Type: response\r\n') == 2
+
+
+def test_lookup_finds_the_latest_response_of_an_url(tmp_path):
+    path: str = str(tmp_path / 'archive.warc.gz')
+    assert lookup(path, 'https://example.com/a') is None
+    writer = ArchiveWriter(path, batch_size=1)
+    writer.write('https://example.com/a', 200, {}, b'first')
+    writer.write('https://example.com/a', 200, {}, b'second')
+
+    assert lookup(path, 'https://example.com/a').content == b'second'
+    assert lookup(path, 'https://example.com/missing') is None
+    writer.close()
+
+
+def test_records_missing_in_the_index_are_still_read(tmp_path):
+    path: str = str(tmp_path / 'archive.warc.gz')
+    writer = ArchiveWriter(path)
+    writer.write('https://example.com/a', 200, {}, b'body')
+    # Written to the file but not yet to the index, as after a crash
+    writer._file.flush()
+
+    assert lookup(path, 'https://example.com/a') is None
+    assert [response.content for response in iter_archive(path)] == [b'body']
+    writer.flush()
+    assert lookup(path, 'https://example.com/a').content == b'body'
+    writer.close()
+
+
+def test_iter_archive_skips_other_record_types(tmp_path):
+    path: str = str(tmp_path / 'archive.warc.gz')
+    info: bytes = b'software: other-tool'
+    with open(path, 'wb') as file:
+        file.write(gzip.compress(
+            b'WARC/1.0\r\nWARC-Type: warcinfo\r\nContent-Length: ' + str(len(info)).encode() + b'\r\n\r\n' + info + b'\r\n\r\n'
+        ))
+    writer = ArchiveWriter(path)
+    writer.write('https://example.com/a', 200, {}, b'body')
+    writer.close()
+
+    assert [response.url for response in iter_archive(path)] == ['https://example.com/a']
+
+
+def test_iter_archive_rejects_other_files(tmp_path):
+    path: str = str(tmp_path / 'archive.warc.gz')
+    with gzip.open(path, 'wb') as file:
+        file.write(b'HTTP/1.1 200\r\n\r\n')
+
+    with pytest.raises(ValueError):
+        list(iter_archive(path))
+
+
+def test_load_archive_writer(tmp_path):
+    assert load_archive_writer({'archive_path': None}) is None
+    writer = load_archive_writer({'archive_path': str(tmp_path / 'archive.warc.gz'), 'archive_compresslevel': 1})
+    assert isinstance(writer, ArchiveWriter)
+    writer.close()
+
+
+@pytest.mark.parametrize('concurrency', [None, 4])
+def test_crawl_archives_every_page(server, make_crawler, tmp_path, concurrency):
+    paths: List[str] = news_site(server, articles=4)
+    server.add('/gone.html', b'Gone', status=410)
+    server.add('/', article_html('Front page', paths + ['/gone.html'], paragraphs=1))
+    path: str = str(tmp_path / 'archive.warc.gz')
+    crawler = make_crawler(archive_path=path, concurrency=concurrency)
+    articles = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+    crawler.close()
+
+    responses = {response.url: response for response in iter_archive(path)}
+    assert set(responses) == {server.url(path) for path in ['/'] + paths}
+    for article in articles:
+        assert lookup(path, article.url).content == responses[article.url].content
+
+
+def test_reextract_scrapes_the_archive_again(server, make_crawler, tmp_path):
+    paths: List[str] = news_site(server, articles=4)
+    server.add('/short.html', article_html('Short page', paragraphs=1))
+    server.add('/', article_html('Front page', paths + ['/short.html'], paragraphs=1))
+    path: str = str(tmp_path / 'archive.warc.gz')
+    crawler = make_crawler(archive_path=path, main_text_min_length=400)
+    crawled = {article.url: article for article in crawler.crawl_iter(server.url('/'), max_depth=1)}
+    crawler.close()
+    requests: int = len(server.requests)
+
+    strict = make_crawler(archive_path=path, main_text_min_length=400)
+    articles = list(strict.reextract(workers=1))
+    assert [article.url for article in articles] == [response.url for response in iter_archive(path)]
+    assert {article.url: article.main_text for article in articles} == {url: article.main_text for url, article in crawled.items()}
+    assert not crawled[server.url('/short.html')].main_text
+
+    # A lower main_text_min_length finds the main text of the short page
+    lenient = make_crawler(main_text_min_length=10)
+    reextracted = {article.url: article for article in lenient.reextract(path, workers=2)}
+    assert reextracted[server.url('/short.html')].main_text
+    assert len(server.requests) == requests
+
+
+def test_reextract_needs_an_archive(make_crawler):
+    with pytest.raises(ValueError):
+        next(make_crawler().reextract())
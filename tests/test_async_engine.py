@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import threading
+from typing import List, Set
+
+import pytest
+
+import grawt.crawler
+from grawt.crawler import Crawler
+from grawt.models import ScrapedArticle
+from tests.conftest import news_site
+
+
+async def collect(articles) -> List[ScrapedArticle]:
+    return [article async for article in articles]
+
+
+def test_acrawl_iter_is_concurrent_by_default(server, make_crawler):
+    paths: List[str] = news_site(server, articles=8)
+    server.delay = 0.05
+    crawler: Crawler = make_crawler()
+
+    articles: List[ScrapedArticle] = asyncio.run(collect(crawler.acrawl_iter(server.url('/'), max_depth=1)))
+
+    assert {article.url for article in articles} == {server.url(path) for path in ['/'] + paths}
+    assert server.max_in_flight > 1
+
+
+def test_crawl_iter_is_serial_without_concurrency(server, make_crawler):
+    news_site(server, articles=4)
+    server.delay = 0.02
+    crawler: Crawler = make_crawler()
+
+    assert len(list(crawler.crawl_iter(server.url('/'), max_depth=1))) == 5
+    assert server.max_in_flight == 1
+
+
+def test_async_engine_scrapes_the_same_articles_as_the_serial_one(server, make_crawler, tmp_path):
+    news_site(server, articles=12)
+    serial: Set[str] = {article.url for article in make_crawler().crawl_site(server.url('/'), max_depth=1)}
+    concurrent: Set[str] = {
+        article.url for article in make_crawler(concurrency=4, seen_store_path=str(tmp_path / 'other.sqlite')).crawl_site(server.url('/'), max_depth=1)
+    }
+
+    assert concurrent == serial
+    assert len(serial) == 13
+
+
+def test_crawl_iter_refuses_to_run_inside_an_event_loop(server, make_crawler):
+    news_site(server, articles=1)
+    crawler: Crawler = make_crawler(concurrency=4)
+
+    async def crawl_inside_loop() -> None:
+        with pytest.raises(RuntimeError, match='acrawl_iter'):
+            list(crawler.crawl_iter(server.url('/'), max_depth=1))
+
+    asyncio.run(crawl_inside_loop())
+
+
+class CountingPool(ProcessPoolExecutor):
+    """Process pool that records the most pages handed to it at once."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.submitted: int = 0
+        self.outstanding: int = 0
+        self.max_outstanding: int = 0
+        CountingPool.last = self
+
+    def submit(self, *args, **kwargs):
+        with self.lock:
+            self.submitted += 1
+            self.outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        future = super().submit(*args, **kwargs)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future) -> None:
+        with self.lock:
+            self.outstanding -= 1
+
+
+def summary(articles: List[ScrapedArticle]) -> list:
+    return sorted((article.url, article.headline, article.main_text, article.datetime_ is not None) for article in articles)
+
+
+@pytest.mark.parametrize('parse_queue_size', [0, 2])
+def test_parse_workers_scrape_the_same_articles_as_the_fetch_threads(server, make_crawler, tmp_path, monkeypatch, parse_queue_size):
+    news_site(server, articles=12)
+    in_process: List[ScrapedArticle] = list(make_crawler(concurrency=8).crawl_site(server.url('/'), max_depth=1))
+    monkeypatch.setattr(grawt.crawler, 'ProcessPoolExecutor', CountingPool)
+    crawler: Crawler = make_crawler(
+        concurrency=8, parse_workers=2, parse_queue_size=parse_queue_size, seen_store_path=str(tmp_path / 'other.sqlite')
+    )
+
+    in_pool: List[ScrapedArticle] = list(crawler.crawl_site(server.url('/'), max_depth=1))
+
+    assert len(in_pool) == 13
+    assert summary(in_pool) == summary(in_process)
+    # Eight fetches at once, but no more pages in the pool than workers plus queue
+    assert CountingPool.last.submitted == 13
+    assert CountingPool.last.max_outstanding <= 2 + parse_queue_size
@@ -0,0 +1,150 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+from typing import List, Set
+
+import pytest
+import yaml
+
+from grawt.checkpoint import Checkpointer, load_checkpoint
+from grawt.frontier import Frontier, MultiSiteFrontier
+from grawt.retry import RetryQueue
+from tests.conftest import news_site
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CRASHING_CRAWL: str = '''
+import os, sys
+from grawt.crawler import Crawler
+crawler = Crawler(sys.argv[1])
+sink = crawler.open_sink()
+for count, article in enumerate(crawler.crawl_iter(sys.argv[2], max_depth=1), 1):
+    sink.write(article)
+    if count == int(sys.argv[3]):
+        os._exit(1)
+'''
+
+
+def test_checkpoint_round_trip(tmp_path):
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    for path in ['/a', '/b', '/c']:
+        frontier.push('https://example.com' + path, 1)
+    frontier.pop()
+    retries = RetryQueue()
+    retries.push('https://example.com/retry', 1, 2, 30.0)
+    flushed: List[bool] = []
+    checkpointer = Checkpointer(str(tmp_path / 'crawl.checkpoint'), yielded=5, flush=lambda: flushed.append(True))
+    checkpointer.started('https://example.com/a', 1, 0)
+    checkpointer.save(frontier, retries)
+
+    restored = load_checkpoint(checkpointer.path)
+    assert flushed == [True]
+    assert restored.yielded == 5
+    assert restored.replay == {'https://example.com/' + name for name in ['a', 'b', 'c', 'retry']}
+    # The page in flight is retried at once, before the waiting retry
+    assert restored.retries.pop_due() == ('https://example.com/a', 1, 0)
+    assert len(restored.retries) == 1
+    checkpointer.remove()
+    with pytest.raises(FileNotFoundError):
+        load_checkpoint(checkpointer.path)
+
+
+@pytest.mark.parametrize('concurrency', [None, 4])
+def test_crash_with_a_batched_sink_loses_no_article(server, base_config, tmp_path, concurrency):
+    paths: List[str] = news_site(server, articles=30)
+    config: dict = dict(
+        base_config, checkpoint_path=str(tmp_path / 'crawl.checkpoint'), checkpoint_interval=0.0, output_batch_size=1000,
+        concurrency=concurrency
+    )
+    config_path: str = str(tmp_path / 'config.yaml')
+    with open(config_path, 'w') as file:
+        yaml.safe_dump(config, file)
+
+    crashed = subprocess.run([sys.executable, '-c', CRASHING_CRAWL, config_path, server.url('/'), '20'], cwd=ROOT)
+    assert crashed.returncode == 1
+    assert os.path.exists(config['checkpoint_path'])
+
+    from grawt.crawler import Crawler
+    crawler = Crawler(config_path)
+    with crawler.open_sink() as sink:
+        sink.consume(crawler.resume())
+    crawler.close()
+
+    with open(config['output_path']) as file:
+        urls: Set[str] = {json.loads(line)['url'] for line in file}
+    assert urls == {server.url(path) for path in ['/'] + paths}
+    assert not os.path.exists(config['checkpoint_path'])
+
+
+def test_checkpoints_only_append_the_newly_visited_urls(tmp_path):
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    for i in range(200):
+        frontier.push('https://example.com/old-{}'.format(i), 1)
+    checkpointer = Checkpointer(str(tmp_path / 'crawl.checkpoint'))
+    checkpointer.save(frontier, RetryQueue())
+    first_size: int = os.path.getsize(checkpointer.visited_log_path)
+    checkpointer.save(frontier, RetryQueue())
+    second_size: int = os.path.getsize(checkpointer.visited_log_path)
+    frontier.push('https://example.com/new', 2)
+    frontier.push('https://example.com/old-0', 0)
+    checkpointer.save(frontier, RetryQueue())
+
+    with gzip.open(checkpointer.path, 'rt') as file:
+        assert 'visited' not in json.load(file)['frontier']
+    assert second_size - first_size < 40
+    with open(checkpointer.visited_log_path, 'rb') as file:
+        file.seek(second_size)
+        assert json.loads(gzip.decompress(file.read())) == {'': {'https://example.com/new': 2, 'https://example.com/old-0': 0}}
+    restored = load_checkpoint(checkpointer.path)
+    assert restored.frontier._visited == frontier._visited
+    checkpointer.remove()
+    assert not os.path.exists(checkpointer.visited_log_path)
+
+
+def test_visited_urls_appended_after_the_last_checkpoint_are_dropped(tmp_path):
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 1)
+    checkpointer = Checkpointer(str(tmp_path / 'crawl.checkpoint'))
+    checkpointer.save(frontier, RetryQueue())
+    with open(checkpointer.path, 'rb') as file:
+        saved: bytes = file.read()
+    frontier.push('https://example.com/b', 1)
+    checkpointer.save(frontier, RetryQueue())
+    # Crash after the log was appended, before the checkpoint was replaced
+    with open(checkpointer.path, 'wb') as file:
+        file.write(saved)
+
+    restored = load_checkpoint(checkpointer.path)
+    assert restored.frontier._visited == {'https://example.com/a': 1}
+    resumed = Checkpointer(checkpointer.path, visited_log_size=restored.visited_log_size)
+    restored.frontier.push('https://example.com/c', 1)
+    resumed.save(restored.frontier, RetryQueue())
+    assert load_checkpoint(checkpointer.path).frontier._visited == {'https://example.com/a': 1, 'https://example.com/c': 1}
+
+
+def test_visited_urls_of_every_website_are_restored(tmp_path):
+    frontier = MultiSiteFrontier(['https://a.example.com/', 'https://b.example.org/'], max_depth=1)
+    checkpointer = Checkpointer(str(tmp_path / 'crawl.checkpoint'))
+    checkpointer.save(frontier, RetryQueue())
+    frontier.push('https://b.example.org/story', 1)
+    checkpointer.save(frontier, RetryQueue())
+
+    restored = load_checkpoint(checkpointer.path)
+    assert not restored.frontier.push('https://b.example.org/story', 1)
+    assert restored.frontier.push('https://a.example.com/story', 1)
+    assert not restored.frontier.push('https://a.example.com/', 1)
+
+
+def test_checkpoint_of_version_1_can_be_resumed(tmp_path):
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 1)
+    path: str = str(tmp_path / 'crawl.checkpoint')
+    doc: dict = {'version': 1, 'time': 0.0, 'yielded': 3, 'frontier': frontier.to_dict(), 'retries': [], 'in_flight': []}
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        json.dump(doc, file)
+
+    restored = load_checkpoint(path)
+    assert restored.frontier._visited == {'https://example.com/a': 1}
+    Checkpointer(path, visited_log_size=restored.visited_log_size).save(restored.frontier, RetryQueue())
+    assert load_checkpoint(path).frontier._visited == {'https://example.com/a': 1}
@@ -0,0 +1,73 @@
+import pickle
+from typing import List
+
+from grawt.crawler import scrape_html
+from grawt.dedup import ContentDeduplicator, fingerprint_text, hamming_distance, simhash
+from grawt.models import ScrapedArticle
+from grawt.scraper.general_scraper import GeneralScraper
+from tests.conftest import article_html
+
+TEXT: str = ' '.join('word{} of the story number {}'.format(i, i % 7) for i in range(60))
+
+
+def test_similar_texts_get_close_simhashes():
+    assert hamming_distance(simhash(TEXT), simhash(TEXT.replace('word3 ', 'term3 '))) <= 3
+    assert hamming_distance(simhash(TEXT), simhash('a completely different text ' * 20)) > 3
+
+
+def test_copies_are_found_by_content_hash_and_simhash():
+    deduplicator = ContentDeduplicator(min_length=100)
+
+    assert deduplicator.check('https://example.com/a', TEXT) is None
+    assert deduplicator.check('https://example.com/amp/a', '  ' + TEXT.upper()) == 'https://example.com/a'
+    assert deduplicator.check('https://example.com/print/a', TEXT.replace('word3 ', 'term3 ')) == 'https://example.com/a'
+    assert deduplicator.check('https://example.com/short', 'short') is None
+
+
+def test_worker_fingerprint_gives_the_same_answer_as_check():
+    deduplicator = ContentDeduplicator(min_length=100)
+    deduplicator.check('https://example.com/a', TEXT)
+
+    assert fingerprint_text('short', 100) is None
+    assert deduplicator.check_fingerprint('https://example.com/b', fingerprint_text(TEXT, 100)) == 'https://example.com/a'
+
+
+def test_scrape_html_fingerprints_only_when_asked():
+    html: str = article_html('Fingerprinted story')
+    scraper = GeneralScraper()
+    plain: ScrapedArticle = scrape_html('https://example.com/a', html, scraper, 'html.parser', 150)
+    article: ScrapedArticle = scrape_html('https://example.com/a', html, scraper, 'html.parser', 150, fingerprint_min_length=100)
+
+    assert plain.fingerprint is None
+    assert article.fingerprint == fingerprint_text(article.main_text, 100)
+    # The fingerprint reaches the crawler from a parse worker process
+    assert pickle.loads(pickle.dumps(article)).fingerprint == article.fingerprint
+    assert 'fingerprint' not in article.to_dict()
+
+
+def test_crawl_links_copies_to_the_first_article(server, make_crawler):
+    html: str = article_html('Syndicated story', ['/'])
+    server.add('/', article_html('Front page', ['/news/story.html', '/amp/story.html'], paragraphs=1))
+    server.add('/news/story.html', html)
+    server.add('/amp/story.html', html)
+    crawler = make_crawler(duplicates='link', duplicate_min_length=100, concurrency=1)
+
+    articles: List[ScrapedArticle] = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+    canonical = {article.url: article.canonical_url for article in articles}
+
+    assert canonical[server.url('/news/story.html')] is None
+    assert canonical[server.url('/amp/story.html')] == server.url('/news/story.html')
+    assert all(article.fingerprint is None for article in articles)
+
+
+def test_crawl_with_parse_workers_drops_copies(server, make_crawler):
+    html: str = article_html('Syndicated story', ['/'])
+    server.add('/', article_html('Front page', ['/news/story.html', '/amp/story.html'], paragraphs=1))
+    server.add('/news/story.html', html)
+    server.add('/amp/story.html', html)
+    crawler = make_crawler(duplicates='drop', duplicate_min_length=100, parse_workers=1)
+
+    urls: List[str] = [article.url for article in crawler.crawl_iter(server.url('/'), max_depth=1)]
+
+    assert len(urls) == 2
+    assert crawler.stats.counter('duplicates', action='drop') == 1
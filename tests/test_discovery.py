@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+import gzip
+import io
+import json
+import os
+from typing import List
+from xml.etree.ElementTree import ParseError
+
+import pytest
+
+from grawt.discovery import DiscoveredUrl, iter_sitemap, parse_lastmod, sitemaps_from_robots
+from tests.conftest import article_html
+
+FIXTURES: str = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def sitemap(*urls: str, lastmod: str = '2021-07-01') -> str:
+    entries: str = ''.join('<url><loc>{}</loc><lastmod>{}</lastmod></url>'.format(url, lastmod) for url in urls)
+    return '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{}</urlset>'.format(entries)
+
+
+def parse(xml: str) -> List[DiscoveredUrl]:
+    return list(iter_sitemap(io.BytesIO(xml.encode())))
+
+
+def test_extension_locs_do_not_replace_the_page_url():
+    with open(os.path.join(FIXTURES, 'news_image_sitemap.xml'), 'rb') as file:
+        entries: List[DiscoveredUrl] = list(iter_sitemap(file))
+
+    assert [entry.url for entry in entries] == ['https://ex.com/news/story-1', 'https://ex.com/news/story-2']
+    assert entries[0].lastmod == datetime(2021, 7, 1, 8, tzinfo=timezone.utc)
+
+
+def test_sitemap_index_and_gzip():
+    xml: str = (
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        '<sitemap><loc>https://ex.com/sitemap-1.xml.gz</loc><lastmod>2021-07-01T00:00:00Z</lastmod></sitemap>'
+        '</sitemapindex>'
+    )
+    entries: List[DiscoveredUrl] = list(iter_sitemap(io.BytesIO(gzip.compress(xml.encode()))))
+
+    assert [(entry.url, entry.is_sitemap) for entry in entries] == [('https://ex.com/sitemap-1.xml.gz', True)]
+
+
+def test_rss_and_atom_feeds():
+    rss: str = (
+        '<rss xmlns:atom="http://www.w3.org/2005/Atom"><channel><link>https://ex.com/</link>'
+        '<atom:link href="https://ex.com/feed" rel="self"/>'
+        '<item><title>A</title><link>https://ex.com/a</link><pubDate>Thu, 01 Jul 2021 10:00:00 GMT</pubDate></item>'
+        '</channel></rss>'
+    )
+    atom: str = (
+        '<feed xmlns="http://www.w3.org/2005/Atom"><link href="https://ex.com/"/>'
+        '<entry><link rel="replies" href="https://ex.com/b#comments"/><link href="https://ex.com/b"/>'
+        '<updated>2021-07-02T00:00:00Z</updated></entry></feed>'
+    )
+
+    assert [(entry.url, entry.lastmod.day) for entry in parse(rss)] == [('https://ex.com/a', 1)]
+    assert [(entry.url, entry.lastmod.day) for entry in parse(atom)] == [('https://ex.com/b', 2)]
+
+
+def test_broken_sitemap_yields_its_complete_entries_and_raises():
+    entries: List[DiscoveredUrl] = []
+    with pytest.raises(ParseError):
+        for entry in iter_sitemap(io.BytesIO(sitemap('https://ex.com/a', 'https://ex.com/b').encode()[:-40])):
+            entries.append(entry)
+
+    assert [entry.url for entry in entries] == ['https://ex.com/a']
+
+
+def test_dates_and_robots():
+    assert parse_lastmod('2021-07-01') == datetime(2021, 7, 1, tzinfo=timezone.utc)
+    assert parse_lastmod('2021-07-01T12:00:00+02:00') == datetime(2021, 7, 1, 10, tzinfo=timezone.utc)
+    assert parse_lastmod('not a date') is None
+    assert sitemaps_from_robots('User-agent: *\nSitemap: https://ex.com/a.xml\nsitemap:https://ex.com/b.xml') == [
+        'https://ex.com/a.xml', 'https://ex.com/b.xml'
+    ]
+
+
+def discovery_site(server) -> None:
+    robots: str = 'User-agent: *\nSitemap: {}\nSitemap: {}\n'.format(server.url('/news.xml'), server.url('/more.xml'))
+    server.add('/robots.txt', robots, headers={'Content-Type': 'text/plain'})
+    server.add('/', article_html('Front page', paragraphs=1))
+    server.add('/news.xml', sitemap(server.url('/a.html'), server.url('/b.html'), lastmod='2021-07-01T00:00:00Z'), headers={})
+    server.add('/more.xml', sitemap(server.url('/c.html'), lastmod='2021-07-03T00:00:00Z'), headers={})
+    for path in ['/a.html', '/b.html', '/c.html']:
+        server.add(path, article_html('Story ' + path))
+
+
+def test_sitemaps_are_read_from_robots(server, make_crawler):
+    discovery_site(server)
+
+    assert make_crawler().discover(server.url('/')) == [server.url(path) for path in ['/c.html', '/a.html', '/b.html']]
+
+
+def test_failed_sitemap_keeps_the_last_run(server, make_crawler, tmp_path):
+    discovery_site(server)
+    server.add('/more.xml', 'error', status=500)
+    crawler = make_crawler()
+    sources: List[str] = [server.url('/news.xml'), server.url('/more.xml')]
+
+    assert len(list(crawler.crawl_new_iter(server.url('/'), sitemaps=sources))) == 2
+    assert not os.path.exists(tmp_path / 'discovery.json')
+
+
+def test_run_does_not_move_past_a_failed_article(server, make_crawler, tmp_path):
+    discovery_site(server)
+    server.add('/b.html', 'error', status=503)
+    crawler = make_crawler(max_retries=1)
+    sources: List[str] = [server.url('/news.xml'), server.url('/more.xml')]
+    before: datetime = datetime.now(timezone.utc)
+
+    assert len(list(crawler.crawl_new_iter(server.url('/'), sitemaps=sources))) == 2
+    with open(tmp_path / 'discovery.json') as file:
+        last_run: datetime = datetime.fromisoformat(json.load(file)[server.host])
+    assert last_run == datetime(2021, 7, 1, tzinfo=timezone.utc) - timedelta(microseconds=1)
+
+    server.add('/b.html', article_html('Story b'))
+    assert [article.url for article in crawler.crawl_new_iter(server.url('/'), sitemaps=sources)] == [server.url('/b.html')]
+    with open(tmp_path / 'discovery.json') as file:
+        assert datetime.fromisoformat(json.load(file)[server.host]) >= before
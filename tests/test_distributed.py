@@ -0,0 +1,136 @@
+import time
+from typing import List, Optional, Tuple
+
+import pytest
+
+from grawt.distributed import SharedFrontier, host_partition
+from tests.conftest import news_site
+
+
+def site_in_partition(partition: int, workers: int = 2) -> str:
+    """First example host of a partition."""
+    return next(
+        'https://site{}.example'.format(i) for i in range(100)
+        if host_partition('https://site{}.example/'.format(i), workers) == partition
+    )
+
+
+def shared_frontier(tmp_path, worker_id: int, seeds: List[str], **kwargs) -> SharedFrontier:
+    return SharedFrontier(str(tmp_path / 'frontier.sqlite'), worker_id, 2, seeds, lease_seconds=0.3, poll_interval=0.01, **kwargs)
+
+
+def test_host_partition_is_stable_per_host():
+    assert host_partition('https://example.com/a', 8) == host_partition('https://EXAMPLE.com/b?c=d', 8)
+    assert {host_partition('https://site{}.example/'.format(i), 4) for i in range(50)} == {0, 1, 2, 3}
+
+
+def test_workers_only_claim_their_own_partition(tmp_path):
+    first, second = site_in_partition(0), site_in_partition(1)
+    seeds: List[str] = [first + '/', second + '/']
+    worker_0 = shared_frontier(tmp_path, 0, seeds)
+    worker_1 = shared_frontier(tmp_path, 1, seeds)
+
+    assert worker_0.pop() == (first + '/', 0)
+    assert worker_1.pop() == (second + '/', 0)
+    assert worker_0.pop() is None
+    worker_0.close()
+    worker_1.close()
+
+
+def test_a_lost_worker_is_replaced_and_its_claims_are_reclaimed(tmp_path):
+    site: str = site_in_partition(1)
+    seeds: List[str] = [site + '/']
+    worker_0 = shared_frontier(tmp_path, 0, seeds)
+    worker_1 = shared_frontier(tmp_path, 1, seeds)
+    worker_1.pop()
+    worker_1.push_links([site + '/a', site + '/b'], 1, site + '/')
+    worker_1.flush()
+
+    # Worker 1 claimed the seed and stops, its lease runs out
+    assert worker_0.pop() is None
+    time.sleep(0.4)
+    entries: List[Optional[Tuple[str, int]]] = [worker_0.pop() for _ in range(3)]
+    assert sorted(entries) == [(site + '/', 0), (site + '/a', 1), (site + '/b', 1)]
+    for url, _ in entries:
+        worker_0.done(url)
+    assert worker_0.wait_time() is None
+    worker_0.close()
+
+
+def test_a_slow_worker_keeps_its_partition_and_claims(tmp_path):
+    site: str = site_in_partition(1)
+    seeds: List[str] = [site + '/']
+    worker_1 = shared_frontier(tmp_path, 1, seeds)
+    worker_0 = shared_frontier(tmp_path, 0, seeds)
+    url, _ = worker_1.pop()
+    worker_1.push_links([site + '/{}'.format(i) for i in range(8)], 1, url)
+    worker_1.done(url)
+    worker_1.flush()
+
+    # One page per half lease, a claim takes several leases to finish
+    fetched: List[str] = []
+    entry: Optional[Tuple[str, int]] = worker_1.pop()
+    while entry is not None:
+        time.sleep(0.15)
+        assert worker_0.pop() is None
+        fetched.append(entry[0])
+        worker_1.done(entry[0])
+        entry = worker_1.pop()
+    assert sorted(fetched) == sorted(site + '/{}'.format(i) for i in range(8))
+    worker_1.flush()
+    assert worker_0.pop() is None and worker_0.wait_time() is None
+    worker_0.close()
+    worker_1.close()
+
+
+def test_a_restarted_worker_gets_its_partition_back(tmp_path):
+    site: str = site_in_partition(1)
+    # Worker 1 is not running, worker 0 takes over its partition
+    worker_0 = shared_frontier(tmp_path, 0, [site + '/'])
+    assert worker_0.pop() == (site + '/', 0)
+    worker_0.push(site + '/a', 1)
+    worker_0.flush()
+
+    worker_1 = shared_frontier(tmp_path, 1, [site + '/'])
+    assert worker_1.pop() is None
+    # Worker 0 gives the partition back on its next renewal
+    time.sleep(0.15)
+    assert worker_0.pop() is None
+    assert worker_1.pop() == (site + '/a', 1)
+    worker_0.close()
+    worker_1.close()
+
+
+def test_a_finished_url_is_queued_again_at_a_lower_depth(tmp_path):
+    site: str = site_in_partition(0)
+    worker_0 = shared_frontier(tmp_path, 0, [], write_batch_size=1)
+    worker_0.push(site + '/a', 2)
+    assert worker_0.pop() == (site + '/a', 2)
+    worker_0.done(site + '/a')
+    worker_0.push(site + '/a', 2)
+    assert worker_0.pop() is None
+
+    worker_0.push(site + '/a', 1)
+    assert worker_0.pop() == (site + '/a', 1)
+    worker_0.close()
+
+
+def test_shared_frontier_rejects_an_unknown_worker(tmp_path):
+    with pytest.raises(ValueError):
+        shared_frontier(tmp_path, 2, [])
+
+
+@pytest.mark.parametrize('seen_store', ['json', 'bloom'])
+def test_distributed_crawl_needs_the_sqlite_seen_store(make_crawler, seen_store):
+    crawler = make_crawler(seen_store=seen_store)
+
+    with pytest.raises(ValueError, match='sqlite'):
+        next(crawler.crawl_distributed_iter(['https://example.com/'], 0, 2))
+
+
+def test_distributed_crawl_of_a_single_worker(server, make_crawler):
+    paths: List[str] = news_site(server, articles=5)
+    crawler = make_crawler(worker_poll_interval=0.01)
+
+    urls = {article.url for article in crawler.crawl_distributed_iter([server.url('/')], 0, 1, max_depth=1)}
+    assert urls == {server.url(path) for path in ['/'] + paths}
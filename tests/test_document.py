@@ -0,0 +1,79 @@
+import importlib
+import os
+from typing import List
+
+import pytest
+
+from grawt.document import PARSERS, SOUP_PARSERS, SelectolaxDocument, SoupDocument, parse_document
+from grawt.scraper.general_scraper import GeneralScraper
+
+FIXTURES: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PAGES: List[str] = ['news_article.html', 'hub_page.html', 'title_only.html']
+# Module that every parser backend needs
+BACKEND_MODULES = {'html.parser': 'html.parser', 'lxml': 'lxml', 'html5lib': 'html5lib', 'selectolax': 'selectolax.lexbor'}
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as file:
+        return file.read()
+
+
+@pytest.fixture(params=PARSERS)
+def parser(request) -> str:
+    pytest.importorskip(BACKEND_MODULES[request.param])
+    return request.param
+
+
+def test_every_parser_has_a_backend_module():
+    assert set(BACKEND_MODULES) == set(PARSERS)
+
+
+def test_parse_document_picks_the_document_class(parser):
+    document = parse_document('<p>text</p>', parser)
+
+    assert isinstance(document, SoupDocument if parser in SOUP_PARSERS else SelectolaxDocument)
+    assert document.soup.find('p').get_text() == 'text'
+
+
+def test_parse_document_rejects_an_unknown_parser():
+    with pytest.raises(ValueError, match='html6'):
+        parse_document('<p>text</p>', 'html6')
+
+
+def test_iter_tags_returns_the_tags_in_document_order(parser):
+    document = parse_document(read_fixture('news_article.html'), parser)
+    tags = list(document.iter_tags(['h1', 'h2', 'time']))
+
+    assert [tag.name for tag in tags] == ['h2', 'h1', 'time', 'time']
+    assert tags[1].get_text() == 'Stadtrat beschließt & finanziert neue Brücke'
+    assert tags[2].get('datetime') == '2024-05-01T08:30:00+02:00'
+    assert tags[0].get('missing', 'default') == 'default'
+
+
+@pytest.mark.parametrize('page', PAGES)
+def test_parsers_scrape_the_same_article(parser, page):
+    html: str = read_fixture(page)
+    scraper = GeneralScraper(anchor_texts=True)
+    expected = scraper.scrape_document(parse_document(html, 'html.parser'), 150)
+    article = scraper.scrape_document(parse_document(html, parser), 150)
+
+    assert article.headline == expected.headline
+    assert article.main_text == expected.main_text
+    assert article.hrefs == expected.hrefs
+    assert article.netloc_links == expected.netloc_links
+    assert article.anchor_texts == expected.anchor_texts
+    if page != 'title_only.html':
+        # Without a time tag the date is the time of the scrape
+        assert article.datetime_ == expected.datetime_
+
+
+def test_html_parser_result_of_the_fixture_page():
+    article = GeneralScraper().scrape_document(parse_document(read_fixture('news_article.html'), 'html.parser'), 150)
+
+    assert article.headline == 'Stadtrat beschließt & finanziert neue Brücke'
+    assert [len(paragraph) >= 150 for paragraph in article.main_text.splitlines()] == [True, True, True]
+    assert 'Auskommentierter' not in article.main_text and 'Kurz notiert' not in article.main_text
+    assert article.netloc_links[:3] == ['/', '/politik/', '/wirtschaft/']
+    assert '/datenschutz/' in article.netloc_links
+    assert not any(link.startswith(('#', 'mailto:', 'javascript:')) for link in article.netloc_links)
+    assert article.datetime_.isoformat() == '2024-04-20T12:00:00+02:00'
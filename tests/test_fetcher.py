@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from grawt.fetcher import NOT_HTML, TOO_LARGE, Fetcher, ResponseRejected, detect_encoding, is_binary, media_type
+from tests.conftest import article_html
+
+PNG: bytes = b'\x89PNG\r\n\x1a\n' + bytes(200)
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = Fetcher({'head_probes': False, 'max_body_size': 64 * 1024})
+    yield fetcher
+    fetcher.close()
+
+
+def test_media_type_and_magic_bytes():
+    assert media_type('Text/HTML; charset=UTF-8') == 'text/html'
+    assert media_type(None) == ''
+    assert is_binary(PNG) and is_binary(b'%PDF-1.7') and is_binary(b'\x00\x00\x00\x18ftypmp42')
+    assert not is_binary(b'<!doctype html><html>')
+
+
+def test_html_is_fetched(server, fetcher):
+    server.add('/', article_html('Page'))
+    result = fetcher.fetch(server.url('/'), html_only=True)
+
+    assert result.status_code == 200 and result.text == article_html('Page')
+
+
+@pytest.mark.parametrize('content_type', ['application/pdf', 'image/png', 'application/json'])
+def test_response_that_is_no_html_is_rejected(server, fetcher, content_type):
+    server.add('/file', PNG, headers={'Content-Type': content_type})
+
+    with pytest.raises(ResponseRejected) as rejected:
+        fetcher.fetch(server.url('/file'), html_only=True)
+    assert rejected.value.kind == NOT_HTML
+    # Other downloads, e.g. sitemaps, are not checked
+    assert fetcher.fetch(server.url('/file')).content == PNG
+
+
+@pytest.mark.parametrize('content_type', ['text/html', 'application/octet-stream', ''])
+def test_binary_body_is_rejected_by_its_first_bytes(server, fetcher, content_type):
+    server.add('/image.html', PNG, headers={'Content-Type': content_type})
+
+    with pytest.raises(ResponseRejected, match='starts with') as rejected:
+        fetcher.fetch(server.url('/image.html'), html_only=True)
+    assert rejected.value.kind == NOT_HTML
+
+
+def test_error_pages_are_not_rejected(server, fetcher):
+    server.add('/gone', PNG, status=410, headers={'Content-Type': 'image/png'})
+
+    assert fetcher.fetch(server.url('/gone'), html_only=True).status_code == 410
+
+
+def test_body_larger_than_max_body_size_is_rejected(server, fetcher):
+    body: str = article_html('Large page', paragraphs=400)
+    assert len(body) > 64 * 1024
+    server.add('/announced', body)
+    server.add('/streamed', body, headers={'Content-Type': 'text/html', 'Transfer-Encoding': 'chunked'})
+
+    with pytest.raises(ResponseRejected, match='Content-Length|bytes') as announced:
+        fetcher.fetch(server.url('/announced'), html_only=True)
+    # Without a Content-Length, the download stops once the limit is passed
+    with pytest.raises(ResponseRejected, match='larger than') as streamed:
+        fetcher.fetch(server.url('/streamed'), html_only=True)
+    assert announced.value.kind == streamed.value.kind == TOO_LARGE
+
+    unlimited = Fetcher({'head_probes': False, 'max_body_size': None})
+    assert unlimited.fetch(server.url('/streamed'), html_only=True).content == body.encode('utf-8')
+    unlimited.close()
+
+
+def test_head_probe_rejects_a_file_before_the_download(server):
+    server.add('/report.pdf', b'%PDF-1.7' + bytes(100), headers={'Content-Type': 'application/pdf'})
+    fetcher = Fetcher({'head_probes': True})
+
+    with pytest.raises(ResponseRejected):
+        fetcher.fetch(server.url('/report.pdf'), html_only=True)
+    assert server.count('/report.pdf', 'HEAD') == 1 and server.count('/report.pdf') == 0
+    fetcher.close()
+
+
+@pytest.mark.parametrize('content_type, body, encoding', [
+    ('text/html; charset=ISO-8859-1', '<meta charset="utf-8">Grüße'.encode('latin-1'), 'iso8859-1'),
+    ('text/html; charset="windows-1252"', b'x', 'cp1252'),
+    ('text/html; charset=unknown', '<meta charset="koi8-r">Привет'.encode('koi8-r'), 'koi8-r'),
+    ('text/html', '<head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'.encode('ascii'), 'shift_jis'),
+    ('text/html', '﻿<p>bom</p>'.encode('utf-8'), 'utf-8-sig'),
+    ('text/html', 'Grüße'.encode('utf-8'), 'utf-8'),
+    (None, b'<meta charset="no-such-codec">', 'utf-8'),
+])
+def test_detect_encoding(content_type, body, encoding):
+    assert detect_encoding(content_type, body) == encoding
+
+
+@pytest.mark.parametrize('content_type, body', [
+    ('text/html; charset=iso-8859-1', '<p>Grüße</p>'.encode('iso-8859-1')),
+    ('text/html', '<html><head><meta charset="iso-8859-1"></head><p>Grüße</p>'.encode('iso-8859-1')),
+    ('text/html', '<p>Grüße</p>'.encode('utf-8')),
+])
+def test_fetched_text_is_decoded_with_the_detected_charset(server, fetcher, content_type, body):
+    server.add('/', body, headers={'Content-Type': content_type})
+
+    assert 'Grüße' in fetcher.fetch(server.url('/')).text
+
+
+def test_crawl_skips_rejected_pages(server, make_crawler):
+    server.add('/', article_html('Front page', ['/story.html', '/photo.html', '/data']))
+    server.add('/story.html', article_html('Story'))
+    server.add('/photo.html', PNG, headers={'Content-Type': 'text/html'})
+    server.add('/data', b'{}', headers={'Content-Type': 'application/json'})
+    crawler = make_crawler()
+
+    urls = {article.url for article in crawler.crawl_iter(server.url('/'), max_depth=1)}
+    assert urls == {server.url('/'), server.url('/story.html')}
+    assert crawler.stats.counter('pages_skipped', reason=NOT_HTML) == 2
+    assert crawler.stats.counter('retries', kind=NOT_HTML) == 0
+
+
+def test_connections_are_kept_alive(server, fetcher):
+    server.add('/', article_html('Page'))
+    for _ in range(5):
+        fetcher.fetch(server.url('/'), html_only=True)
+
+    assert len({request.client_port for request in server.requests}) == 1
+
+
+def test_timeouts_are_passed_to_every_request(server, monkeypatch):
+    server.add('/', article_html('Page'))
+    timeouts: list = []
+    send = HTTPAdapter.send
+
+    def recording_send(adapter, request, **kwargs):
+        timeouts.append(kwargs.get('timeout'))
+        return send(adapter, request, **kwargs)
+
+    monkeypatch.setattr(HTTPAdapter, 'send', recording_send)
+    fetcher = Fetcher({'connect_timeout': 1.5, 'read_timeout': 7.0, 'head_probes': True})
+    fetcher.fetch(server.url('/page.pdf'))
+    fetcher.fetch(server.url('/'), html_only=True)
+    fetcher.stream(server.url('/')).close()
+    fetcher.close()
+
+    assert len(timeouts) == len(server.requests) and set(timeouts) == {(1.5, 7.0)}
+
+
+def test_read_timeout_aborts_a_slow_response(server):
+    server.add('/', article_html('Page'))
+    server.delay = 0.5
+    fetcher = Fetcher({'read_timeout': 0.1})
+
+    with pytest.raises(requests.Timeout):
+        fetcher.fetch(server.url('/'))
+    fetcher.close()
+
+
+def test_host_pool_sizes_mount_an_adapter_per_host(server):
+    fetcher = Fetcher({'pool_maxsize': 10, 'host_pool_sizes': {server.host: 2}})
+    default = fetcher._session.get_adapter('http://other.example/')
+    own = fetcher._session.get_adapter(server.url('/page'))
+
+    assert own is not default and own is fetcher._session.get_adapter(server.url('/other'))
+    assert own._pool_maxsize == 2 and default._pool_maxsize == 10
+    assert own._pool_block and default._pool_block
+    assert fetcher._session.get_adapter('https://{}/'.format(server.host)) is not default
+    fetcher.close()
+
+
+def test_host_pool_size_caps_the_connections_to_a_host(server):
+    server.add('/', article_html('Page'))
+    server.delay = 0.05
+    fetcher = Fetcher({'host_pool_sizes': {server.host: 2}})
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: fetcher.fetch(server.url('/')), range(12)))
+    fetcher.close()
+    assert server.max_in_flight == 2
+    assert len({request.client_port for request in server.requests}) == 2
@@ -0,0 +1,262 @@
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import pytest
+
+from grawt.frontier import Frontier, MultiSiteFrontier, PriorityFrontier, SiteBudget, frontier_from_dict
+from tests.conftest import StubServer, article_html, news_site
+
+
+def drain(frontier) -> List[Tuple[str, int]]:
+    entries: List[Tuple[str, int]] = []
+    while len(frontier):
+        entry: Optional[Tuple[str, int]] = frontier.pop()
+        entries.append(entry)
+        frontier.done(entry[0])
+    return entries
+
+
+def test_frontier_pops_breadth_first():
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/', 0)
+    assert frontier.pop() == ('https://example.com/', 0)
+    frontier.push_links(['https://example.com/a', 'https://example.com/b'], 1, 'https://example.com/')
+    assert frontier.pop() == ('https://example.com/a', 1)
+    frontier.push_links(['https://example.com/a1'], 2, 'https://example.com/a')
+
+    assert drain(frontier) == [('https://example.com/b', 1), ('https://example.com/a1', 2)]
+
+
+def test_frontier_accepts_an_url_once_and_only_within_the_depth():
+    frontier = Frontier(max_depth=1, netloc_source='example.com')
+
+    assert frontier.push('https://example.com/a', 1)
+    assert not frontier.push('https://example.com/a', 1)
+    assert not frontier.push('https://example.com/deep', 2)
+    assert len(frontier) == 1
+
+
+def test_frontier_accepts_an_url_again_at_a_lower_depth():
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 2)
+
+    assert frontier.push('https://example.com/a', 1)
+    assert not frontier.push('https://example.com/a', 2)
+    assert frontier.is_leaf(2) and not frontier.is_leaf(1)
+    # The deeper entry is outdated, the page is fetched once
+    assert len(frontier) == 1
+    assert drain(frontier) == [('https://example.com/a', 1)]
+    assert frontier.pop() is None
+
+
+def test_frontier_ignores_links_of_other_websites():
+    frontier = Frontier(max_depth=2, netloc_source='www.example.com')
+    frontier.push_links(['https://news.example.com/a', 'https://other.org/b'], 1, 'https://www.example.com/')
+
+    assert drain(frontier) == [('https://news.example.com/a', 1)]
+
+
+def test_frontier_round_trips_through_a_checkpoint():
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 1)
+    frontier.push('https://example.com/b', 2)
+    frontier.pop()
+    restored = frontier_from_dict(frontier.to_dict())
+
+    assert drain(restored) == [('https://example.com/b', 2)]
+    assert not restored.push('https://example.com/a', 1)
+
+
+def test_frontier_checkpoint_leaves_out_outdated_entries():
+    frontier = Frontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 2)
+    frontier.push('https://example.com/a', 1)
+    restored = frontier_from_dict(frontier.to_dict())
+
+    assert restored.to_dict()['queue'] == [['https://example.com/a', 1]]
+    assert drain(restored) == [('https://example.com/a', 1)]
+
+
+def test_page_linked_from_many_parents_is_fetched_once(server, make_crawler):
+    server.add('/', article_html('Front page', ['/a.html', '/b.html', '/shared.html'], paragraphs=1))
+    server.add('/a.html', article_html('Page a', ['/shared.html', '/']))
+    server.add('/b.html', article_html('Page b', ['/shared.html', '/']))
+    server.add('/shared.html', article_html('Shared page', ['/a.html']))
+
+    urls: List[str] = [article.url for article in make_crawler().crawl_iter(server.url('/'), max_depth=2)]
+
+    assert sorted(urls) == sorted(server.url(path) for path in ['/', '/a.html', '/b.html', '/shared.html'])
+    assert urls[0] == server.url('/')
+    assert all(server.count(path) == 1 for path in ['/', '/a.html', '/b.html', '/shared.html'])
+
+
+def test_multi_site_frontier_rejects_weights_that_are_not_positive():
+    seeds: List[str] = ['https://a.example.com/', 'https://b.example.org/']
+    for weight in (0, -1.0, float('nan')):
+        with pytest.raises(ValueError, match='b.example.org'):
+            MultiSiteFrontier(seeds, weights={'b.example.org': weight})
+
+
+def test_multi_site_frontier_hands_out_turns_by_weight():
+    frontier = MultiSiteFrontier(['https://a.example.com/', 'https://b.example.org/'], max_depth=1, weights={'a.example.com': 0.5})
+    for i in range(4):
+        frontier.push('https://a.example.com/{}'.format(i), 1)
+        frontier.push('https://b.example.org/{}'.format(i), 1)
+    sites: List[str] = [urlparse(url).netloc for url, _ in drain(frontier)]
+
+    assert sites[:6].count('b.example.org') == 4
+    assert sorted(sites) == ['a.example.com'] * 5 + ['b.example.org'] * 5
+
+
+def test_priority_frontier_pops_articles_before_hubs():
+    frontier = PriorityFrontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/tag/politics', 1)
+    frontier.push('https://example.com/2024/05/minister-resigns-after-long-dispute.html', 1)
+    frontier.push('https://example.com/about', 1, 'About us')
+    frontier.push('https://example.com/world/story-1234567', 1)
+
+    assert [url for url, _ in drain(frontier)] == [
+        'https://example.com/2024/05/minister-resigns-after-long-dispute.html',
+        'https://example.com/world/story-1234567',
+        'https://example.com/tag/politics',
+        'https://example.com/about'
+    ]
+
+
+def test_priority_frontier_uses_the_link_text():
+    frontier = PriorityFrontier(max_depth=1, netloc_source='example.com')
+    frontier.push_links(
+        ['https://example.com/a1', 'https://example.com/a2'], 1, 'https://example.com/',
+        {'https://example.com/a1': 'more', 'https://example.com/a2': 'Minister resigns after a long dispute'}
+    )
+
+    assert [url for url, _ in drain(frontier)] == ['https://example.com/a2', 'https://example.com/a1']
+
+
+def test_priority_frontier_penalizes_depth():
+    url: str = 'https://example.com/2024/05/minister-resigns-after-long-dispute.html'
+    frontier = PriorityFrontier(max_depth=3, netloc_source='example.com', depth_penalty=1.0)
+    frontier.push(url.replace('minister', 'deep'), 3)
+    frontier.push('https://example.com/world/story-1234567', 1)
+
+    assert [depth for _, depth in drain(frontier)] == [1, 3]
+
+    flat = PriorityFrontier(max_depth=3, netloc_source='example.com', depth_penalty=0.0)
+    flat.push('https://example.com/world/story-1234567', 1)
+    flat.push(url, 3)
+    assert [depth for _, depth in drain(flat)] == [3, 1]
+
+
+def test_priority_frontier_skips_the_outdated_entry_of_an_url_pushed_again():
+    frontier = PriorityFrontier(max_depth=2, netloc_source='example.com')
+    frontier.push('https://example.com/a', 2)
+    frontier.push('https://example.com/a', 1)
+
+    assert frontier.pop() == ('https://example.com/a', 1)
+    assert frontier.pop() is None
+
+
+def test_priority_frontier_round_trips_through_a_checkpoint():
+    frontier = PriorityFrontier(max_depth=2, netloc_source='example.com', depth_penalty=0.5)
+    frontier.push('https://example.com/tag/politics', 1)
+    frontier.push('https://example.com/world/story-1234567', 2)
+    restored = frontier_from_dict(frontier.to_dict())
+
+    assert isinstance(restored, PriorityFrontier) and restored.depth_penalty == 0.5
+    assert drain(restored) == drain(frontier)
+
+
+def test_site_budget_counts_pages_bytes_and_time(monkeypatch):
+    assert not SiteBudget().exhausted()
+    pages = SiteBudget(max_pages=2)
+    pages.take()
+    assert not pages.exhausted()
+    pages.take()
+    assert pages.exhausted()
+
+    volume = SiteBudget(max_bytes=100)
+    volume.bytes = 100
+    assert volume.exhausted()
+
+    clock: List[float] = [100.0]
+    monkeypatch.setattr('grawt.frontier.monotonic', lambda: clock[0])
+    timed = SiteBudget(max_seconds=10.0)
+    assert not timed.exhausted() and timed.elapsed() is None
+    timed.start()
+    clock[0] += 10.5
+    assert timed.exhausted() and timed.elapsed() == 10.5
+
+
+def test_multi_site_frontier_drops_a_website_with_an_exhausted_budget():
+    frontier = MultiSiteFrontier(['https://a.example.com/', 'https://b.example.org/'], max_depth=1, max_pages=2)
+    for i in range(4):
+        frontier.push('https://a.example.com/{}'.format(i), 1)
+        frontier.push('https://b.example.org/{}'.format(i), 1)
+    sites: List[str] = []
+    entry: Optional[Tuple[str, int]] = frontier.pop()
+    while entry is not None:
+        sites.append(urlparse(entry[0]).netloc)
+        frontier.done(entry[0])
+        entry = frontier.pop()
+
+    assert sorted(sites) == ['a.example.com'] * 2 + ['b.example.org'] * 2
+    assert len(frontier) == 0
+
+
+@pytest.mark.parametrize('concurrency', [None, 4])
+def test_crawl_stops_at_max_pages(server, make_crawler, concurrency):
+    news_site(server, articles=20)
+    crawler = make_crawler(max_pages=5, concurrency=concurrency)
+
+    articles = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+    # Pages in flight when the budget ran out may still finish
+    assert 5 <= len(server.requests) <= 5 + (concurrency or 1) - 1
+    assert len(articles) <= len(server.requests)
+
+
+def test_priority_crawl_fetches_articles_before_hubs(server, make_crawler):
+    articles: List[str] = ['/2024/05/story-number-{}-of-the-day.html'.format(i) for i in range(3)]
+    hubs: List[str] = ['/tag/topic-{}'.format(i) for i in range(3)]
+    server.add('/', article_html('Front page', hubs + articles, paragraphs=1))
+    for path in articles + hubs:
+        server.add(path, article_html('Page at ' + path, ['/']))
+    crawler = make_crawler(frontier='priority')
+
+    urls: List[str] = [article.url for article in crawler.crawl_iter(server.url('/'), max_depth=1)]
+    assert urls[1:4] == [server.url(path) for path in articles]
+    assert sorted(urls[4:]) == sorted(server.url(path) for path in hubs)
+
+
+@pytest.fixture
+def other_server() -> Iterable[StubServer]:
+    stub = StubServer()
+    yield stub
+    stub.close()
+
+
+@pytest.mark.parametrize('concurrency', [None, 8])
+def test_crawl_sites_keeps_budgets_and_links_of_every_website(server, other_server, make_crawler, concurrency):
+    # Two hosts of different registrable domains, each links a page of the other
+    sites: List[Tuple[StubServer, str]] = [
+        (server, server.url('/')),
+        (other_server, 'http://localhost:{}/'.format(other_server.host.split(':')[1]))
+    ]
+    for (stub, root), (_, other_root) in zip(sites, reversed(sites)):
+        paths: List[str] = ['/news/story-{}.html'.format(i) for i in range(8)]
+        stub.add('/', article_html('Front page', paths + [other_root + 'leaked.html'], paragraphs=1))
+        for i, path in enumerate(paths):
+            stub.add(path, article_html('Story number {}'.format(i), ['/', other_root + 'leaked.html']))
+        stub.add('/leaked.html', article_html('Leaked'))
+        stub.delay = 0.02
+    crawler = make_crawler(concurrency=concurrency, max_in_flight_per_site=2)
+
+    articles = crawler.crawl_sites([root for _, root in sites], max_depth=1, max_pages_per_site=4)
+
+    assert len(articles) == 8
+    for stub, root in sites:
+        assert len([article for article in articles if article.url.startswith(root)]) == 4
+        assert len(stub.requests) == 4
+        assert stub.count('/leaked.html') == 0
+        assert stub.max_in_flight <= 2
+    if concurrency:
+        assert max(stub.max_in_flight for stub, _ in sites) == 2
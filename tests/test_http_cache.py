@@ -0,0 +1,102 @@
+from grawt.fetcher import Fetcher
+from grawt.http_cache import HttpCache, cache_key
+from tests.conftest import article_html
+
+
+def make_fetcher(tmp_path) -> Fetcher:
+    return Fetcher({'http_cache_path': str(tmp_path / 'cache.sqlite'), 'head_probes': False})
+
+
+def test_cache_key_ignores_fragment_and_case_of_the_host():
+    assert cache_key('HTTP://Example.COM#top') == 'http://example.com/'
+    assert cache_key('https://example.com/a?b=1#c') == 'https://example.com/a?b=1'
+
+
+def test_only_responses_with_validators_are_cached(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite'))
+
+    assert not cache.store('https://example.com/a', {}, b'body', 'utf-8')
+    assert cache.store('https://example.com/b', {'ETag': '"v1"'}, b'body', 'utf-8')
+    assert cache.get('https://example.com/a') is None
+    entry = cache.get('https://example.com/b#x')
+    assert entry.content == b'body' and entry.conditional_headers() == {'If-None-Match': '"v1"'}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite'), max_size=200)
+    for i in range(10):
+        cache.store('https://example.com/{}'.format(i), {'ETag': str(i)}, bytes(range(i, i + 60)), None)
+
+    assert cache.get('https://example.com/0') is None
+    assert cache.get('https://example.com/9') is not None
+    cache.close()
+
+
+def test_etag_is_revalidated_and_the_body_reused_on_304(server, tmp_path):
+    html: str = article_html('Cached page')
+
+    def page(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, b''
+        return 200, {'Content-Type': 'text/html', 'ETag': '"v1"'}, html.encode()
+
+    server.routes['/page.html'] = page
+    fetcher = make_fetcher(tmp_path)
+    first = fetcher.fetch(server.url('/page.html'), html_only=True)
+    second = fetcher.fetch(server.url('/page.html'), html_only=True)
+    fetcher.close()
+
+    assert not first.from_cache
+    assert second.from_cache and second.status_code == 200 and second.text == html
+
+
+def test_last_modified_is_sent_as_if_modified_since(server, tmp_path):
+    stamp: str = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+    def page(request):
+        if request.headers.get('If-Modified-Since') == stamp:
+            return 304, {}, b''
+        return 200, {'Content-Type': 'text/html', 'Last-Modified': stamp}, b'<html>v1</html>'
+
+    server.routes['/page.html'] = page
+    fetcher = make_fetcher(tmp_path)
+    fetcher.fetch(server.url('/page.html'))
+
+    assert fetcher.fetch(server.url('/page.html')).from_cache
+    fetcher.close()
+
+
+def test_changed_page_replaces_the_cache_entry(server, tmp_path):
+    def page(request):
+        version: str = '"v{}"'.format(request.count)
+        return 200, {'Content-Type': 'text/html', 'ETag': version}, version.encode()
+
+    server.routes['/page.html'] = page
+    fetcher = make_fetcher(tmp_path)
+    fetcher.fetch(server.url('/page.html'))
+    second = fetcher.fetch(server.url('/page.html'))
+    fetcher.close()
+
+    assert not second.from_cache and second.content == b'"v2"'
+    assert server.requests[1].headers.get('If-None-Match') == '"v1"'
+
+
+def test_crawler_reuses_cached_pages_on_the_next_crawl(server, make_crawler, tmp_path):
+    html: str = article_html('Cached article')
+
+    def page(request):
+        if request.headers.get('If-None-Match') == '"a"':
+            return 304, {}, b''
+        return 200, {'Content-Type': 'text/html', 'ETag': '"a"'}, html.encode()
+
+    server.routes['/'] = page
+    crawler = make_crawler(http_cache_path=str(tmp_path / 'cache.sqlite'), seen_store='json')
+    assert len(list(crawler.crawl_iter(server.url('/'), max_depth=0))) == 1
+    crawler.close()
+
+    crawler = make_crawler(http_cache_path=str(tmp_path / 'cache.sqlite'), urls_file_path=str(tmp_path / 'other.json'), seen_store='json')
+    articles = list(crawler.crawl_iter(server.url('/'), max_depth=0))
+
+    assert [article.headline for article in articles] == ['Cached article']
+    assert server.requests[-1].headers.get('If-None-Match') == '"a"'
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import pytest
+
+from grawt.crawler import SCRAPE_FULL, SCRAPE_HEAD, SCRAPE_LINKS, scrape_html
+from grawt.metadata import parse_date, parse_head, read_metadata, split_head
+from grawt.scraper.general_scraper import GeneralScraper
+from tests.conftest import article_html
+
+
+def json_ld(document) -> str:
+    return '<script type="application/ld+json">{}</script>'.format(json.dumps(document))
+
+
+HUB_HEAD: str = json_ld({'@context': 'https://schema.org', '@type': 'CollectionPage', 'name': 'Politics'})
+ARTICLE_HEAD: str = json_ld({
+    '@type': 'NewsArticle', 'headline': 'Structured headline', 'datePublished': '2024-05-01T08:30:00+02:00'
+})
+
+
+def test_split_head_cuts_at_the_end_of_the_head():
+    assert split_head('<html><head><title>A</title></HEAD ><body><p>text</p>') == '<html><head><title>A</title>'
+    assert split_head('<html><title>A</title><body class="x"><p>text</p>') == '<html><title>A</title>'
+    assert split_head('<p>no head at all</p>') is None
+    assert read_metadata('<p>no head at all</p>') is None
+
+
+def test_parse_head_prefers_json_ld_over_opengraph():
+    metadata = parse_head(
+        '<head><title>Site name</title><meta property="og:title" content="OG headline">'
+        '<meta property="og:type" content="article"><link rel="canonical" href="https://example.com/a">' + ARTICLE_HEAD
+    )
+
+    assert metadata.headline == 'Structured headline'
+    assert metadata.title == 'Site name'
+    assert metadata.published == datetime(2024, 5, 1, 8, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert metadata.canonical_url == 'https://example.com/a'
+    assert metadata.is_article and not metadata.is_hub
+
+
+def test_parse_head_falls_back_to_opengraph_and_meta_tags():
+    metadata = parse_head(
+        '<head><meta property="og:title" content="  OG headline "><meta property="og:url" content="https://example.com/og">'
+        '<meta name="pubdate" content="May 1, 2024"><meta name="pubdate" content="2000-01-01">'
+        '<script type="application/ld+json">{broken</script>'
+    )
+
+    assert metadata.headline == 'OG headline'
+    assert metadata.published == datetime(2024, 5, 1)
+    assert metadata.canonical_url == 'https://example.com/og'
+    assert not metadata.is_article and not metadata.is_hub
+
+
+def test_parse_head_reads_the_objects_of_a_graph():
+    metadata = parse_head('<head>' + json_ld({'@graph': [
+        {'@type': 'WebSite', 'url': 'https://example.com/'},
+        {'@type': ['NewsArticle', 'Thing'], 'headline': ['Graph headline'], 'mainEntityOfPage': {'@id': 'https://example.com/g'},
+         'dateCreated': '2024-05-01'}
+    ]}))
+
+    assert metadata.types == ['WebSite', 'NewsArticle', 'Thing']
+    assert metadata.headline == 'Graph headline'
+    assert metadata.canonical_url == 'https://example.com/g'
+    assert metadata.published == datetime(2024, 5, 1)
+    # An article that also declares the website is no hub
+    assert not metadata.is_hub
+
+
+@pytest.mark.parametrize('head, is_hub', [
+    (HUB_HEAD, True),
+    (json_ld([{'@type': 'ItemList'}, {'@type': 'BlogPosting', 'headline': 'Post'}]), False),
+    ('<meta property="og:type" content="website">', False)
+])
+def test_hubs_are_declared_by_json_ld(head, is_hub):
+    assert parse_head('<head>' + head).is_hub is is_hub
+
+
+def test_parse_date():
+    assert parse_date('2024-05-01T08:30:00Z') == datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc)
+    assert parse_date(' 2024-05-01 ') == datetime(2024, 5, 1)
+    assert parse_date('Wed, 01 May 2024 08:30:00 GMT') == datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc)
+    assert parse_date('not a date') is None
+    assert parse_date('') is None and parse_date(None) is None
+
+
+def test_scrape_modes_skip_the_body():
+    html: str = article_html('Body headline', ['/a.html'], head=ARTICLE_HEAD)
+    metadata = read_metadata(html)
+    args = (GeneralScraper(), 'html.parser', 150, metadata)
+
+    full = scrape_html('https://example.com/', html, *args, SCRAPE_FULL)
+    links = scrape_html('https://example.com/', html, *args, SCRAPE_LINKS)
+    head = scrape_html('https://example.com/', html, *args, SCRAPE_HEAD)
+
+    assert full.headline == links.headline == head.headline == 'Structured headline'
+    assert full.main_text and links.main_text == head.main_text == ''
+    assert full.netloc_links == links.netloc_links == ['/a.html']
+    assert head.netloc_links == []
+
+
+@pytest.mark.parametrize('concurrency', [None, 4])
+def test_hubs_only_have_their_links_scraped(server, make_crawler, concurrency):
+    server.add('/', article_html('Front page', ['/section.html', '/story.html'], head=HUB_HEAD))
+    server.add('/section.html', article_html('Section', ['/deep.html'], head=HUB_HEAD))
+    server.add('/story.html', article_html('Story', ['/'], head=ARTICLE_HEAD))
+    crawler = make_crawler(concurrency=concurrency)
+
+    articles: Dict[str, object] = {article.url: article for article in crawler.crawl_iter(server.url('/'), max_depth=1)}
+    assert set(articles) == {server.url(path) for path in ['/', '/section.html', '/story.html']}
+    assert articles[server.url('/')].main_text == '' and articles[server.url('/')].headline == 'Front page - Example'
+    assert articles[server.url('/story.html')].main_text
+    assert articles[server.url('/story.html')].headline == 'Structured headline'
+    assert crawler.stats.counter('pages_reduced', reason='hub', mode=SCRAPE_LINKS) == 1
+    assert crawler.stats.counter('pages_reduced', reason='hub', mode=SCRAPE_HEAD) == 1
+
+
+def test_fast_path_can_be_switched_off(server, make_crawler):
+    server.add('/', article_html('Front page', ['/story.html'], head=HUB_HEAD))
+    server.add('/story.html', article_html('Story', head=ARTICLE_HEAD))
+    crawler = make_crawler(metadata_fast_path=False)
+
+    articles: List = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+    assert all(article.main_text for article in articles)
+    assert {article.headline for article in articles} == {'Front page', 'Story'}
+    assert crawler.stats.counter('pages_reduced', reason='hub', mode=SCRAPE_LINKS) == 0
@@ -0,0 +1,124 @@
+import io
+import pickle
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+
+from grawt.models import ScrapedArticle, iter_records, write_records
+
+
+def full_article(url: str = 'https://example.com/a') -> ScrapedArticle:
+    return ScrapedArticle(
+        url=url,
+        headline='Grüße aus Zürich – 東京',
+        main_text='Erster Absatz.\nΔεύτερη παράγραφος 🎉',
+        datetime_=datetime(2024, 5, 1, 8, 30, tzinfo=timezone(timedelta(hours=2))),
+        hrefs=['https://example.com/b', 'https://other.org/c', 'https://example.com/ü'],
+        netloc_links=['https://example.com/b', 'https://example.com/ü'],
+        canonical_url='https://example.com/canonical',
+        anchor_texts=['Link b', 'Link ü'],
+        fingerprint=(b'0123456789abcdef', 2 ** 64 - 1)
+    )
+
+
+def assert_same(decoded: ScrapedArticle, article: ScrapedArticle) -> None:
+    for name in ScrapedArticle.__slots__:
+        assert getattr(decoded, name) == getattr(article, name), name
+
+
+def test_record_round_trips_every_field():
+    article = full_article()
+
+    assert_same(ScrapedArticle.from_bytes(article.to_bytes()), article)
+
+
+def test_record_round_trips_netloc_links_that_are_not_in_hrefs():
+    article = full_article()
+    article.netloc_links = ['https://example.com/only-here', 'https://example.com/b']
+
+    assert_same(ScrapedArticle.from_bytes(article.to_bytes()), article)
+
+
+def test_record_keeps_missing_and_empty_values_apart():
+    empty = ScrapedArticle('https://example.com/a', '', '', hrefs=[], netloc_links=[], anchor_texts=[], canonical_url='')
+    missing = ScrapedArticle('https://example.com/a')
+
+    assert_same(ScrapedArticle.from_bytes(empty.to_bytes()), empty)
+    decoded = ScrapedArticle.from_bytes(missing.to_bytes())
+    assert decoded.datetime_ is None and decoded.canonical_url is None and decoded.fingerprint is None
+    assert decoded.hrefs is None and decoded.netloc_links is None and decoded.anchor_texts is None
+    # Missing texts come back as empty strings
+    assert decoded.headline == '' and decoded.main_text == ''
+
+
+def test_record_keeps_naive_dates_naive():
+    article = ScrapedArticle('https://example.com/a', 'Headline', 'Text', datetime(2024, 5, 1, 8, 30, 15, 123))
+
+    assert ScrapedArticle.from_bytes(article.to_bytes()).datetime_ == datetime(2024, 5, 1, 8, 30, 15, 123)
+    assert ScrapedArticle.from_bytes(article.to_bytes()).datetime_.tzinfo is None
+
+
+def test_record_replaces_nul_characters():
+    article = ScrapedArticle('https://example.com/a', 'Head\0line', 'Text', hrefs=['https://example.com/\0'])
+    decoded = ScrapedArticle.from_bytes(article.to_bytes())
+
+    assert decoded.headline == 'Head�line'
+    assert decoded.hrefs == ['https://example.com/�'] and decoded.main_text == 'Text'
+
+
+def test_record_rejects_anchor_texts_that_do_not_match_the_links():
+    article = full_article()
+    article.anchor_texts = ['Only one']
+
+    with pytest.raises(ValueError):
+        article.to_bytes()
+
+
+def test_articles_are_pickled_as_records():
+    article = full_article()
+    data: bytes = pickle.dumps(article)
+
+    assert article.to_bytes() in data
+    assert_same(pickle.loads(data), article)
+
+
+def test_records_round_trip_through_a_file():
+    articles: List[ScrapedArticle] = [full_article('https://example.com/{}'.format(i)) for i in range(3)]
+    articles.append(ScrapedArticle('https://example.com/missing'))
+    stream = io.BytesIO()
+
+    assert write_records(stream, articles) == 4
+    stream.seek(0)
+    decoded: List[ScrapedArticle] = list(iter_records(stream))
+    for result, article in zip(decoded, articles[:3]):
+        assert_same(result, article)
+    assert [article.url for article in decoded] == [article.url for article in articles]
+    assert list(iter_records(io.BytesIO())) == []
+
+
+@pytest.mark.parametrize('cut', [1, 3, 4, 10, 20])
+def test_truncated_stream_fails_after_the_complete_records(cut):
+    stream = io.BytesIO()
+    write_records(stream, [full_article('https://example.com/1'), full_article('https://example.com/2')])
+    data: bytes = stream.getvalue()[:-cut] if cut > 4 else stream.getvalue() + b'\x01\x00\x00\x00'[:cut]
+    records = iter_records(io.BytesIO(data))
+
+    assert next(records).url == 'https://example.com/1'
+    if cut <= 4:
+        assert next(records).url == 'https://example.com/2'
+    with pytest.raises(ValueError, match='Truncated'):
+        next(records)
+
+
+@pytest.mark.parametrize('data', [
+    b'\x01\x00',
+    b'\x02\x00\x00\x00\x00\x00\x00\x00\x00\x00',
+    # Two hrefs announced but none stored
+    b'\x01\x01\x02\x00\x00\x00\x00\x00\x00\x00https://example.com/a\0h\0t\0',
+    # Netloc link index beyond the hrefs
+    b'\x01\x07\x01\x00\x00\x00\x01\x00\x00\x00\x05\x00\x00\x00u\0h\0t\0\0https://example.com/a',
+])
+def test_corrupt_record_is_rejected(data):
+    with pytest.raises(ValueError):
+        ScrapedArticle.from_bytes(data)
@@ -0,0 +1,97 @@
+import random
+from typing import List
+
+from grawt.fetcher import NOT_HTML
+from grawt.retry import (
+    OTHER, PERMANENT, RATE_LIMITED, SERVER_ERROR, TIMEOUT, FailureStore, RetryPolicy, RetryQueue, classify_status
+)
+from tests.conftest import article_html
+
+URL: str = 'https://example.com/page'
+
+
+def test_status_codes_are_classified():
+    assert classify_status(200) is None
+    assert classify_status(404) == PERMANENT
+    assert classify_status(408) == TIMEOUT
+    assert classify_status(429) == RATE_LIMITED
+    assert classify_status(503) == SERVER_ERROR
+
+
+def test_backoff_grows_exponentially_with_jitter_and_a_cap():
+    random.seed(1)
+    policy = RetryPolicy(max_retries=3, base_delay=1.0, max_delay=5.0)
+
+    assert all(0.5 <= policy.delay(0) <= 1.0 for _ in range(20))
+    assert all(2.0 <= policy.delay(2) <= 4.0 for _ in range(20))
+    assert policy.delay(10) <= 5.0
+    assert policy.delay(0, retry_after=30.0) == 30.0
+    assert policy.should_retry(SERVER_ERROR, 2) and not policy.should_retry(SERVER_ERROR, 3)
+    assert not policy.should_retry(PERMANENT, 0) and not policy.should_retry(OTHER, 0)
+
+
+def test_retry_queue_hands_out_due_retries_first():
+    queue = RetryQueue()
+    queue.push('https://example.com/later', 1, 1, 60.0)
+    queue.push('https://example.com/now', 2, 1, 0.0)
+
+    assert queue.pop_due() == ('https://example.com/now', 2, 1)
+    assert queue.pop_due() is None
+    assert 0 < queue.wait_time() <= 60.0
+
+
+def test_url_is_dead_after_max_failed_runs(tmp_path):
+    store = FailureStore(str(tmp_path / 'failures.sqlite'), max_failed_runs=2)
+
+    assert not store.record(URL, TIMEOUT, 'timed out')
+    assert store.record(URL, SERVER_ERROR, 'HTTP 500', 500)
+    store.close()
+    assert FailureStore(str(tmp_path / 'failures.sqlite'), max_failed_runs=2).is_dead(URL)
+
+
+def test_permanent_errors_and_rejected_pages_count_as_evidence():
+    store = FailureStore(max_failed_runs=2)
+
+    assert store.record(URL, PERMANENT, 'HTTP 404', 404)
+    assert not store.record('https://example.com/file.pdf', NOT_HTML, 'no HTML')
+    assert store.record('https://example.com/file.pdf', NOT_HTML, 'no HTML')
+
+
+def test_scraper_errors_never_make_an_url_dead():
+    store = FailureStore(max_failed_runs=2)
+    for _ in range(5):
+        assert not store.record(URL, OTHER, 'IndexError in a scraper')
+
+    assert not store.is_dead(URL)
+    assert store.errors() == [(URL, OTHER, None, 'IndexError in a scraper')]
+    store.clear(URL)
+    assert store.errors() == []
+
+
+def test_dead_url_expires_after_its_ttl():
+    store = FailureStore(dead_url_ttl=0.0)
+    store.record(URL, PERMANENT, 'HTTP 410', 410)
+
+    assert not store.is_dead(URL)
+
+
+def test_server_errors_are_retried_later_in_the_crawl(server, make_crawler):
+    server.add('/', article_html('Front page', ['/flaky.html'], paragraphs=1))
+    html: bytes = article_html('Flaky page').encode()
+    server.routes['/flaky.html'] = lambda request: (200, {'Content-Type': 'text/html'}, html) if request.count > 2 else (500, {}, b'error')
+
+    urls: List[str] = [article.url for article in make_crawler().crawl_iter(server.url('/'), max_depth=1)]
+
+    assert server.url('/flaky.html') in urls
+    assert server.count('/flaky.html') == 3
+
+
+def test_dead_urls_are_skipped_by_the_next_crawl(server, make_crawler, tmp_path):
+    server.add('/', article_html('Front page', ['/gone.html'], paragraphs=1))
+    server.add('/gone.html', 'gone', status=410)
+    failures: str = str(tmp_path / 'failures.sqlite')
+    list(make_crawler(failure_store_path=failures).crawl_iter(server.url('/'), max_depth=1))
+    list(make_crawler(failure_store_path=failures, seen_store_path=str(tmp_path / 'other.sqlite')).crawl_iter(server.url('/'), max_depth=1))
+
+    assert server.count('/') == 2
+    assert server.count('/gone.html') == 1
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import List
+
+import pytest
+
+from grawt.models import ScrapedArticle
+from grawt.scheduler import PolitenessScheduler, parse_crawl_delay, parse_retry_after
+from tests.conftest import article_html
+
+URL: str = 'https://example.com/page'
+
+
+def make_scheduler(**config) -> PolitenessScheduler:
+    return PolitenessScheduler(dict({'respect_robots': False, 'max_per_host': 8}, **config), lambda url: None)
+
+
+def test_concurrent_503s_of_one_window_back_off_once():
+    scheduler = make_scheduler(requests_per_second=1000.0, burst=8.0)
+    starts: List[float] = [scheduler.acquire(URL) for _ in range(4)]
+    for started in starts:
+        scheduler.release(URL, 503, started=started)
+
+    assert scheduler.rate(URL) == 500.0
+
+    started = scheduler.acquire(URL)
+    scheduler.release(URL, 503, started=started)
+    assert scheduler.rate(URL) == 250.0
+
+
+def test_recovery_is_a_fraction_of_the_allowed_rate():
+    scheduler = make_scheduler(requests_per_second=1000.0, burst=8.0, recovery_step=0.1)
+    scheduler.release(URL, 503, started=scheduler.acquire(URL))
+    for _ in range(3):
+        scheduler.release(URL, 200, started=scheduler.acquire(URL))
+
+    assert scheduler.rate(URL) == 800.0
+    for _ in range(5):
+        scheduler.release(URL, 200, started=scheduler.acquire(URL))
+    assert scheduler.rate(URL) == 1000.0
+
+
+def test_rate_never_drops_below_the_minimum():
+    scheduler = make_scheduler(requests_per_second=1.0, min_requests_per_second=0.2, burst=100.0)
+    for _ in range(5):
+        scheduler.release(URL, 429)
+
+    assert scheduler.rate(URL) == 0.2
+
+
+def test_retry_after_and_crawl_delay_are_parsed():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    lines: List[str] = ['User-agent: *', 'Crawl-delay: 2', '', 'User-agent: grawt', 'Crawl-delay: 0.5']
+    assert parse_crawl_delay(lines, 'grawt/1.0') == 0.5
+    assert parse_crawl_delay(lines, 'other') == 2.0
+
+
+def test_one_off_503s_do_not_collapse_the_rate_of_a_fast_host(server, make_crawler):
+    paths: List[str] = ['/news/story-{}.html'.format(i) for i in range(100)]
+    server.add('/', article_html('Front page', paths, paragraphs=1))
+    for i, path in enumerate(paths):
+        html: bytes = article_html('Story number {}'.format(i)).encode()
+        if i % 20 == 10:
+            server.routes[path] = lambda request, html=html: (503, {}, b'busy') if request.count == 1 else (200, {'Content-Type': 'text/html'}, html)
+        else:
+            server.add(path, html)
+    crawler = make_crawler(
+        politeness=True, requests_per_second=1000.0, burst=8.0, max_per_host=8, concurrency=8, backoff_factor=0.5, recovery_step=0.05
+    )
+
+    async def crawl() -> List[ScrapedArticle]:
+        return [article async for article in crawler.acrawl_iter(server.url('/'), max_depth=1)]
+
+    articles: List[ScrapedArticle] = asyncio.run(crawl())
+
+    assert len(articles) == 101
+    # Without the once per window rule and proportional recovery the rate ended near 40 req/s
+    assert crawler._scheduler.rate(server.url('/')) >= 250.0
+
+
+@pytest.mark.parametrize('concurrency', [None, 4])
+def test_pages_disallowed_by_robots_are_counted_and_logged(server, make_crawler, caplog, concurrency):
+    server.add('/', article_html('Front page', ['/news/story.html', '/private/page.html'], paragraphs=1))
+    server.add('/news/story.html', article_html('Story'))
+    server.add('/private/page.html', article_html('Private'))
+    server.add('/robots.txt', 'User-agent: *\nDisallow: /private/\n', headers={'Content-Type': 'text/plain'})
+    crawler = make_crawler(politeness=True, respect_robots=True, requests_per_second=1000.0, burst=8.0, concurrency=concurrency)
+
+    with caplog.at_level(logging.DEBUG, logger='grawt'):
+        articles = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+
+    assert sorted(article.headline for article in articles) == ['Front page', 'Story']
+    assert server.count('/private/page.html') == 0
+    assert crawler.stats.counter('pages_skipped', reason='robots') == 1
+    assert crawler.stats.counter('failures', kind='other') == 0
+    records = [record for record in caplog.records if getattr(record, 'event', None) == 'skipped_robots']
+    assert [(record.levelno, record.url) for record in records] == [(logging.DEBUG, server.url('/private/page.html'))]
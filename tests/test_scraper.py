@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+
+import pytest
+from bs4 import BeautifulSoup
+from dateutil import parser as date_parser
+
+from grawt.document import SoupDocument
+from grawt.scraper.general_scraper import GeneralScraper, scan_page
+from tests.test_document import PAGES, read_fixture
+
+
+class LegacyScraper():
+    """The extract methods of the GeneralScraper before the single pass, one traversal per method."""
+
+    def extract_headline(self, soup: BeautifulSoup) -> str:
+        headlines: List[Any] = []
+        for i in range(1, 7):
+            headlines.extend(soup.find_all(f'h{i}'))
+        if len(headlines) > 0:
+            return headlines[0].get_text()
+        return soup.find('title').get_text()
+
+    def extract_main_text(self, soup: BeautifulSoup, min_chars: int) -> str:
+        full_text: str = ''
+        for p in soup.find_all('p'):
+            text: str = p.get_text()
+            if len(text) >= min_chars:
+                full_text += text + '\n'
+        return full_text
+
+    def extract_date(self, soup: BeautifulSoup) -> Optional[datetime]:
+        datetimes: List[datetime] = []
+        for time_tag in soup.find_all('time'):
+            try:
+                datetimes.append(date_parser.parse(time_tag.get('datetime')))
+            except (date_parser.ParserError, TypeError):
+                pass
+        return min(datetimes) if datetimes else None
+
+    def extract_all_hrefs(self, soup: BeautifulSoup) -> List[str]:
+        return [a.get('href') for a in soup.find_all('a') if a.get('href', None) is not None]
+
+
+@pytest.mark.parametrize('page', PAGES)
+@pytest.mark.parametrize('min_chars', [0, 30, 150])
+def test_single_pass_matches_the_extract_methods(page, min_chars):
+    soup = BeautifulSoup(read_fixture(page), 'html.parser')
+    scraper = GeneralScraper()
+    legacy = LegacyScraper()
+    article = scraper.scrape_article(soup, min_chars)
+
+    assert article.headline == scraper.extract_headline(soup) == legacy.extract_headline(soup)
+    assert article.main_text == scraper.extract_main_text(soup, min_chars) == legacy.extract_main_text(soup, min_chars)
+    assert article.hrefs == scraper.extract_all_hrefs(soup) == legacy.extract_all_hrefs(soup)
+    assert article.netloc_links == scraper.extract_netloc_links(soup)
+    if legacy.extract_date(soup) is not None:
+        assert article.datetime_ == scraper.extract_date(soup) == legacy.extract_date(soup)
+
+
+def test_scan_page_collects_in_document_order():
+    scan = scan_page(SoupDocument(BeautifulSoup(read_fixture('hub_page.html'), 'html.parser')), anchor_texts=True)
+
+    assert scan.title.get_text() == 'Politik – Example News'
+    assert scan.base == 'https://www.example-news.com/politik/'
+    assert scan.headline.get_text() == 'Aktuelle Meldungen' and scan.headline_level == 2
+    assert scan.date_strs == ['2024-05-02', 'kein Datum', None]
+    assert scan.anchor_texts == ['Erste Meldung des Tages', 'Zweite Meldung', 'Dritte Meldung', 'Weiter']
+    assert scan.paragraphs == ['Alle Meldungen aus der Politik.']
+
+
+def test_links_are_resolved_against_the_base_tag():
+    soup = BeautifulSoup(read_fixture('hub_page.html'), 'html.parser')
+
+    assert GeneralScraper().extract_netloc_links(soup) == [
+        'https://www.example-news.com/politik/artikel-1.html',
+        'https://www.example-news.com/politik/artikel-2.html',
+        '//cdn.example-news.com/artikel-3.html',
+        'https://www.example-news.com/politik/?seite=2'
+    ]
+
+
+def test_title_is_the_headline_of_a_page_without_headings():
+    soup = BeautifulSoup(read_fixture('title_only.html'), 'html.parser')
+
+    assert GeneralScraper().scrape_article(soup, 0).headline == '  Nur ein Titel  '
+
+
+def test_oldest_date_wins_with_and_without_time_zone():
+    soup = BeautifulSoup(
+        '<time datetime="2024-05-01T08:30:00+02:00"></time><time datetime="2024-05-01T07:00:00"></time>'
+        '<time datetime="2024-05-01T06:00:00Z"></time>', 'html.parser'
+    )
+
+    assert GeneralScraper().extract_date(soup) == datetime(2024, 5, 1, 6, 0, tzinfo=timezone.utc)
@@ -0,0 +1,86 @@
+import json
+
+from grawt.bloom_filter import HEADER_SIZE, BloomFilter
+from grawt.seen_store import BloomSeenStore, SqliteSeenStore
+
+
+def bloom_store(tmp_path) -> BloomSeenStore:
+    return BloomSeenStore(SqliteSeenStore(str(tmp_path / 'urls.sqlite'), batch_size=2), str(tmp_path / 'urls.bloom'), capacity=1000)
+
+
+def test_sqlite_store_persists_urls(tmp_path):
+    store = SqliteSeenStore(str(tmp_path / 'urls.sqlite'), batch_size=10)
+    store.add('https://example.com/a')
+    assert 'https://example.com/a' in store
+    store.close()
+
+    store = SqliteSeenStore(str(tmp_path / 'urls.sqlite'))
+    assert 'https://example.com/a' in store and 'https://example.com/b' not in store
+    assert len(store) == 1
+    store.close()
+
+
+def test_sqlite_store_migrates_the_json_file_once(tmp_path):
+    json_path = tmp_path / 'urls.json'
+    json_path.write_text(json.dumps(['https://example.com/a', 'https://example.com/b']))
+    store = SqliteSeenStore(str(tmp_path / 'urls.sqlite'), migrate_from=str(json_path))
+
+    assert len(store) == 2
+    assert store.migrate_json(str(json_path)) == 0
+    store.close()
+
+
+def test_sqlite_store_generation_counts_commits_that_add_urls(tmp_path):
+    store = SqliteSeenStore(str(tmp_path / 'urls.sqlite'))
+    store.add('https://example.com/a')
+    store.flush()
+    store.add('https://example.com/a')
+    store.flush()
+
+    assert store.generation == 1
+    store.close()
+
+
+def test_bloom_store_answers_lookups(tmp_path):
+    store = bloom_store(tmp_path)
+    store.add('https://example.com/a')
+
+    assert 'https://example.com/a' in store
+    assert 'https://example.com/b' not in store
+    store.close()
+
+
+def test_bloom_is_rebuilt_after_urls_were_added_in_sqlite_mode(tmp_path):
+    bloom_store(tmp_path).close()
+    sqlite_only = SqliteSeenStore(str(tmp_path / 'urls.sqlite'))
+    sqlite_only.add('https://example.com/only-in-sqlite')
+    sqlite_only.close()
+
+    store = bloom_store(tmp_path)
+    assert 'https://example.com/only-in-sqlite' in store
+    store.close()
+
+
+def test_bloom_is_rebuilt_after_a_crash_before_its_flush(tmp_path):
+    store = bloom_store(tmp_path)
+    store.add('https://example.com/a')
+    store.flush()
+    # The batch of two reaches SQLite, the bits of the filter are lost in the crash
+    store.add('https://example.com/b')
+    store.add('https://example.com/c')
+    store._bloom_filter.reset()
+    store._bloom_filter.flush()
+    store._exact_store.close()
+
+    store = bloom_store(tmp_path)
+    assert all(url in store for url in ['https://example.com/a', 'https://example.com/b', 'https://example.com/c'])
+    store.close()
+
+
+def test_bloom_filter_of_the_old_format_is_recreated(tmp_path):
+    path = tmp_path / 'urls.bloom'
+    path.write_bytes(b'GRAWTBF1' + bytes(HEADER_SIZE + 64))
+
+    bloom = BloomFilter(str(path), capacity=100)
+    assert bloom.created and bloom.count == 0 and bloom.generation == 0
+    bloom.close()
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+
+from grawt.models import ScrapedArticle
+from grawt.sinks import JsonlSink, SqliteSink, load_sink
+from tests.conftest import article_html, news_site
+
+
+def article(i: int, **kwargs) -> ScrapedArticle:
+    return ScrapedArticle(
+        'https://example.com/{}'.format(i), 'Headline {} – Grüße'.format(i), 'Text {}'.format(i),
+        datetime(2024, 5, 1, 8, i, tzinfo=timezone(timedelta(hours=2))), ['https://example.com/', 'https://other.org/'],
+        ['https://example.com/'], **kwargs
+    )
+
+
+def read_jsonl(path) -> List[dict]:
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+def test_to_dict_is_json_serializable_and_round_trips():
+    original = article(1, canonical_url='https://example.com/canonical')
+    doc: dict = original.to_dict()
+
+    assert doc['datetime_'] == '2024-05-01T08:01:00+02:00'
+    assert 'anchor_texts' not in doc
+    restored = ScrapedArticle.from_dict(json.loads(json.dumps(doc)))
+    for name in ('url', 'headline', 'main_text', 'datetime_', 'hrefs', 'netloc_links', 'canonical_url', 'anchor_texts'):
+        assert getattr(restored, name) == getattr(original, name)
+    # Files of older versions
+    legacy = ScrapedArticle.from_dict({'url': 'https://example.com/', 'headline': 'H', 'maintext': 'Text', 'datetime_': None})
+    assert legacy.main_text == 'Text' and legacy.datetime_ is None and legacy.hrefs is None
+
+
+def test_jsonl_sink_writes_in_batches(tmp_path):
+    path = tmp_path / 'articles.jsonl'
+    sink = JsonlSink(str(path), batch_size=2)
+    for i in range(3):
+        sink.write(article(i))
+
+    assert [doc['url'] for doc in read_jsonl(path)] == ['https://example.com/0', 'https://example.com/1']
+    sink.close()
+    docs: List[dict] = read_jsonl(path)
+    assert sink.written == 3
+    assert [ScrapedArticle.from_dict(doc).datetime_ for doc in docs] == [article(i).datetime_ for i in range(3)]
+    assert docs[0]['headline'] == 'Headline 0 – Grüße'
+
+
+def test_jsonl_sink_appends_to_an_existing_file(tmp_path):
+    path = tmp_path / 'articles.jsonl'
+    for i in range(2):
+        with JsonlSink(str(path), fsync=True) as sink:
+            assert sink.consume([article(i)]) == 1
+
+    assert [doc['url'] for doc in read_jsonl(path)] == ['https://example.com/0', 'https://example.com/1']
+
+
+def test_sqlite_sink_keeps_one_row_per_url(tmp_path):
+    path = tmp_path / 'articles.sqlite'
+    with SqliteSink(str(path), batch_size=2) as sink:
+        sink.consume([article(0), article(1), article(0, canonical_url='https://example.com/1')])
+
+    connection = sqlite3.connect(str(path))
+    rows = connection.execute('SELECT url, headline, datetime, hrefs, netloc_links, canonical_url FROM articles ORDER BY url').fetchall()
+    connection.close()
+    assert rows == [
+        ('https://example.com/0', 'Headline 0 – Grüße', '2024-05-01T08:00:00+02:00',
+         '["https://example.com/", "https://other.org/"]', '["https://example.com/"]', 'https://example.com/1'),
+        ('https://example.com/1', 'Headline 1 – Grüße', '2024-05-01T08:01:00+02:00',
+         '["https://example.com/", "https://other.org/"]', '["https://example.com/"]', None)
+    ]
+
+
+def test_sqlite_sink_upgrades_a_table_without_canonical_url(tmp_path):
+    path = tmp_path / 'articles.sqlite'
+    connection = sqlite3.connect(str(path))
+    connection.execute(
+        'CREATE TABLE articles (url TEXT PRIMARY KEY, headline TEXT, main_text TEXT, datetime TEXT, hrefs TEXT, netloc_links TEXT)'
+    )
+    connection.commit()
+    connection.close()
+
+    with SqliteSink(str(path)) as sink:
+        sink.write(article(0, canonical_url='https://example.com/1'))
+    connection = sqlite3.connect(str(path))
+    assert connection.execute('SELECT canonical_url FROM articles').fetchall() == [('https://example.com/1',)]
+    connection.close()
+
+
+def test_load_sink(tmp_path):
+    sink = load_sink({'output_sink': 'sqlite', 'output_path': str(tmp_path / 'out.sqlite'), 'output_batch_size': 5})
+    assert isinstance(sink, SqliteSink)
+    sink.close()
+    with pytest.raises(ValueError, match='parquet'):
+        load_sink({'output_sink': 'parquet'})
+
+
+@pytest.mark.parametrize('output_sink', ['jsonl', 'sqlite'])
+def test_crawl_into_the_configured_sink(server, make_crawler, tmp_path, output_sink):
+    paths: List[str] = news_site(server, articles=5)
+    output_path: str = str(tmp_path / 'articles.{}'.format(output_sink))
+    crawler = make_crawler(output_sink=output_sink, output_path=output_path)
+
+    with crawler.open_sink() as sink:
+        assert sink.consume(crawler.crawl_iter(server.url('/'), max_depth=1)) == 6
+    if output_sink == 'jsonl':
+        urls = {doc['url'] for doc in read_jsonl(output_path)}
+    else:
+        connection = sqlite3.connect(output_path)
+        urls = {row[0] for row in connection.execute('SELECT url FROM articles')}
+        connection.close()
+    assert urls == {server.url(path) for path in ['/'] + paths}
+
+
+@pytest.mark.parametrize('concurrency', [None, 3])
+def test_crawl_iter_yields_articles_before_the_crawl_ends(server, make_crawler, concurrency):
+    paths: List[str] = news_site(server, articles=8)
+    release = threading.Event()
+    answered: List[str] = []
+    last: str = paths[-1]
+
+    def blocked(request):
+        # The last page only answers once the test has seen articles
+        release.wait(10)
+        answered.append(request.path)
+        return 200, {'Content-Type': 'text/html'}, article_html('Last story').encode('utf-8')
+
+    server.routes[last] = blocked
+    crawl = make_crawler(concurrency=concurrency).crawl_iter(server.url('/'), max_depth=1)
+    articles = [next(crawl) for _ in range(5)]
+    assert not answered
+    release.set()
+    articles.extend(crawl)
+    assert answered == [last]
+    assert {article.url for article in articles} == {server.url(path) for path in ['/'] + paths}
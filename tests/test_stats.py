@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import pstats
+import re
+import time
+from typing import List
+
+import pytest
+import requests
+
+from grawt.stats import BUCKETS, CrawlStats, Histogram, JsonFormatter, PageProfiler, collect_stages, serve_prometheus, stage
+from tests.conftest import news_site
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    for seconds in [0.002] * 90 + [0.3] * 9 + [20.0]:
+        histogram.observe(seconds)
+
+    assert histogram.count == 100 and histogram.max == 20.0
+    assert histogram.total == pytest.approx(0.18 + 2.7 + 20.0)
+    assert histogram.counts[BUCKETS.index(0.005)] == 90
+    assert histogram.counts[BUCKETS.index(0.5)] == 9
+    assert histogram.counts[-1] == 1
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.95) == 0.5
+    # The open-ended bucket reports the maximum
+    assert histogram.quantile(1.0) == 20.0
+    # A value on a bound belongs to its bucket
+    on_bound = Histogram()
+    on_bound.observe(0.01)
+    assert on_bound.counts[BUCKETS.index(0.01)] == 1
+
+
+def test_counters_are_summed_over_labels():
+    stats = CrawlStats()
+    stats.incr('http_responses', status=200)
+    stats.incr('http_responses', status=200)
+    stats.incr('http_responses', status='404')
+    stats.incr('bytes_downloaded', 1500)
+
+    assert stats.counter('http_responses') == 3
+    assert stats.counter('http_responses', status=200) == 2
+    assert stats.counter('http_responses', status=404) == 1
+    assert stats.counter('http_responses', status=500) == 0
+    assert stats.counter('unknown') == 0
+    assert stats.snapshot()['counters'] == {
+        'http_responses{status=200}': 2, 'http_responses{status=404}': 1, 'bytes_downloaded': 1500
+    }
+
+
+def test_stage_timings_are_only_collected_when_asked_for():
+    with stage('unused'):
+        pass
+    with collect_stages() as timings:
+        with stage('parse'):
+            time.sleep(0.01)
+        with stage('parse'):
+            pass
+        with collect_stages() as inner:
+            with stage('scan'):
+                pass
+    assert set(timings) == {'parse'} and timings['parse'] >= 0.01
+    assert set(inner) == {'scan'}
+
+    stats = CrawlStats()
+    stats.observe_all(timings)
+    with stats.timer('fetch'):
+        time.sleep(0.01)
+    stages: dict = stats.snapshot()['stages']
+    assert stages['parse']['count'] == 1 and stages['parse']['total'] == pytest.approx(timings['parse'], abs=1e-6)
+    assert stages['fetch']['count'] == 1 and stages['fetch']['max'] >= 0.01
+    assert stages['fetch']['p50'] == 0.025
+
+
+def test_prometheus_text_format():
+    stats = CrawlStats()
+    stats.incr('http_responses', status=200)
+    stats.incr('failures', kind='say "hi"')
+    stats.gauge('frontier_size', 7)
+    stats.observe('fetch', 0.003)
+    stats.observe('fetch', 0.2)
+    lines: List[str] = stats.to_prometheus().splitlines()
+
+    assert lines[:7] == [
+        '# TYPE grawt_failures_total counter',
+        'grawt_failures_total{kind="say \\"hi\\""} 1',
+        '# TYPE grawt_http_responses_total counter',
+        'grawt_http_responses_total{status="200"} 1',
+        '# TYPE grawt_frontier_size gauge',
+        'grawt_frontier_size 7',
+        '# TYPE grawt_stage_seconds histogram'
+    ]
+    assert 'grawt_stage_seconds_bucket{stage="fetch",le="0.001"} 0' in lines
+    assert 'grawt_stage_seconds_bucket{stage="fetch",le="0.005"} 1' in lines
+    assert 'grawt_stage_seconds_bucket{stage="fetch",le="0.25"} 2' in lines
+    assert 'grawt_stage_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert 'grawt_stage_seconds_count{stage="fetch"} 2' in lines
+    assert any(re.fullmatch(r'grawt_stage_seconds_sum\{stage="fetch"\} 0\.203\d*', line) for line in lines)
+    # Every sample line is a metric name, optional labels and a number
+    for line in lines:
+        assert line.startswith('# TYPE ') or re.fullmatch(r'[a-z_]+(\{.*\})? [0-9.e+-]+', line)
+
+
+def test_prometheus_endpoint_and_file(tmp_path):
+    stats = CrawlStats(prefix='crawler')
+    stats.incr('articles_scraped', 3)
+    server = serve_prometheus(stats, 0)
+    url: str = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    try:
+        response = requests.get(url + '/metrics', timeout=5)
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'crawler_articles_scraped_total 3' in response.text
+        assert requests.get(url + '/other', timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+
+    path: str = str(tmp_path / 'grawt.prom')
+    stats.write_prometheus(path)
+    with open(path) as file:
+        assert file.read() == stats.to_prometheus()
+    assert not os.path.exists(path + '.tmp')
+
+
+@pytest.mark.parametrize('concurrency', [None, 3])
+def test_stats_of_a_crawl(server, make_crawler, tmp_path, concurrency):
+    paths: List[str] = news_site(server, articles=5)
+    server.add('/', server.routes['/'][2].replace(b'</nav>', b'<a href="/missing.html">x</a></nav>'))
+    stats_path: str = str(tmp_path / 'grawt.prom')
+    crawler = make_crawler(concurrency=concurrency, stats_path=stats_path, max_retries=0)
+
+    articles = list(crawler.crawl_iter(server.url('/'), max_depth=1))
+    stats: CrawlStats = crawler.stats
+    assert len(articles) == 6
+    assert stats.counter('http_responses', status=200) == 6
+    assert stats.counter('http_responses', status=404) == 1
+    assert stats.counter('articles_scraped') == 6
+    assert stats.counter('bytes_downloaded') == sum(len(server.routes[path][2]) for path in ['/'] + paths) + len(b'not found')
+    stages: dict = stats.snapshot()['stages']
+    assert stages['fetch']['count'] == 7
+    for name in ('parse', 'scan', 'extract_headline', 'extract_main_text', 'seen_store', 'canonicalize'):
+        assert stages[name]['count'] >= 6, name
+    with open(stats_path) as file:
+        assert 'grawt_articles_scraped_total 6' in file.read()
+
+
+def test_page_profiler_keeps_only_slow_pages(tmp_path, caplog):
+    profiler = PageProfiler(str(tmp_path / 'profiles'), threshold=0.05)
+    with profiler.profile('https://example.com/fast'):
+        pass
+    with caplog.at_level(logging.WARNING, logger='grawt.stats'):
+        with profiler.profile('https://example.com/slow?page=1'):
+            time.sleep(0.06)
+
+    files: List[str] = os.listdir(str(tmp_path / 'profiles'))
+    assert len(files) == 1 and files[0].endswith('-https_example.com_slow_page_1.prof')
+    pstats.Stats(str(tmp_path / 'profiles' / files[0]))
+    assert caplog.records[-1].event == 'slow_page'
+
+
+def test_json_formatter_includes_the_extra_fields():
+    record = logging.LogRecord('grawt.crawler', logging.WARNING, __file__, 1, 'Gave up on %s', ('https://example.com/',), None)
+    record.event = 'failed'
+    record.attempts = 3
+    doc: dict = json.loads(JsonFormatter().format(record))
+
+    assert doc['message'] == 'Gave up on https://example.com/'
+    assert doc['level'] == 'WARNING' and doc['logger'] == 'grawt.crawler'
+    assert doc['event'] == 'failed' and doc['attempts'] == 3
+    assert 'args' not in doc and 'msg' not in doc
@@ -0,0 +1,54 @@
+import pytest
+
+from grawt.urls import UrlCanonicalizer, registrable_domain, same_site
+
+
+@pytest.fixture
+def canonicalizer() -> UrlCanonicalizer:
+    return UrlCanonicalizer()
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ('HTTPS://WWW.Example.COM:443/News/', 'https://www.example.com/News'),
+    ('http://example.com:8080/a#comments', 'http://example.com:8080/a'),
+    ('https://example.com/a/./b/../c', 'https://example.com/a/c'),
+    ('https://example.com', 'https://example.com/'),
+    ('https://example.com/a?utm_source=x&b=2&fbclid=y&a=1', 'https://example.com/a?a=1&b=2'),
+    ('https://example.com/a?utm_source=x', 'https://example.com/a'),
+])
+def test_urls_are_canonicalized(canonicalizer, url, canonical):
+    assert canonicalizer.canonicalize(url) == canonical
+
+
+@pytest.mark.parametrize('url', [
+    'https://example.com/story?amp',
+    'https://example.com/search?q=a+b&q=c%20d',
+    'https://example.com/a?id=%7E1&x=',
+])
+def test_kept_query_parameters_keep_their_encoding(canonicalizer, url):
+    assert canonicalizer.canonicalize(url) == url
+
+
+def test_query_parameters_are_sorted_by_their_decoded_name(canonicalizer):
+    assert canonicalizer.canonicalize('https://example.com/?b=1&%61=2&&c') == 'https://example.com/?%61=2&b=1&c'
+    assert UrlCanonicalizer(sort_params=False).canonicalize('https://example.com/?b=1&a=2') == 'https://example.com/?b=1&a=2'
+
+
+def test_links_are_resolved_against_the_page(canonicalizer):
+    assert canonicalizer.canonicalize('../b?x=1', 'https://example.com/news/a') == 'https://example.com/b?x=1'
+    assert canonicalizer.canonicalize('mailto:info@example.com', 'https://example.com/') is None
+    assert canonicalizer.canonicalize('/a') is None
+    assert canonicalizer.canonicalize_links(['/a', '/a#top', '/b/'], 'https://example.com/') == ['https://example.com/a', 'https://example.com/b']
+
+
+def test_registrable_domains():
+    assert registrable_domain('www.dailymail.co.uk') == 'dailymail.co.uk'
+    assert registrable_domain('sport.example.com') == 'example.com'
+    assert registrable_domain('127.0.0.1') == '127.0.0.1'
+    assert same_site('https://sport.dailymail.co.uk/a', 'www.dailymail.co.uk:443')
+
+
+def test_sites_of_a_hosting_domain_are_not_merged():
+    assert registrable_domain('foo.github.io') == 'foo.github.io'
+    assert not same_site('https://bar.github.io/', 'foo.github.io')
+    assert registrable_domain('www.foo.blogspot.com') == 'foo.blogspot.com'